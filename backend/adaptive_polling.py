@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Adaptive per-stop poll intervals, derived from the departures in each response.
+
+A response lists the next departures of a stop (up to the EFA limit), so it covers the time
+from the request up to its last departure. As long as the next request comes before that
+window runs out, no departure is missed; polling more often only yields the same departures
+again. Busy stops cover a few minutes per response, quiet stops several hours.
+
+For every stop the last window and the delays of its departures are kept:
+
+- The interval may grow up to `coverage_share` of the covered span (the rest is a margin for
+  departures that are added to the timetable or move forward).
+- If the previous window had already run out when the new response came in (no overlap), or
+  the realtime delays of departures seen in both responses changed, the interval is cut, so
+  that delay updates are picked up while they happen.
+- Otherwise the interval relaxes by `relax` per poll, up to the span limit.
+"""
+import numpy as np
+import pandas as pd
+
+from departure_ids import departure_keys
+
+
+# Minimum change of a delay (minutes) that counts as "delays are changing"
+DELAY_CHANGE_MIN = 1
+
+
+def _departure_times(df):
+    """Real departure times, falling back to the scheduled ones."""
+    real = pd.to_datetime(df["real_departure"], errors="coerce")
+    scheduled = pd.to_datetime(df["scheduled_departure"], errors="coerce")
+    return real.fillna(scheduled)
+
+
+class AdaptivePolling:
+    """Derives the poll interval of every stop from the coverage of its last responses."""
+
+    def __init__(
+        self,
+        min_interval_s=30.0,
+        max_interval_s=1800.0,
+        coverage_share=0.75,
+        tighten=0.5,
+        relax=1.5,
+    ):
+        """
+        Args:
+            min_interval_s (float): Shortest interval, used while delays keep changing
+                (`PollScheduler` still keeps the interval of the stop's tier as the floor).
+            max_interval_s (float): Longest interval, also for stops without departures.
+            coverage_share (float): Share of the covered span the interval may use.
+            tighten (float): Factor applied to the interval when delays change or a gap occurred.
+            relax (float): Factor applied to the interval after an unremarkable response.
+        """
+        self.min_interval_s = min_interval_s
+        self.max_interval_s = max_interval_s
+        self.coverage_share = coverage_share
+        self.tighten = tighten
+        self.relax = relax
+        self._stops = {}  # key -> state of the last response
+
+    def __contains__(self, key):
+        return key in self._stops
+
+    def state(self, key):
+        """
+        Returns what is known about a stop.
+
+        Returns:
+            dict or None: `interval_s`, `span_s` (covered by the last response), `overlap_s`
+            (how far the previous window reached past the last request, negative for a gap),
+            `delay_changes` (departures whose delay changed) and `window_end` (Timestamp).
+        """
+        state = self._stops.get(key)
+        if state is None:
+            return None
+        return {name: value for name, value in state.items() if name != "delays"}
+
+    def observe(self, key, request_time, df, interval_s):
+        """
+        Updates the state of a stop from a response and returns its next poll interval.
+
+        Args:
+            key (tuple): `(place_dm, name_dm)` of the stop.
+            request_time (datetime): When the response was requested (local time, like the
+                departure times).
+            df (pd.DataFrame): All departures of the response (not only the new ones).
+            interval_s (float): The current poll interval of the stop.
+
+        Returns:
+            float: The next poll interval in seconds.
+        """
+        previous = self._stops.get(key)
+        request_time = pd.Timestamp(request_time)
+
+        if df is None or df.empty:
+            # Nothing scheduled (e.g. at night): back off, the next departures will show up
+            # in a later window
+            interval_s = min(self.max_interval_s, interval_s * self.relax)
+            self._stops[key] = {
+                "interval_s": interval_s,
+                "span_s": 0.0,
+                "overlap_s": None,
+                "delay_changes": 0,
+                "window_end": None,
+                "delays": {},
+            }
+            return interval_s
+
+        times = _departure_times(df)
+        window_end = times.max()
+        span_s = max(0.0, (window_end - request_time).total_seconds()) if pd.notna(window_end) else 0.0
+        delays = dict(zip(departure_keys(df), pd.to_numeric(df["delay_min"], errors="coerce")))
+
+        overlap_s = None
+        delay_changes = 0
+        if previous is not None:
+            if previous["window_end"] is not None:
+                overlap_s = (previous["window_end"] - request_time).total_seconds()
+            for uid, delay in delays.items():
+                old = previous["delays"].get(uid)
+                if old is None or np.isnan(old) or np.isnan(delay):
+                    continue
+                if abs(delay - old) >= DELAY_CHANGE_MIN:
+                    delay_changes += 1
+
+        limit_s = max(self.min_interval_s, span_s * self.coverage_share)
+        if delay_changes or (overlap_s is not None and overlap_s <= 0):
+            interval_s = interval_s * self.tighten
+        else:
+            interval_s = interval_s * self.relax
+        interval_s = min(max(self.min_interval_s, min(interval_s, limit_s)), self.max_interval_s)
+
+        self._stops[key] = {
+            "interval_s": interval_s,
+            "span_s": span_s,
+            "overlap_s": overlap_s,
+            "delay_changes": delay_changes,
+            "window_end": window_end,
+            "delays": delays,
+        }
+        return interval_s
@@ -1,25 +1,49 @@
 # -*- coding: utf-8 -*-
 # imports
+import asyncio
+import aiohttp
 import requests
+import numpy as np
 import pandas as pd
-import geopandas as gpd
 import uuid
 import time
 import logging
-from datetime import datetime
+import os
+from datetime import datetime, timedelta
 from pathlib import Path
 
+from compressed_files import write_compressed_variants
+from csv_tail import DEPARTURE_DTYPES, read_csv_since
+from dedup_index import DedupIndex
+from departure_ids import departure_ids, departure_keys, halves_to_strings, strings_to_ints
+from efa_json import decode_body, iter_departures, response_encoding
+from geojson_writer import write_geojson
+from poll_scheduler import PollScheduler, load_catalog, stop_label
+from poll_telemetry import PollTelemetry
+from adaptive_polling import AdaptivePolling
+from station_cache import StationGeometryCache
+from response_archive import ResponseArchive
+from stop_buffers import BUFFER_COLUMNS, StopBuffers
+from throttle import (
+    THROTTLE_STATUS_CODES,
+    CircuitBreaker,
+    TokenBucket,
+    parse_retry_after,
+)
+
 
 # File paths (relative to the script's location)
 def init_paths(__file__):
-    global root, csv_file_target, bahnhoefe_geodata_source, bahnhoefe_geojson_target, full_request_text_target, path_logging
+    global root, csv_file_target, departure_store_target, bahnhoefe_geodata_source, bahnhoefe_geojson_target, response_archive_target, poll_telemetry_target, path_logging
     root = Path(__file__).parent.parent
     csv_file_target = root / "data" / "api" / "final_departures.csv"
+    departure_store_target = root / "data" / "api" / "departures"
     bahnhoefe_geodata_source = root / "data" / "geodata" / "source" / "bahnhoefe.shp"
     bahnhoefe_geojson_target = (
         root / "data" / "geodata" / "generated" / "bahnhoefe_running.geojson"
     )
-    full_request_text_target = root / "data" / "temp" / "vrr_api_full_responses.txt"
+    response_archive_target = root / "data" / "temp" / "responses"
+    poll_telemetry_target = root / "data" / "temp" / "poll_telemetry.json"
     path_logging = root / "data" / "logs" / "api_requests.log"
 
     # List of all paths to ensure they exist
@@ -27,7 +51,8 @@ def init_paths(__file__):
         csv_file_target,
         bahnhoefe_geodata_source,
         bahnhoefe_geojson_target,
-        full_request_text_target,
+        response_archive_target,
+        poll_telemetry_target,
         path_logging,
     ]
     for path in all_paths:
@@ -36,6 +61,71 @@ def init_paths(__file__):
     # Removed assertion to prevent exit if some files do not exist
 
 
+# Storage backend for the departures: None means the plain CSV file
+departure_archive = None
+
+
+def init_storage(storage, compaction_interval_s=600):
+    """
+    Selects the storage backend for the collected departures.
+
+    Args:
+        storage (str): "csv" to append to `final_departures.csv`, or "parquet" for the
+            date-partitioned columnar archive in `data/api/departures`.
+        compaction_interval_s (float): Pause between background compaction runs of the archive.
+    """
+    global departure_archive
+    if storage == "parquet":
+        # Imported lazily so that the CSV mode does not require pyarrow
+        from departure_store import DepartureStore
+
+        departure_archive = DepartureStore(departure_store_target)
+        departure_archive.start_background_compaction(compaction_interval_s)
+    else:
+        departure_archive = None
+
+
+# Archive for the raw API responses: None disables archiving
+raw_response_archive = None
+
+
+def init_response_archive(max_segment_mb=64, compression=None):
+    """
+    Enables archiving of the raw API responses in compressed, rotating segments.
+
+    Args:
+        max_segment_mb (float): Size in MB after which a new segment is started.
+        compression (str, optional): "zstd" or "gzip" (default: zstd if installed, else gzip).
+    """
+    global raw_response_archive
+    raw_response_archive = ResponseArchive(
+        response_archive_target,
+        max_segment_bytes=int(max_segment_mb * 1024 * 1024),
+        compression=compression,
+    )
+
+
+# Per-stop statistics of the requests (returned/new departures, latency, size)
+poll_telemetry = PollTelemetry()
+# Interval of the telemetry report in the log and in `poll_telemetry_target`
+TELEMETRY_REPORT_S = 300
+_next_telemetry_report = 0.0
+
+
+def report_poll_telemetry():
+    """Logs the poll telemetry and writes its JSON summary, at most every `TELEMETRY_REPORT_S`."""
+    global _next_telemetry_report
+    now = time.monotonic()
+    if now < _next_telemetry_report:
+        return
+    _next_telemetry_report = now + TELEMETRY_REPORT_S
+    try:
+        logging.info(poll_telemetry.report())
+        poll_telemetry.write(poll_telemetry_target)
+    except Exception as e:
+        logging.error(f"Error writing the poll telemetry: {e}")
+
+
 # Initialize logging to log to both file and console
 def init_logger(root):
     """
@@ -57,121 +147,309 @@ def init_logger(root):
     )
 
 
-# Main function to fetch and process public transport departure information from the VRR API
-def full_api_request(datetime_dt, place_dm, name_dm):
+# API URL for the VRR (Verkehrsverbund Rhein-Ruhr) departures
+# This URL is used to fetch the departure information based on the parameters provided
+# The API is expected to return a JSON response with the departure details
+# Can be overridden with the VRR_API_URL environment variable or --api-url, e.g. to use mock_efa_server.py
+DEFAULT_API_URL = "https://efa.vrr.de/standard/XML_DM_REQUEST"
+API_URL = os.environ.get("VRR_API_URL", DEFAULT_API_URL)
+
+
+# Default polling configuration: cycle time, departures per stop in the geodata and the stations
+DELAY_MIN = 1
+N_ENTRIES = 30
+PLACENAME_LIST = [
+    ("Duisburg", "HBF"),
+    ("Mönchengladbach", "HBF"),
+    ("Wuppertal", "HBF"),
+    ("Bochum", "HBF"),
+    ("Dortmund", "HBF"),
+    ("Essen", "HBF"),
+    ("Düsseldorf", "HBF"),
+]
+
+# Stop catalog for network-scale polling (--catalog) and the share of the request rate it may
+# plan with; the rest is left for retries and probes of the circuit breakers
+DEFAULT_CATALOG = Path(__file__).resolve().parent.parent / "legacy" / "get_stops+departures" / "vrr_haltestellen.json"
+SCHEDULE_RATE_SHARE = 0.9
+
+
+class EFARequestError(requests.exceptions.RequestException):
+    """Raised when the API answers with an unsuccessful status code."""
+
+    def __init__(self, message, status_code, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after  # seconds from the Retry-After header, if any
+
+
+def communicate_response(status_code, place_dm, name_dm, datetime_dt):
+    """Handles the response from the API and logs the status."""
+    response_lut = {
+        200: "Request successful",
+        204: "No departures found",
+        400: "Bad request",
+        404: "Not found",
+        500: "Internal server error",
+        503: "Service unavailable",
+        429: "Too many requests",
+    }
+    logging.info(
+        f"({status_code}) {response_lut.get(status_code, 'Unknown status')} for {stop_label(place_dm, name_dm)} at {datetime_dt.isoformat()}"
+    )
+    return status_code
+
+
+def make_uid(stop, scheduled_datetime, line):
+    """Generates a unique identifier for each departure based on stop, scheduled datetime, and line."""
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, f"{stop}|{scheduled_datetime}|{line}"))
+
+
+def build_results(datetime_dt, make_uid, departures):
+    """Builds a list of dictionaries containing the departure information."""
+    results = []
+    for dep in departures:
+        stop_name = dep.get("stopName")
+        platform = dep.get("platformName", dep.get("platform"))
+        scheduled = dep.get("dateTime", {})
+        real = dep.get("realDateTime", {})
+
+        # Build full datetime for scheduled and real departure
+        try:
+            scheduled_dt = datetime(
+                int(scheduled.get("year", datetime_dt.year)),
+                int(scheduled.get("month", datetime_dt.month)),
+                int(scheduled.get("day", datetime_dt.day)),
+                int(scheduled.get("hour", 0)),
+                int(scheduled.get("minute", 0)),
+            )
+        except Exception:
+            scheduled_dt = None
+        try:
+            real_dt = (
+                datetime(
+                    int(real.get("year", datetime_dt.year)),
+                    int(real.get("month", datetime_dt.month)),
+                    int(real.get("day", datetime_dt.day)),
+                    int(real.get("hour", 0)),
+                    int(real.get("minute", 0)),
+                )
+                if real
+                else None
+            )
+        except Exception:
+            real_dt = None
+
+        line = dep.get("servingLine", {}).get("number")
+        direction = dep.get("servingLine", {}).get("direction")
+        delay = dep.get("servingLine", {}).get("delay")
+        cancelled = dep.get("servingLine", {}).get("cancelled")
+        connection_exists = not (str(cancelled) == "1")
+        # Additional fields
+        delay_reason = dep.get("servingLine", {}).get("delayReason")
+        realtime_status = dep.get("servingLine", {}).get("realtimeStatus")
+        status_text = dep.get("servingLine", {}).get("statusText")
+
+        uid = make_uid(stop_name, scheduled_dt, line)
+
+        results.append(
+            {
+                "uuid": uid,
+                "stop": stop_name,
+                "platform": platform,
+                "line": line,
+                "direction": direction,
+                "scheduled_departure": scheduled_dt,
+                "real_departure": real_dt,
+                "scheduled_time": scheduled_dt.time() if scheduled_dt else None,
+                "scheduled_date_iso": scheduled_dt.date().isoformat()
+                if scheduled_dt
+                else None,
+                "delay_min": int(delay) if delay not in (None, "", "-9999") else None,
+                "connection_exists": connection_exists,
+                "delay_reason": delay_reason,
+                "realtime_status": realtime_status,
+                "status_text": status_text,
+            }
+        )
+
+    return results
+
+
+# Marks a date/time part that is missing from the response (an explicit null is invalid instead)
+_MISSING = object()
+
+
+def _part_array(values, default):
     """
-    Fetches and processes public transport departure information from the VRR API for a given stop and datetime.
+    Converts one date/time part column into a float array with `int()` semantics, NaN if invalid.
+
+    Exactly the values `int()` accepts in `build_results` are valid ("5", " 5", 5.5 -> 5), others
+    ("5.0", "1e1", None) are not, so that both parsers hash the same departure IDs.
+    """
+    values = [default if v is _MISSING else v for v in values]
+    try:
+        # Converts strings with int() itself
+        return np.array(values, dtype=np.int64).astype(np.float64)
+    except (TypeError, ValueError, OverflowError):
+        # Rare malformed values: convert one by one
+        parts = np.empty(len(values), dtype=np.float64)
+        for i, value in enumerate(values):
+            try:
+                parts[i] = int(value)
+            except (TypeError, ValueError, OverflowError):
+                parts[i] = np.nan
+        return parts
+
+
+def _assemble_datetimes(parts, datetime_dt):
+    """
+    Builds a datetime64 array from year/month/day/hour/minute part columns in one vectorized step.
+
+    Missing date parts default to the request date, missing time parts to 0. Rows that do not form
+    a valid datetime (like `datetime(...)` raising in `build_results`) become NaT.
+    """
+    year = _part_array(parts["year"], datetime_dt.year)
+    month = _part_array(parts["month"], datetime_dt.month)
+    day = _part_array(parts["day"], datetime_dt.day)
+    hour = _part_array(parts["hour"], 0)
+    minute = _part_array(parts["minute"], 0)
+
+    with np.errstate(invalid="ignore"):
+        valid = (
+            (year >= 1)
+            & (year <= 9999)
+            & (month >= 1)
+            & (month <= 12)
+            & (day >= 1)
+            & (hour >= 0)
+            & (hour <= 23)
+            & (minute >= 0)
+            & (minute <= 59)
+        )
+    year, month, day, hour, minute = (
+        np.where(valid, part, 1).astype(np.int64) for part in (year, month, day, hour, minute)
+    )
+
+    month_start = (year - 1970).astype("datetime64[Y]").astype("datetime64[M]") + (month - 1)
+    dates = month_start.astype("datetime64[D]") + (day - 1)
+    # Days beyond the end of the month (e.g. 31 February) spill into the next month
+    valid &= dates.astype("datetime64[M]") == month_start
+    stamps = dates.astype("datetime64[m]") + (hour * 60 + minute)
+    return np.where(valid, stamps, np.datetime64("NaT", "m"))
+
+
+def _format_datetimes(stamps, unit, missing):
+    """Formats a datetime64 array as ISO strings, with `missing` for NaT."""
+    strings = np.datetime_as_string(stamps, unit=unit).astype(object)
+    strings[np.isnat(stamps)] = missing
+    return strings
+
+
+def build_columns(datetime_dt, departures):
+    """
+    Columnar variant of `build_results`: extracts the fields of all departures straight into
+    column lists and assembles the timestamps with vectorized operations.
+
     Args:
-        datetime_dt (datetime): The date and time for which departures are requested.
-        place_dm (str): The place or city of the stop.
-        name_dm (str): The name of the stop.
+        datetime_dt (datetime): The date and time the departures were requested for (default date parts).
+        departures (iterable of dict): The `departureList` items of the response.
+
     Returns:
-        tuple:
-            - pd.DataFrame: DataFrame containing processed departure information with fields such as stop, platform, line, direction, scheduled and real departure times, delay, and status.
-            - int: HTTP status code of the API response.
-    Raises:
-        requests.exceptions.RequestException: If the API request fails or returns an unsuccessful status code.
-    Side Effects:
-        - Logs API request and response status.
-        - Appends raw API responses to a debug text file.
-    """
-
-    def communicate_response(response, place_dm, name_dm, datetime_dt):
-        """Handles the response from the API and logs the status."""
-        response_lut = {
-            200: "Request successful",
-            204: "No departures found",
-            400: "Bad request",
-            404: "Not found",
-            500: "Internal server error",
-            503: "Service unavailable",
-            429: "Too many requests",
-        }
-        logging.info(
-            f"({response.status_code}) {response_lut.get(response.status_code, 'Unknown status')} for {place_dm} {name_dm} at {datetime_dt.isoformat()}"
-        )
-        return response
+        pd.DataFrame: The same columns as `pd.DataFrame(build_results(...))`, except that
+        `scheduled_departure` and `real_departure` already are ISO formatted strings and the
+        `uuid` string column is replaced by the uint64 halves `uid_hi` and `uid_lo`
+        (see `with_uuid_strings`).
+    """
+    time_keys = ["year", "month", "day", "hour", "minute"]
+    scheduled_parts = {key: [] for key in time_keys}
+    real_parts = {key: [] for key in time_keys}
+    has_real = []
+    columns = {
+        "stop": [],
+        "platform": [],
+        "line": [],
+        "direction": [],
+        "delay_min": [],
+        "connection_exists": [],
+        "delay_reason": [],
+        "realtime_status": [],
+        "status_text": [],
+    }
 
-    def make_uid(stop, scheduled_datetime, line):
-        """Generates a unique identifier for each departure based on stop, scheduled datetime, and line."""
-        return str(
-            uuid.uuid5(uuid.NAMESPACE_DNS, f"{stop}|{scheduled_datetime}|{line}")
-        )
+    # Single pass over the departures, only pulling out raw values
+    for dep in departures:
+        scheduled = dep.get("dateTime") or {}
+        real = dep.get("realDateTime") or {}
+        serving_line = dep.get("servingLine", {})
+        for key in time_keys:
+            scheduled_parts[key].append(scheduled.get(key, _MISSING))
+            real_parts[key].append(real.get(key, _MISSING))
+        has_real.append(bool(real))
 
-    def build_results(datetime_dt, make_uid, departures):
-        """Builds a list of dictionaries containing the departure information."""
-        results = []
-        for dep in departures:
-            stop_name = dep.get("stopName")
-            platform = dep.get("platformName", dep.get("platform"))
-            scheduled = dep.get("dateTime", {})
-            real = dep.get("realDateTime", {})
+        delay = serving_line.get("delay")
+        columns["stop"].append(dep.get("stopName"))
+        columns["platform"].append(dep.get("platformName", dep.get("platform")))
+        columns["line"].append(serving_line.get("number"))
+        columns["direction"].append(serving_line.get("direction"))
+        columns["delay_min"].append(int(delay) if delay not in (None, "", "-9999") else None)
+        columns["connection_exists"].append(not (str(serving_line.get("cancelled")) == "1"))
+        columns["delay_reason"].append(serving_line.get("delayReason"))
+        columns["realtime_status"].append(serving_line.get("realtimeStatus"))
+        columns["status_text"].append(serving_line.get("statusText"))
 
-            # Build full datetime for scheduled and real departure
-            try:
-                scheduled_dt = datetime(
-                    int(scheduled.get("year", datetime_dt.year)),
-                    int(scheduled.get("month", datetime_dt.month)),
-                    int(scheduled.get("day", datetime_dt.day)),
-                    int(scheduled.get("hour", 0)),
-                    int(scheduled.get("minute", 0)),
-                )
-            except Exception:
-                scheduled_dt = None
-            try:
-                real_dt = (
-                    datetime(
-                        int(real.get("year", datetime_dt.year)),
-                        int(real.get("month", datetime_dt.month)),
-                        int(real.get("day", datetime_dt.day)),
-                        int(real.get("hour", 0)),
-                        int(real.get("minute", 0)),
-                    )
-                    if real
-                    else None
-                )
-            except Exception:
-                real_dt = None
-
-            line = dep.get("servingLine", {}).get("number")
-            direction = dep.get("servingLine", {}).get("direction")
-            delay = dep.get("servingLine", {}).get("delay")
-            cancelled = dep.get("servingLine", {}).get("cancelled")
-            connection_exists = not (str(cancelled) == "1")
-            # Additional fields
-            delay_reason = dep.get("servingLine", {}).get("delayReason")
-            realtime_status = dep.get("servingLine", {}).get("realtimeStatus")
-            status_text = dep.get("servingLine", {}).get("statusText")
-
-            uid = make_uid(stop_name, scheduled_dt, line)
-
-            results.append(
-                {
-                    "uuid": uid,
-                    "stop": stop_name,
-                    "platform": platform,
-                    "line": line,
-                    "direction": direction,
-                    "scheduled_departure": scheduled_dt,
-                    "real_departure": real_dt,
-                    "scheduled_time": scheduled_dt.time() if scheduled_dt else None,
-                    "scheduled_date_iso": scheduled_dt.date().isoformat()
-                    if scheduled_dt
-                    else None,
-                    "delay_min": int(delay)
-                    if delay not in (None, "", "-9999")
-                    else None,
-                    "connection_exists": connection_exists,
-                    "delay_reason": delay_reason,
-                    "realtime_status": realtime_status,
-                    "status_text": status_text,
-                }
-            )
+    if not has_real:
+        return pd.DataFrame()
 
-        return results
+    scheduled_dt = _assemble_datetimes(scheduled_parts, datetime_dt)
+    real_dt = _assemble_datetimes(real_parts, datetime_dt)
+    real_dt[~np.array(has_real)] = np.datetime64("NaT", "m")
+    valid = ~np.isnat(scheduled_dt)
 
-    # Prepare the parameters for the API request
-    params = {
+    scheduled_iso = _format_datetimes(scheduled_dt, "s", np.nan)
+    # make_uid hashes str(datetime), which is "None" for missing scheduled times
+    uid_times = [t.replace("T", " ") if ok else "None" for t, ok in zip(scheduled_iso, valid)]
+    uid_hi, uid_lo = departure_ids(columns["stop"], uid_times, columns["line"])
+    scheduled_time = np.full(len(valid), None, dtype=object)
+    scheduled_time[valid] = [d.time() for d in scheduled_dt[valid].astype(object)]
+
+    return pd.DataFrame(
+        {
+            "uid_hi": uid_hi,
+            "uid_lo": uid_lo,
+            "stop": columns["stop"],
+            "platform": columns["platform"],
+            "line": columns["line"],
+            "direction": columns["direction"],
+            "scheduled_departure": pd.Series(scheduled_iso, dtype="str"),
+            "real_departure": pd.Series(_format_datetimes(real_dt, "s", np.nan), dtype="str"),
+            "scheduled_time": scheduled_time,
+            "scheduled_date_iso": _format_datetimes(scheduled_dt, "D", None),
+            "delay_min": pd.Series(columns["delay_min"]),
+            "connection_exists": columns["connection_exists"],
+            "delay_reason": columns["delay_reason"],
+            "realtime_status": columns["realtime_status"],
+            "status_text": columns["status_text"],
+        }
+    )
+
+
+def with_uuid_strings(df):
+    """
+    Converts the internal `uid_hi`/`uid_lo` ID columns into the `uuid` string column used in the
+    CSV, the archive and the GeoJSON. DataFrames that already have `uuid` are returned unchanged.
+    """
+    if "uid_hi" not in df.columns:
+        return df
+    uuids = halves_to_strings(df["uid_hi"].to_numpy(), df["uid_lo"].to_numpy())
+    df = df.drop(columns=["uid_hi", "uid_lo"])
+    df.insert(0, "uuid", uuids)
+    return df
+
+
+def build_request_params(datetime_dt, place_dm, name_dm):
+    """Builds the query parameters for a departure monitor (DM) request."""
+    return {
         "language": "de",
         "mode": "direct",
         "outputFormat": "JSON",
@@ -187,158 +465,450 @@ def full_api_request(datetime_dt, place_dm, name_dm):
         "name_dm": name_dm,
     }
 
-    # Create a text file to store the raw API responses (Debugging purposes)
-    textfile = full_request_text_target
-    if not textfile.exists():
-        textfile.touch()
 
-    # API URL for the VRR (Verkehrsverbund Rhein-Ruhr) departures
-    # This URL is used to fetch the departure information based on the parameters provided
-    # The API is expected to return a JSON response with the departure details
-    API_URL = "https://efa.vrr.de/standard/XML_DM_REQUEST"
+def write_raw_response(body, stop=None, request_time=None):
+    """Appends a raw API response (the undecoded bytes) to the compressed response archive."""
+    if raw_response_archive is None:
+        return
+    try:
+        entry = raw_response_archive.append(body, stop, request_time)
+        logging.info(f"Response archived in {entry['segment']} at offset {entry['offset']}")
+    except Exception as e:
+        logging.error(f"Error archiving the response: {e}")
+
+
+# LUT (Lookup Table) for replacing special characters in the stop, direction, and line names
+# This is necessary to ensure that the data is clean and consistent, in this case for German characters
+NAME_LUT = {"Ã¼": "ü", "Ã¶": "ö", "Ã¤": "ä", "ÃŸ": "ß", "Ã": "ß"}
+
+
+def clean_names(df_departures):
+    """Replaces the mis-decoded German characters in the name columns (in place)."""
+    for col in ["stop", "direction", "line"]:
+        df_departures[col] = df_departures[col].replace(NAME_LUT, regex=True)
+
+
+def departures_to_dataframe(datetime_dt, departures, columnar=True):
+    """
+    Converts the departures of an API response into the departure DataFrame.
+
+    Args:
+        datetime_dt (datetime): The date and time the departures were requested for.
+        departures (iterable of dict): The `departureList` items of the response (a list or a stream).
+        columnar (bool): Use the columnar parser `build_columns` (default) instead of the
+            row-by-row `build_results`. Both produce the same DataFrame.
+
+    Returns:
+        pd.DataFrame: One row per departure, with cleaned names and ISO formatted times.
+    """
+    # Build the results from the departures
+    if columnar:
+        df_departures = build_columns(datetime_dt, departures)
+    else:
+        df_departures = pd.DataFrame(build_results(datetime_dt, make_uid, departures))
+    if df_departures.empty:
+        return df_departures
+
+    clean_names(df_departures)
+
+    if not columnar:
+        # Convert the scheduled and real departure times to ISO format
+        df_departures["scheduled_departure"] = pd.to_datetime(
+            df_departures["scheduled_departure"], errors="coerce"
+        ).dt.strftime("%Y-%m-%dT%H:%M:%S")
+        df_departures["real_departure"] = pd.to_datetime(
+            df_departures["real_departure"], errors="coerce"
+        ).dt.strftime("%Y-%m-%dT%H:%M:%S")
+
+    return df_departures
+
+
+def process_response_body(datetime_dt, body, content_type, stream_json=False, stop=None):
+    """
+    Archives a raw response body and turns it into the departure DataFrame, decoding it only once.
+
+    Args:
+        datetime_dt (datetime): The date and time the departures were requested for.
+        body (bytes): Raw response body; the same buffer is archived and parsed.
+        content_type (str or None): Content-Type header of the response (determines the charset).
+        stream_json (bool): Yield the `departureList` items one at a time instead of decoding the whole document.
+        stop (str, optional): The requested stop, recorded in the index of the response archive.
+
+    Returns:
+        pd.DataFrame: Same DataFrame as returned by `departures_to_dataframe`.
+    """
+    # Archive the raw response for debugging purposes
+    write_raw_response(body, stop, datetime_dt)
+
+    encoding = response_encoding(content_type)
+    if stream_json:
+        departures = iter_departures(body, encoding)
+    else:
+        departures = decode_body(body, encoding).get("departureList") or []
+    return departures_to_dataframe(datetime_dt, departures)
+
+
+# Main function to fetch and process public transport departure information from the VRR API
+def full_api_request(datetime_dt, place_dm, name_dm, stream_json=False):
+    """
+    Fetches and processes public transport departure information from the VRR API for a given stop and datetime.
+    Args:
+        datetime_dt (datetime): The date and time for which departures are requested.
+        place_dm (str): The place or city of the stop.
+        name_dm (str): The name of the stop.
+        stream_json (bool): Parse the `departureList` items incrementally (see `process_response_body`).
+    Returns:
+        tuple:
+            - pd.DataFrame: DataFrame containing processed departure information with fields such as stop, platform, line, direction, scheduled and real departure times, delay, and status.
+            - int: HTTP status code of the API response.
+    Raises:
+        EFARequestError: If the API returns an unsuccessful status code (carries status code and Retry-After).
+        requests.exceptions.RequestException: If the API request itself fails.
+    Side Effects:
+        - Logs API request and response status.
+        - Appends raw API responses to the compressed response archive.
+    """
+    # Prepare the parameters for the API request
+    params = build_request_params(datetime_dt, place_dm, name_dm)
 
     # Make the API request
     logging.info(
-        f"Making API request for {place_dm} {name_dm} at {datetime_dt.isoformat()}"
+        f"Making API request for {stop_label(place_dm, name_dm)} at {datetime_dt.isoformat()}"
     )
+    request_start = time.perf_counter()
     response = requests.get(API_URL, params=params)
+    latency_s = time.perf_counter() - request_start
 
     # Handle the response
-    response = communicate_response(response, place_dm, name_dm, datetime_dt)
+    communicate_response(response.status_code, place_dm, name_dm, datetime_dt)
 
     # Check if the response is successful and contains data
-    if response.status_code in [200, 204]:
-        # Write the raw response to a text file for debugging purposes
-        try:
-            with open(textfile, "a", encoding="utf-8") as f:
-                f.write(response.text + "\n\n")
-            logging.info(f"Response written to {textfile}")
-        except Exception as e:
-            logging.error(f"Error writing to {textfile}: {e}")
-        data = response.json()
-    else:
-        # If the response is not successful, return an empty DataFrame and the status code
+    if response.status_code not in [200, 204]:
+        # If the response is not successful, raise with the status code
         logging.error(
-            f"Failed to fetch data for {place_dm} {name_dm} at {datetime_dt.isoformat()}"
+            f"Failed to fetch data for {stop_label(place_dm, name_dm)} at {datetime_dt.isoformat()}"
         )
-        raise requests.exceptions.RequestException(
-            f"Request failed with status code {response.status_code} for {place_dm} {name_dm} at {datetime_dt.isoformat()}"
+        raise EFARequestError(
+            f"Request failed with status code {response.status_code} for {stop_label(place_dm, name_dm)} at {datetime_dt.isoformat()}",
+            response.status_code,
+            parse_retry_after(response.headers.get("Retry-After")),
         )
 
-    # Extract the departure list from the response data
-    departures = data.get("departureList", [])
+    df_departures = process_response_body(
+        datetime_dt,
+        response.content,
+        response.headers.get("Content-Type"),
+        stream_json,
+        stop_label(place_dm, name_dm),
+    )
+    # Carried along to `append_new_departures` for the poll telemetry
+    df_departures.attrs.update(latency_s=latency_s, size_bytes=len(response.content))
+    return df_departures, response.status_code
 
-    # Build the results from the departures
-    df_departures = pd.DataFrame(build_results(datetime_dt, make_uid, departures))
 
-    # LUT (Lookup Table) for replacing special characters in the stop, direction, and line names
-    # This is necessary to ensure that the data is clean and consistent, in this case for German characters
-    lut = {"Ã¼": "ü", "Ã¶": "ö", "Ã¤": "ä", "ÃŸ": "ß", "Ã": "ß"}
-    for col in ["stop", "direction", "line"]:
-        df_departures[col] = df_departures[col].replace(lut, regex=True)
+# Async counterpart of full_api_request, sharing the pooled session of an ingest cycle
+async def full_api_request_async(session, datetime_dt, place_dm, name_dm, stream_json=False):
+    """
+    Fetches and processes departure information like `full_api_request`, but without blocking the event loop.
 
-    # Convert the scheduled and real departure times to ISO format
-    df_departures["scheduled_departure"] = pd.to_datetime(
-        df_departures["scheduled_departure"], errors="coerce"
-    ).dt.strftime("%Y-%m-%dT%H:%M:%S")
-    df_departures["real_departure"] = pd.to_datetime(
-        df_departures["real_departure"], errors="coerce"
-    ).dt.strftime("%Y-%m-%dT%H:%M:%S")
+    Args:
+        session (aiohttp.ClientSession): Shared keep-alive session used for all requests of a cycle.
+        datetime_dt (datetime): The date and time for which departures are requested.
+        place_dm (str): The place or city of the stop.
+        name_dm (str): The name of the stop.
+        stream_json (bool): Parse the `departureList` items incrementally (see `process_response_body`).
 
-    # return df_departures, response.status_code
-    return df_departures, response.status_code
+    Returns:
+        tuple:
+            - pd.DataFrame: Same DataFrame as returned by `full_api_request`.
+            - int: HTTP status code of the API response.
+
+    Raises:
+        EFARequestError: If the API returns an unsuccessful status code.
+        aiohttp.ClientError: If the connection itself fails.
+    """
+    params = build_request_params(datetime_dt, place_dm, name_dm)
+
+    logging.info(
+        f"Making API request for {stop_label(place_dm, name_dm)} at {datetime_dt.isoformat()}"
+    )
+    request_start = time.perf_counter()
+    async with session.get(API_URL, params=params) as response:
+        status_code = communicate_response(
+            response.status, place_dm, name_dm, datetime_dt
+        )
+        if status_code not in [200, 204]:
+            logging.error(
+                f"Failed to fetch data for {stop_label(place_dm, name_dm)} at {datetime_dt.isoformat()}"
+            )
+            raise EFARequestError(
+                f"Request failed with status code {status_code} for {stop_label(place_dm, name_dm)} at {datetime_dt.isoformat()}",
+                status_code,
+                parse_retry_after(response.headers.get("Retry-After")),
+            )
+        body = await response.read()
+        content_type = response.headers.get("Content-Type")
+    latency_s = time.perf_counter() - request_start
+
+    # File I/O and parsing are blocking, keep them off the event loop
+    df_departures = await asyncio.to_thread(
+        process_response_body,
+        datetime_dt,
+        body,
+        content_type,
+        stream_json,
+        stop_label(place_dm, name_dm),
+    )
+    df_departures.attrs.update(latency_s=latency_s, size_bytes=len(body))
+    return df_departures, status_code
+
+
+# Write the station features with the direct GeoJSON writer, plus the compressed variants
+def write_station_features(features, geodata_target):
+    """
+    Writes station features to the GeoJSON file (atomically) and its gzip/brotli variants.
 
+    Args:
+        features (list of dict): GeoJSON point features, e.g. from `station_features`.
+        geodata_target (str or Path): Path to the output GeoJSON file.
+    """
+    data = write_geojson(features, geodata_target)
+    # gzip/brotli variants for the web server, so it never compresses per request
+    write_compressed_variants(geodata_target, data)
+
+
+# Build the geodata from the in-memory per-stop buffers instead of re-reading the history
+def update_geodata_from_buffers(stop_buffers, station_cache, geodata_target):
+    """
+    Updates the station GeoJSON from the in-memory departure buffers.
+
+    Args:
+        stop_buffers (StopBuffers): Latest departures per stop, kept up to date by the ingest loop.
+        station_cache (StationGeometryCache): Station geometries, reloaded only if the source file changed.
+        geodata_target (str or Path): Path to the output GeoJSON file.
+    """
+    write_station_features(station_features(stop_buffers, station_cache), geodata_target)
+
+
+# Build the station features in memory, for consumers that do not read the GeoJSON file
+def station_features(stop_buffers, station_cache, stops=None):
+    """
+    Builds GeoJSON point features from the in-memory departure buffers.
+
+    Args:
+        stop_buffers (StopBuffers): Latest departures per stop.
+        station_cache (StationGeometryCache): Station geometries (EPSG:4326).
+        stops (iterable of str, optional): Only build these stops (default: all stations).
+
+    Returns:
+        list of dict: Features with the same properties as the station GeoJSON file, in station
+        order, for every stop that has a geometry and buffered departures.
+    """
+    station_cache.refresh()
+    selected = station_cache.stops
+    if stops is not None:
+        wanted = set(stops)
+        selected = [stop for stop in selected if stop in wanted]
+
+    features = []
+    for props in stop_buffers.to_records(selected):
+        features.append(
+            {
+                "type": "Feature",
+                "properties": props,
+                "geometry": {"type": "Point", "coordinates": list(station_cache.get(props["stop"]))},
+            }
+        )
+    return features
 
-# Function to update geospatial data with the latest departure information
-def update_geodata(csv_file_path, geodata_file_path, geodata_target, n_data: int):
+
+# Load the most recent departures to seed the per-stop buffers at startup
+def load_recent_departures(csv_file_path, departure_store=None):
     """
-    Updates geospatial data by aggregating the latest departure information for each stop.
+    Loads the departure history needed to fill the per-stop buffers after a (re)start.
 
     Args:
         csv_file_path (str or Path): Path to the CSV file containing departure data.
-        geodata_file_path (str or Path): Path to the input geospatial file (e.g., shapefile).
-        geodata_target (str or Path): Path to the output GeoJSON file where the updated geodata will be saved.
-        n_data (int): Number of latest departures to aggregate per stop.
-
-    The function reads the latest departure records from the CSV, aggregates the last `n_data` departures for each stop,
-    and merges this information into a new GeoDataFrame with one row per stop. The result is saved as a GeoJSON file.
-    """
-    # Define the number of rows to load from the CSV file
-    row_load = n_data * 40
-
-    # Load the CSV file into a DataFrame, get the last 200 rows
-    df = pd.read_csv(
-        csv_file_path,
-        usecols=[
-            "uuid",
-            "stop",
-            "platform",
-            "line",
-            "direction",
-            "scheduled_departure",
-            "real_departure",
-            "delay_min",
-            "connection_exists",
-        ],
-    ).tail(row_load)
+        departure_store (DepartureStore, optional): Read from the recent partitions of this archive instead.
 
-    # Load the geodata shapefile
-    gdf = gpd.read_file(geodata_file_path)
+    Returns:
+        pd.DataFrame: Departures with the columns in `BUFFER_COLUMNS` (empty if there is no history yet).
+    """
+    date_from = (datetime.now() - timedelta(days=1)).date().isoformat()
+    try:
+        if departure_store is not None:
+            return departure_store.read(columns=BUFFER_COLUMNS, date_from=date_from)
+        return read_csv_since(
+            csv_file_path,
+            "scheduled_date_iso",
+            date_from,
+            usecols=BUFFER_COLUMNS,
+            dtype=DEPARTURE_DTYPES,
+        )
+    except FileNotFoundError:
+        return pd.DataFrame(columns=BUFFER_COLUMNS)
+
+
+# Load the UUIDs of the recent departures that were already written to the CSV file
+def load_dedup_index(csv_file_path, departure_store=None, horizon_days=2):
+    """
+    Builds the dedup index from the departures stored within the last `horizon_days` days.
+
+    Older departures can never be returned by the API again, so only the end of the CSV file
+    (or the recent partitions of the archive) has to be read.
+
+    Args:
+        csv_file_path (str or Path): Path to the CSV file containing departure data.
+        departure_store (DepartureStore, optional): Read the UUIDs from this archive instead.
+        horizon_days (int): Number of days before today whose departures are kept in the index.
 
-    # Create a new DataFrame which will get the last 10 departures for each stop and put them into lists for each column so that only one row per stop is created
-    new_data = []
-    for stop in gdf["stop"].unique():
-        stop_data = (
-            df[df["stop"] == stop].sort_values(by="scheduled_departure").tail(n_data)
+    Returns:
+        DedupIndex: UUIDs (128-bit integers) of the recent stored departures, empty if the file does not exist yet.
+    """
+    dedup_index = DedupIndex(horizon_days)
+    columns = ["uuid", "scheduled_date_iso"]
+    try:
+        if departure_store is not None:
+            existing_df = departure_store.read(columns=columns, date_from=dedup_index.cutoff())
+        else:
+            existing_df = read_csv_since(
+                csv_file_path,
+                "scheduled_date_iso",
+                dedup_index.cutoff(),
+                usecols=columns,
+                dtype=DEPARTURE_DTYPES,
+            )
+        existing_df = existing_df.dropna(subset=["uuid"])
+        dedup_index.add(
+            strings_to_ints(existing_df["uuid"].astype(str)),
+            existing_df["scheduled_date_iso"],
         )
-        if not stop_data.empty:
-            # Create a dictionary for the stop with lists of the last 10 departures
-            new_data.append(
-                {
-                    "stop": stop,
-                    "departures": stop_data["uuid"].fillna("").tolist(),
-                    "platforms": stop_data["platform"].fillna("").tolist(),
-                    "lines": stop_data["line"].fillna("").tolist(),
-                    "directions": stop_data["direction"].fillna("").tolist(),
-                    "scheduled_departures": stop_data["scheduled_departure"]
-                    .fillna("")
-                    .tolist(),
-                    "real_departures": stop_data["real_departure"].fillna("").tolist(),
-                    "delays": stop_data["delay_min"].fillna(0).tolist(),
-                    "connection_exists": stop_data["connection_exists"]
-                    .fillna("")
-                    .tolist(),
-                }
+        logging.info(f"Loaded {len(dedup_index)} existing UUIDs.")
+    except FileNotFoundError:
+        logging.info("No existing UUIDs found, starting fresh.")
+    return dedup_index
+
+
+# Append the departures of one request to the CSV file, skipping known UUIDs
+def append_new_departures(df, dedup_index, place_dm, name_dm, status_code):
+    """
+    Appends all departures that are not yet known to the departure CSV (or the columnar
+    archive, if one was selected with `init_storage`).
+
+    Args:
+        df (pd.DataFrame): Departures as returned by `full_api_request`.
+        dedup_index (DedupIndex): UUIDs (128-bit integers) that are already stored. Updated in place.
+        place_dm (str): The place or city of the stop (for logging).
+        name_dm (str): The name of the stop (for logging).
+        status_code (int): HTTP status code of the API response (for logging).
+
+    Returns:
+        pd.DataFrame: The rows that were actually appended, with the `uuid` string column.
+    """
+    if df.empty:
+        logging.info(
+            f"No departures found for {stop_label(place_dm, name_dm)}. Status code: {status_code}"
+        )
+        record_poll(df, place_dm, name_dm, status_code, 0)
+        return df
+
+    keys = departure_keys(df)
+    is_new = np.array(dedup_index.is_new(keys), dtype=bool)
+    new_df = with_uuid_strings(df[is_new])
+
+    if not new_df.empty:
+        if departure_archive is not None:
+            departure_archive.append(new_df)
+        else:
+            new_df.to_csv(
+                csv_file_target,
+                mode="a",
+                header=not csv_file_target.exists()
+                or csv_file_target.stat().st_size == 0,
+                index=False,
             )
+        dedup_index.add(
+            [key for key, new in zip(keys, is_new) if new], new_df["scheduled_date_iso"]
+        )
+
+        logging.info(
+            f"Appended {len(new_df)} new departures. Status code: {status_code}"
+        )
+    else:
+        logging.info("No new UUIDs to append.")
+    record_poll(df, place_dm, name_dm, status_code, len(new_df))
+    return new_df
+
 
-    # Create a new GeoDataFrame from the new data
-    new_gdf = gpd.GeoDataFrame(
-        new_data,
-        geometry=gdf.geometry[gdf["stop"].isin([d["stop"] for d in new_data])].values,
-        crs=gdf.crs,
+# Record a processed response in the poll telemetry
+def record_poll(df, place_dm, name_dm, status_code, new):
+    """Records the departures of a response, and its latency and size (from `df.attrs`)."""
+    poll_telemetry.record(
+        stop_label(place_dm, name_dm),
+        returned=len(df),
+        new=new,
+        latency_s=df.attrs.get("latency_s"),
+        size_bytes=df.attrs.get("size_bytes"),
+        status=status_code,
     )
 
-    # Save the new GeoDataFrame to the target geojson file
-    if not geodata_target.parent.exists():
-        geodata_target.parent.mkdir(parents=True)
-    new_gdf.to_file(geodata_target, driver="GeoJSON")
+
+# Feed the outcome of a request into the shared rate limiter and the circuit breaker of its stop
+def record_request_outcome(limiter, breaker, error=None):
+    """
+    Updates the rate limiter and the stop's circuit breaker after a request.
+
+    Args:
+        limiter (TokenBucket): Rate limiter shared by all requests.
+        breaker (CircuitBreaker): Circuit breaker of the requested stop.
+        error (Exception, optional): The exception raised by the request, None on success.
+
+    429/503 pause the shared limiter (honoring Retry-After). Every failure except 429, which
+    says nothing about the stop itself, counts towards opening the stop's circuit breaker. A
+    half-open breaker lets exactly one probe through, so any failed probe (429 included)
+    re-opens it; otherwise the stop would never be polled again.
+    """
+    if error is None:
+        limiter.record_success()
+        breaker.record_success()
+        return
+    status_code = getattr(error, "status_code", None)
+    retry_after = getattr(error, "retry_after", None)
+    if status_code in THROTTLE_STATUS_CODES:
+        limiter.penalize(retry_after)
+    if status_code != 429 or breaker.state == CircuitBreaker.HALF_OPEN:
+        breaker.record_failure(retry_after)
 
 
 # Main function to handle the API requests and manage the CSV file
-def main(delay_min, placename_list, n_entries):
+def main(
+    delay_min,
+    placename_list,
+    n_entries,
+    request_rate=1.0,
+    burst=4,
+    stream_json=False,
+    dedup_horizon_days=2,
+):
     """
     Main loop for periodically fetching and updating geodata for a list of placenames.
     Args:
         delay_min (float): The total delay in minutes to space out all requests within a cycle.
         placename_list (list of tuple): List of tuples, each containing (place_dm, name_dm) for API requests.
         n_entries (int): Number of entries to include when updating geodata.
+        request_rate (float): Maximum sustained requests per second (token bucket).
+        burst (int): Maximum burst size of the token bucket.
+        stream_json (bool): Parse the `departureList` of each response incrementally.
+        dedup_horizon_days (int): Days before today whose departure UUIDs are kept for deduplication.
     Behavior:
-        - Loads existing UUIDs from the target CSV to avoid duplicate entries.
+        - Loads the UUIDs of the recent departures from the target CSV to avoid duplicate entries.
+        - Seeds the in-memory per-stop departure buffers from the history.
         - In an infinite loop:
-            - Updates geodata from source to target files.
+            - Updates geodata from the per-stop buffers.
             - For each placename in the list:
-                - Makes an API request for departures.
-                - Appends new, unique departures to the CSV.
+                - Skips the stop while its circuit breaker is open.
+                - Makes an API request for departures, paced by the shared rate limiter.
+                - Appends new, unique departures to the CSV and the per-stop buffers.
                 - Waits for a calculated delay between requests.
             - Waits before starting the next cycle.
         - Handles and logs errors gracefully, continuing operation after recoverable failures.
@@ -347,7 +917,7 @@ def main(delay_min, placename_list, n_entries):
             - csv_file_target: Path to the CSV file for storing departures.
             - bahnhoefe_geodata_source: Source geodata file path.
             - bahnhoefe_geojson_target: Target GeoJSON file path.
-            - update_geodata: Function to update geodata.
+            - update_geodata_from_buffers: Function to update geodata.
             - full_api_request: Function to perform the API request.
     """
     total_requests = len(placename_list)
@@ -361,28 +931,35 @@ def main(delay_min, placename_list, n_entries):
     )
     logging.info("Starting the request loop...")
 
-    # Load existing UUIDs only once at the start
-    try:
-        existing_df = pd.read_csv(csv_file_target, usecols=["uuid"])
-        existing_uuids = set(existing_df["uuid"].dropna().astype(str))
-        logging.info(f"Loaded {len(existing_uuids)} existing UUIDs.")
-    except FileNotFoundError:
-        existing_uuids = set()
-        logging.info("No existing UUIDs found, starting fresh.")
+    # Load the UUIDs of the recent departures only once at the start
+    dedup_index = load_dedup_index(csv_file_target, departure_archive, dedup_horizon_days)
+
+    # Latest departures per stop, seeded from the history and then updated in memory
+    stop_buffers = StopBuffers(n_entries)
+    stop_buffers.extend(load_recent_departures(csv_file_target, departure_archive))
+    station_cache = StationGeometryCache(bahnhoefe_geodata_source)
+
+    # Shared rate limiter and one circuit breaker per stop
+    limiter = TokenBucket(request_rate, burst)
+    breakers = {}
 
     # Main loop
     while True:
         logging.info("Starting a new cycle of requests...")
+        report_poll_telemetry()
+        poll_telemetry.start_cycle()
+        evicted = dedup_index.evict()
+        if evicted:
+            logging.info(f"Dropped {evicted} UUIDs older than the dedup horizon.")
 
         for place_dm, name_dm in placename_list:
-            
+
             # Update the geodata with the new departures
             try:
-                update_geodata(
-                    csv_file_target,
-                    bahnhoefe_geodata_source,
+                update_geodata_from_buffers(
+                    stop_buffers,
+                    station_cache,
                     bahnhoefe_geojson_target,
-                    n_entries,
                 )
                 logging.info(f"Geodata updated and saved to {bahnhoefe_geojson_target}.")
             except Exception as e:
@@ -390,47 +967,48 @@ def main(delay_min, placename_list, n_entries):
                     f"Error updating geodata: {e}. This may be harmless if you just started the script for the first time."
                 )
 
+            breaker = breakers.setdefault((place_dm, name_dm), CircuitBreaker())
+            if not breaker.allow_request():
+                logging.info(
+                    f"Circuit open for {stop_label(place_dm, name_dm)}, next probe in {round(breaker.seconds_until_probe())} s."
+                )
+                continue
+
             try:
+                limiter.acquire_blocking()
                 datetime_dt = datetime.now()
 
-                df, status_code = full_api_request(datetime_dt, place_dm, name_dm)
-
-                if not df.empty:
-                    df["uuid"] = df["uuid"].astype(str)
-                    new_df = df[~df["uuid"].isin(existing_uuids)]
-
-                    if not new_df.empty:
-                        new_df.to_csv(
-                            csv_file_target,
-                            mode="a",
-                            header=not existing_uuids,
-                            index=False,
-                        )
-                        existing_uuids.update(new_df["uuid"])
-
-                        logging.info(
-                            f"Appended {len(new_df)} new departures. Status code: {status_code}"
-                        )
-                    else:
-                        logging.info("No new UUIDs to append.")
-                else:
-                    logging.info(
-                        f"No departures found for {place_dm} - {name_dm}. Status code: {status_code}"
+                try:
+                    df, status_code = full_api_request(
+                        datetime_dt, place_dm, name_dm, stream_json
+                    )
+                except Exception as e:
+                    # Any failure (also an unparsable response) resolves the request and is
+                    # counted as a failed poll, like `process_cycle_results` does for async
+                    record_request_outcome(limiter, breaker, e)
+                    poll_telemetry.record(
+                        stop_label(place_dm, name_dm), status=getattr(e, "status_code", None), error=True
                     )
+                    raise
+                record_request_outcome(limiter, breaker)
+                new_df = append_new_departures(
+                    df, dedup_index, place_dm, name_dm, status_code
+                )
+                stop_buffers.extend(new_df)
 
                 logging.info(f"Sleeping for {round(request_delay/60, 2)} minutes.")
                 time.sleep(request_delay)
 
             except requests.exceptions.RequestException as e:
                 logging.error(
-                    f"Request failed for {place_dm} - {name_dm} ({status_code}): {e}"
+                    f"Request failed for {stop_label(place_dm, name_dm)} ({getattr(e, 'status_code', None)}): {e}"
                 )
                 time.sleep(request_delay)
                 continue
 
             except Exception as e:
                 logging.error(
-                    f"An error occurred while processing {place_dm} - {name_dm}: {e}"
+                    f"An error occurred while processing {stop_label(place_dm, name_dm)}: {e}"
                 )
                 time.sleep(request_delay)
                 continue
@@ -439,25 +1017,491 @@ def main(delay_min, placename_list, n_entries):
         logging.info("Next cycle...")
 
 
+# Fetch all stations of one cycle in parallel, limited by a semaphore
+async def fetch_cycle_async(
+    session, semaphore, placename_list, limiter, breakers, stream_json=False
+):
+    """
+    Requests the departures of all placenames concurrently.
+
+    Args:
+        session (aiohttp.ClientSession): Shared keep-alive session.
+        semaphore (asyncio.Semaphore): Limits the number of requests in flight.
+        placename_list (list of tuple): List of (place_dm, name_dm) tuples.
+        limiter (TokenBucket): Rate limiter shared by all requests.
+        breakers (dict): Circuit breakers keyed by (place_dm, name_dm), filled on demand.
+        stream_json (bool): Parse the `departureList` of each response incrementally.
+
+    Returns:
+        list: One entry per placename, either a `(DataFrame, status_code)` tuple, the raised
+        exception, or None if the stop was skipped because its circuit breaker is open.
+    """
+
+    async def fetch_one(place_dm, name_dm):
+        breaker = breakers.setdefault((place_dm, name_dm), CircuitBreaker())
+        if not breaker.allow_request():
+            return None
+        async with semaphore:
+            await limiter.acquire()
+            try:
+                result = await full_api_request_async(
+                    session, datetime.now(), place_dm, name_dm, stream_json
+                )
+            except Exception as e:
+                # Any failure (also an unparsable response) resolves the request
+                record_request_outcome(limiter, breaker, e)
+                raise
+            record_request_outcome(limiter, breaker)
+            return result
+
+    return await asyncio.gather(
+        *(fetch_one(place_dm, name_dm) for place_dm, name_dm in placename_list),
+        return_exceptions=True,
+    )
+
+
+# Append the results of one async cycle and collect the stops whose buffers changed
+def process_cycle_results(placename_list, results, dedup_index, stop_buffers):
+    """
+    Appends the new departures of a cycle in placename order and feeds the per-stop buffers.
+
+    Args:
+        placename_list (list of tuple): List of (place_dm, name_dm) tuples.
+        results (list): Result of `fetch_cycle_async`, one entry per placename.
+        dedup_index (DedupIndex): UUIDs of the stored departures. Updated in place.
+        stop_buffers (StopBuffers): Latest departures per stop. Updated in place.
+
+    Returns:
+        set: Names of the stops whose buffered departures changed.
+    """
+    changed = set()
+    for (place_dm, name_dm), result in zip(placename_list, results):
+        if result is None:
+            logging.info(f"Circuit open for {stop_label(place_dm, name_dm)}, skipped.")
+            continue
+        if isinstance(result, Exception):
+            logging.error(f"Request failed for {stop_label(place_dm, name_dm)}: {result}")
+            poll_telemetry.record(
+                stop_label(place_dm, name_dm), status=getattr(result, "status_code", None), error=True
+            )
+            continue
+        df, status_code = result
+        try:
+            new_df = append_new_departures(df, dedup_index, place_dm, name_dm, status_code)
+            changed |= stop_buffers.extend(new_df)
+        except Exception as e:
+            logging.error(
+                f"An error occurred while processing {stop_label(place_dm, name_dm)}: {e}"
+            )
+    return changed
+
+
+# Async main loop: fetches all stations of a cycle in parallel instead of one after another
+async def main_async(
+    delay_min,
+    placename_list,
+    n_entries,
+    max_concurrency=4,
+    request_rate=1.0,
+    burst=4,
+    stream_json=False,
+    dedup_horizon_days=2,
+    on_cycle=None,
+    write_geojson_file=True,
+    scheduler=None,
+    adaptive=None,
+):
+    """
+    Async variant of `main` which fetches all placenames of a cycle concurrently.
+
+    Args:
+        delay_min (float): Target duration of one cycle in minutes.
+        placename_list (list of tuple): List of tuples, each containing (place_dm, name_dm) for API requests.
+        n_entries (int): Number of entries to include when updating geodata.
+        max_concurrency (int): Maximum number of requests in flight at the same time.
+        request_rate (float): Maximum sustained requests per second (token bucket).
+        burst (int): Maximum burst size of the token bucket.
+        stream_json (bool): Parse the `departureList` of each response incrementally.
+        dedup_horizon_days (int): Days before today whose departure UUIDs are kept for deduplication.
+        on_cycle (callable, optional): Called in the event loop with the GeoJSON features of the
+            changed stops (see `station_features`): once with all stops at startup, then after
+            every cycle that changed at least one stop.
+        write_geojson_file (bool): Write the station GeoJSON file every cycle. Can be disabled if
+            `on_cycle` keeps the state in memory.
+        scheduler (PollScheduler, optional): Poll the stops of the scheduler whenever they are
+            due instead of all placenames once per cycle (`placename_list` is ignored then).
+        adaptive (AdaptivePolling, optional): With a scheduler, adapt the interval of every stop
+            to the time span its responses cover and to changing delays.
+    Behavior:
+        - Opens one pooled keep-alive `aiohttp.ClientSession` for the lifetime of the loop.
+        - Per cycle, updates the geodata once, fetches all placenames in parallel and
+          appends new departures to the CSV in placename order.
+        - Sleeps for whatever is left of `delay_min` before starting the next cycle.
+        - With a scheduler, fetches the due stops in batches of `max_concurrency` and treats
+          `delay_min` as the interval of the geodata update and the dedup eviction.
+    """
+    delay_s = delay_min * 60  # convert minutes to seconds
+
+    if scheduler is None:
+        logging.info(
+            f"Total requests: {len(placename_list)}, Concurrency: {max_concurrency}, Cycle time: {delay_min} minutes."
+        )
+    else:
+        logging.info(
+            f"Scheduled stops: {len(scheduler)}, Concurrency: {max_concurrency}, "
+            f"Required rate: {round(scheduler.required_rate(), 2)} requests/s."
+        )
+    logging.info("Starting the async request loop...")
+
+    # Loading the history is blocking, keep it off the event loop (e.g. of the web server)
+    dedup_index = await asyncio.to_thread(
+        load_dedup_index, csv_file_target, departure_archive, dedup_horizon_days
+    )
+
+    stop_buffers = StopBuffers(n_entries)
+    stop_buffers.extend(
+        await asyncio.to_thread(load_recent_departures, csv_file_target, departure_archive)
+    )
+    station_cache = await asyncio.to_thread(StationGeometryCache, bahnhoefe_geodata_source)
+    if on_cycle is not None:
+        on_cycle(station_features(stop_buffers, station_cache))
+
+    connector = aiohttp.TCPConnector(limit=max_concurrency, keepalive_timeout=delay_s + 30)
+    timeout = aiohttp.ClientTimeout(total=30)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    limiter = TokenBucket(request_rate, burst)
+    breakers = {}
+
+    async def update_geodata_async():
+        if not write_geojson_file:
+            return
+        try:
+            await asyncio.to_thread(
+                update_geodata_from_buffers,
+                stop_buffers,
+                station_cache,
+                bahnhoefe_geojson_target,
+            )
+            logging.info(f"Geodata updated and saved to {bahnhoefe_geojson_target}.")
+        except Exception as e:
+            logging.warning(
+                f"Error updating geodata: {e}. This may be harmless if you just started the script for the first time."
+            )
+
+    async def fetch_and_process(keys):
+        request_time = datetime.now()
+        results = await fetch_cycle_async(session, semaphore, keys, limiter, breakers, stream_json)
+        if adaptive is not None and scheduler is not None:
+            adapt_intervals(scheduler, adaptive, keys, results, request_time)
+        changed = await asyncio.to_thread(
+            process_cycle_results, keys, results, dedup_index, stop_buffers
+        )
+        if on_cycle is not None and changed:
+            on_cycle(station_features(stop_buffers, station_cache, changed))
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        if scheduler is not None:
+            await run_scheduled_polls(
+                scheduler, dedup_index, delay_s, max_concurrency, update_geodata_async, fetch_and_process
+            )
+            return
+        while True:
+            logging.info("Starting a new cycle of requests...")
+            report_poll_telemetry()
+            poll_telemetry.start_cycle()
+            cycle_start = time.monotonic()
+            evicted = dedup_index.evict()
+            if evicted:
+                logging.info(f"Dropped {evicted} UUIDs older than the dedup horizon.")
+
+            await update_geodata_async()
+            await fetch_and_process(placename_list)
+
+            elapsed = time.monotonic() - cycle_start
+            sleep_s = max(0.0, delay_s - elapsed)
+            logging.info(
+                f"Cycle took {round(elapsed, 1)} s, sleeping for {round(sleep_s/60, 2)} minutes."
+            )
+            await asyncio.sleep(sleep_s)
+            logging.info("Next cycle...")
+
+
+# Scheduler and adaptive intervals of the command line options --catalog and --adaptive
+def build_scheduler(
+    delay_min,
+    placename_list,
+    catalog=None,
+    adaptive=False,
+    request_rate=1.0,
+    hub_interval_s=60,
+    minor_interval_s=900,
+):
+    """
+    Sets up the poll scheduler (and the adaptive intervals) for `main_async`.
+
+    Args:
+        delay_min (float): Cycle duration in minutes, the interval of the placenames without catalog.
+        placename_list (list of tuple): The (place_dm, name_dm) stations, always polled as hubs.
+        catalog (str or Path, optional): Stop catalog to poll all stops of.
+        adaptive (bool): Adapt the interval of every stop to its responses.
+        request_rate (float): Sustained requests per second; the catalog intervals are stretched to
+            fit `SCHEDULE_RATE_SHARE` of it.
+        hub_interval_s (float): With a catalog, poll interval of the hubs in seconds.
+        minor_interval_s (float): With a catalog, poll interval of the minor stops in seconds.
+
+    Returns:
+        tuple: The `PollScheduler` and the `AdaptivePolling` (each None if not needed).
+    """
+    scheduler = None
+    if adaptive and not catalog:
+        # The placename list on the scheduler, so that every station gets its own interval
+        scheduler = PollScheduler({"hub": delay_min * 60})
+        for key in placename_list:
+            scheduler.add(key, "hub")
+    if catalog:
+        scheduler = PollScheduler({"hub": hub_interval_s, "minor": minor_interval_s})
+        # Catalog entries of the placename stations are left out, they are polled as hubs below
+        scheduler.add_catalog(load_catalog(catalog, placenames=placename_list))
+        for key in placename_list:
+            scheduler.add(key, "hub")
+        required = scheduler.required_rate()
+        if required > request_rate * SCHEDULE_RATE_SHARE:
+            intervals = scheduler.fit_to_rate(request_rate * SCHEDULE_RATE_SHARE)
+            intervals = {tier: round(interval_s) for tier, interval_s in intervals.items()}
+            logging.warning(
+                f"The catalog needs {round(required, 2)} requests/s at the configured intervals, "
+                f"stretched them to {intervals} s."
+            )
+    return scheduler, AdaptivePolling() if adaptive else None
+
+
+# Feed the responses of the due stops into the adaptive intervals
+def adapt_intervals(scheduler, adaptive, keys, results, request_time):
+    """
+    Updates the poll interval of every successfully fetched stop.
+
+    Args:
+        scheduler (PollScheduler): Scheduler whose per-stop intervals are set.
+        adaptive (AdaptivePolling): Coverage and delay state per stop.
+        keys (list of tuple): The fetched (place_dm, name_dm) tuples.
+        results (list): Result of `fetch_cycle_async`, one entry per key.
+        request_time (datetime): When the requests were started.
+    """
+    for key, result in zip(keys, results):
+        if result is None or isinstance(result, Exception):
+            continue
+        df, _ = result
+        interval_s = adaptive.observe(key, request_time, df, scheduler.interval(key))
+        scheduler.set_interval(key, interval_s)
+        state = adaptive.state(key)
+        logging.debug(
+            f"{stop_label(*key)}: covers {round(state['span_s'] / 60)} min, "
+            f"{state['delay_changes']} delay changes, next poll in {round(interval_s)} s."
+        )
+
+
+# Scheduled variant of the async loop body: polls every stop when it is due
+async def run_scheduled_polls(
+    scheduler, dedup_index, delay_s, batch_size, update_geodata_async, fetch_and_process
+):
+    """
+    Polls the stops of a scheduler forever, in batches of due stops.
+
+    Args:
+        scheduler (PollScheduler): Stops and their next-due times.
+        dedup_index (DedupIndex): UUIDs of the stored departures, evicted every `delay_s`.
+        delay_s (float): Interval of the geodata update, the dedup eviction and the telemetry
+            cycles in seconds.
+        batch_size (int): Maximum number of stops fetched together.
+        update_geodata_async (callable): Coroutine function writing the station GeoJSON.
+        fetch_and_process (callable): Coroutine function fetching and storing a list of stops.
+    """
+    next_housekeeping = time.monotonic()
+    while True:
+        if time.monotonic() >= next_housekeeping:
+            report_poll_telemetry()
+            poll_telemetry.start_cycle()
+            evicted = dedup_index.evict()
+            if evicted:
+                logging.info(f"Dropped {evicted} UUIDs older than the dedup horizon.")
+            await update_geodata_async()
+            next_housekeeping = time.monotonic() + delay_s
+
+        due = scheduler.pop_due(batch_size)
+        if not due:
+            wait_s = scheduler.seconds_until_due()
+            wait_s = delay_s if wait_s is None else wait_s
+            await asyncio.sleep(min(wait_s, max(0.0, next_housekeeping - time.monotonic())))
+            continue
+        try:
+            await fetch_and_process(due)
+        finally:
+            # Failed and skipped stops are retried at their regular interval (the circuit
+            # breakers take care of stops that keep failing)
+            for key in due:
+                scheduler.reschedule(key)
+
+
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fetch VRR departures and update the geodata.")
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Fetch all stations of a cycle concurrently (aiohttp)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Maximum number of parallel requests in async mode (default: 4)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=1.0,
+        help="Maximum sustained requests per second (default: 1.0)",
+    )
+    parser.add_argument(
+        "--burst",
+        type=int,
+        default=4,
+        help="Maximum request burst of the rate limiter (default: 4)",
+    )
+    parser.add_argument(
+        "--stream-json",
+        action="store_true",
+        help="Parse the departureList of each response incrementally (needs ijson)",
+    )
+    parser.add_argument(
+        "--dedup-horizon-days",
+        type=int,
+        default=2,
+        help="Days before today whose departure UUIDs are kept for deduplication (default: 2)",
+    )
+    parser.add_argument(
+        "--catalog",
+        nargs="?",
+        const=str(DEFAULT_CATALOG),
+        metavar="PATH",
+        help="Poll all stops of a stop catalog with the priority scheduler (needs --async; default catalog: the VRR stop list)",
+    )
+    parser.add_argument(
+        "--hub-interval-s",
+        type=float,
+        default=60,
+        help="With --catalog, poll interval of the hubs in seconds (default: 60)",
+    )
+    parser.add_argument(
+        "--minor-interval-s",
+        type=float,
+        default=900,
+        help="With --catalog, poll interval of the minor stops in seconds (default: 900)",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Adapt the poll interval of every stop to the span its responses cover and to changing delays (needs --async)",
+    )
+    parser.add_argument(
+        "--storage",
+        choices=["csv", "parquet"],
+        default="csv",
+        help="Where departures are stored: the single CSV file (default) or the date-partitioned Parquet archive",
+    )
+    parser.add_argument(
+        "--api-url",
+        default=API_URL,
+        help="Departure monitor endpoint, e.g. a local mock_efa_server.py (default: $VRR_API_URL or the VRR EFA)",
+    )
+    parser.add_argument(
+        "--raw-segment-mb",
+        type=float,
+        default=64,
+        help="Size in MB after which the raw response archive starts a new segment (default: 64)",
+    )
+    parser.add_argument(
+        "--no-raw-archive",
+        action="store_true",
+        help="Do not archive the raw API responses",
+    )
+    parser.add_argument(
+        "--import-csv",
+        action="store_true",
+        help="Import final_departures.csv into the Parquet archive and exit",
+    )
+    parser.add_argument(
+        "--export-csv",
+        metavar="PATH",
+        help="Export the Parquet archive as CSV to PATH and exit",
+    )
+    args = parser.parse_args()
+    API_URL = args.api_url
+    if (args.catalog or args.adaptive) and not args.use_async:
+        parser.error("--catalog and --adaptive need --async")
+
     # Initialize paths
     init_paths(__file__)
 
     # Configuration for the main function
     init_logger(root)
 
+    # One-shot conversions between the CSV file and the Parquet archive
+    if args.import_csv or args.export_csv:
+        from departure_store import DepartureStore
+
+        archive = DepartureStore(departure_store_target)
+        if args.import_csv:
+            archive.import_csv(csv_file_target)
+        if args.export_csv:
+            archive.export_csv(args.export_csv)
+        raise SystemExit(0)
+
+    init_storage(args.storage)
+    if not args.no_raw_archive:
+        init_response_archive(args.raw_segment_mb)
+
     # Set the delay in minutes and the number of entries to process
-    delay_min = 1
-    n_entries = 30
-    placename_list = [
-        ("Duisburg", "HBF"),
-        ("Mönchengladbach", "HBF"),
-        ("Wuppertal", "HBF"),
-        ("Bochum", "HBF"),
-        ("Dortmund", "HBF"),
-        ("Essen", "HBF"),
-        ("Düsseldorf", "HBF"),
-    ]
+    delay_min = DELAY_MIN
+    n_entries = N_ENTRIES
+    placename_list = PLACENAME_LIST
+
+    # Network-scale polling: every catalog stop at the interval of its priority tier
+    scheduler, adaptive = build_scheduler(
+        delay_min,
+        placename_list,
+        args.catalog,
+        args.adaptive,
+        args.rate,
+        args.hub_interval_s,
+        args.minor_interval_s,
+    )
 
     # Start the main function with the specified parameters
-    main(delay_min, placename_list, n_entries)
+    if args.use_async:
+        asyncio.run(
+            main_async(
+                delay_min,
+                placename_list,
+                n_entries,
+                args.concurrency,
+                args.rate,
+                args.burst,
+                args.stream_json,
+                args.dedup_horizon_days,
+                scheduler=scheduler,
+                adaptive=adaptive,
+            )
+        )
+    else:
+        main(
+            delay_min,
+            placename_list,
+            n_entries,
+            args.rate,
+            args.burst,
+            args.stream_json,
+            args.dedup_horizon_days,
+        )
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Pre-compressed variants of generated files and a cache to serve them.
+
+The station GeoJSON is mostly repeated property names and UUID strings and shrinks to a small
+fraction with gzip or brotli. Instead of compressing it for every request, the writer stores
+`<file>.gz` (and `<file>.br` if the optional `brotli` package is installed) right after the
+file itself. The web server then picks the best variant for the client's Accept-Encoding and
+keeps small files in memory, so that a request costs neither a compression nor a disk read.
+"""
+import gzip
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # optional, only gzip variants are written then
+    brotli = None
+
+
+# Variants in order of preference: (Content-Encoding, file suffix)
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+
+def _write_atomic(path, data):
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_compressed_variants(path, data=None, gzip_level=9, brotli_quality=9):
+    """
+    Writes the gzip (and brotli) variant next to a file.
+
+    Args:
+        path (str or Path): The uncompressed file.
+        data (bytes, optional): Its content, if already at hand (read from `path` otherwise).
+        gzip_level (int): gzip compression level.
+        brotli_quality (int): brotli quality (0-11).
+
+    Returns:
+        list of Path: The written variant files.
+    """
+    path = Path(path)
+    if data is None:
+        data = path.read_bytes()
+    written = []
+    variants = [(".gz", lambda: gzip.compress(data, compresslevel=gzip_level, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", lambda: brotli.compress(data, quality=brotli_quality)))
+    for suffix, compress in variants:
+        target = path.with_name(path.name + suffix)
+        _write_atomic(target, compress())
+        written.append(target)
+    return written
+
+
+def accepted_encodings(header):
+    """
+    Parses an Accept-Encoding header.
+
+    Returns:
+        set of str: Encodings with a non-zero quality (lower case).
+    """
+    accepted = set()
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding)
+    return accepted
+
+
+class CompressedFileCache:
+    """Selects pre-compressed variants of files and keeps small ones in memory (LRU)."""
+
+    def __init__(self, max_file_bytes=2 * 1024 * 1024, max_total_bytes=64 * 1024 * 1024):
+        """
+        Args:
+            max_file_bytes (int): Files larger than this are not cached (served from disk).
+            max_total_bytes (int): Total size of all cached files.
+        """
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self._entries = OrderedDict()  # variant path -> (mtime_ns, size, bytes)
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def select(self, path, accept_encoding):
+        """
+        Chooses the variant of `path` to send.
+
+        A compressed variant is only used if it is at least as new as the file itself, so a
+        stale variant from an interrupted write is never served.
+
+        Args:
+            path (Path): The uncompressed file (must exist).
+            accept_encoding (str or None): The request's Accept-Encoding header.
+
+        Returns:
+            tuple:
+                - Path: The file to send.
+                - str or None: Its Content-Encoding (None for the uncompressed file).
+                - os.stat_result: Stat of the file to send.
+        """
+        original = path.stat()
+        accepted = accepted_encodings(accept_encoding)
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            variant = path.with_name(path.name + suffix)
+            try:
+                stat = variant.stat()
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime_ns >= original.st_mtime_ns:
+                return variant, encoding, stat
+        return path, None, original
+
+    @staticmethod
+    def etag(stat, encoding):
+        """Strong ETag of one variant, derived from its modification time and size."""
+        return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}-{encoding or "identity"}"'
+
+    @staticmethod
+    def content_type(path):
+        """Content type of the uncompressed file."""
+        if path.suffix == ".geojson":
+            return "application/geo+json"
+        return mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+
+    def read(self, path, stat):
+        """
+        Returns the content of a small file from memory, loading it if needed.
+
+        Args:
+            path (Path): The file (variant) to read.
+            stat (os.stat_result): Its current stat, used to detect changes.
+
+        Returns:
+            bytes or None: The content, or None if the file is too large to be cached.
+        """
+        if stat.st_size > self.max_file_bytes:
+            return None
+        key = str(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                self._entries.move_to_end(key)
+                return entry[2]
+        data = path.read_bytes()
+        if len(data) != stat.st_size:
+            return data  # changed while reading, do not cache
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total -= len(old[2])
+            self._entries[key] = (stat.st_mtime_ns, stat.st_size, data)
+            self._total += len(data)
+            while self._total > self.max_total_bytes and len(self._entries) > 1:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._total -= len(evicted)
+        return data
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Reverse tail-reader for the departure CSV.
+
+Only a (re)start of the ingest loop reads `final_departures.csv`: `load_dedup_index` and
+`load_recent_departures` need the rows of the last days, which `read_csv_since` finds at the end
+of the file with `read_csv_tail`. The cycles themselves never read the file again (they keep the
+latest departures in `StopBuffers`), so the saving is at startup, where
+`pd.read_csv(...).tail(n)` would parse the whole history first. `read_csv_tail` seeks to the end
+of the file, reads backwards block by block until it has the last `n_rows` complete lines, and
+only parses those (together with the header line).
+"""
+import io
+import os
+
+import pandas as pd
+
+
+# Column types of the departure CSV, so that a short tail is parsed like the full file
+DEPARTURE_DTYPES = {
+    "uuid": str,
+    "stop": str,
+    "platform": str,
+    "line": str,
+    "direction": str,
+    "scheduled_departure": str,
+    "real_departure": str,
+    "scheduled_date_iso": str,
+    "delay_min": float,
+}
+
+
+def read_tail_lines(path, n_rows, block_size=64 * 1024):
+    """
+    Reads the header line and the last `n_rows` complete lines of a text file.
+
+    A trailing line without line break (e.g. a row that is being written right now) is ignored.
+    Fields with embedded line breaks are not supported, the departure CSV never contains any.
+
+    Args:
+        path (str or Path): Path of the file.
+        n_rows (int): Number of lines to return (excluding the header).
+        block_size (int): Number of bytes read per backwards step.
+
+    Returns:
+        tuple:
+            - bytes: The header line including its line break (empty for an empty file).
+            - bytes: The last `n_rows` complete lines.
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        if not header.endswith(b"\n"):
+            # Only a (partial) header, no rows yet
+            return header, b""
+        data_start = f.tell()
+        pos = f.seek(0, os.SEEK_END)
+
+        data = b""
+        # One line more than requested, because the first line of the buffer may be cut off
+        while pos > data_start and data.count(b"\n") <= n_rows:
+            step = min(block_size, pos - data_start)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+
+    # Drop a partially written last line
+    data = data[: data.rfind(b"\n") + 1]
+    lines = data.splitlines(keepends=True)
+    if pos > data_start and lines:
+        # The first line of the buffer started before `pos` and is incomplete
+        lines = lines[1:]
+    return header, b"".join(lines[-n_rows:] if n_rows > 0 else [])
+
+
+def read_csv_tail(path, n_rows, usecols=None, dtype=None, block_size=64 * 1024):
+    """
+    Parses only the last `n_rows` rows of a CSV file.
+
+    Args:
+        path (str or Path): Path of the CSV file (with a header line).
+        n_rows (int): Number of rows to return.
+        usecols (list of str, optional): Columns to load, as in `pd.read_csv`.
+        dtype (dict, optional): Column types, as in `pd.read_csv`. Passing them keeps the types of a
+            short tail consistent with those of the full file.
+        block_size (int): Number of bytes read per backwards step.
+
+    Returns:
+        pd.DataFrame: Same result as `pd.read_csv(path, usecols=usecols, dtype=dtype).tail(n_rows)`,
+        except for the index, which starts at 0.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+    """
+    header, body = read_tail_lines(path, n_rows, block_size)
+    if dtype is not None and usecols is not None:
+        dtype = {col: typ for col, typ in dtype.items() if col in usecols}
+    return pd.read_csv(io.BytesIO(header + body), usecols=usecols, dtype=dtype)
+
+
+def read_csv_since(path, date_column, date_from, usecols=None, dtype=None, initial_rows=10_000):
+    """
+    Reads the rows at the end of an append-only CSV whose `date_column` is at least `date_from`.
+
+    Rows are appended roughly in chronological order, so the tail is read with a growing window
+    until it reaches a row older than `date_from` (or the start of the file).
+
+    Args:
+        path (str or Path): Path of the CSV file.
+        date_column (str): Column with ISO dates (e.g. `scheduled_date_iso`).
+        date_from (str): Oldest ISO date to return.
+        usecols (list of str, optional): Columns to load; `date_column` is added if missing.
+        dtype (dict, optional): Column types, as in `pd.read_csv`.
+        initial_rows (int): Size of the first tail window.
+
+    Returns:
+        pd.DataFrame: The matching rows.
+    """
+    if usecols is not None and date_column not in usecols:
+        usecols = list(usecols) + [date_column]
+    n_rows = initial_rows
+    while True:
+        df = read_csv_tail(path, n_rows, usecols=usecols, dtype=dtype)
+        dates = df[date_column].astype(str)
+        if len(df) < n_rows or (dates < date_from).any():
+            return df[dates >= date_from].reset_index(drop=True)
+        n_rows *= 4
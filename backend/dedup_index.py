@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Bounded dedup index for departure IDs.
+
+The API only ever returns departures around the requested time, so a departure that was
+scheduled a week ago can never show up again. Instead of one set with every ID that was ever
+written (which grows forever), `DedupIndex` groups the IDs by scheduled date and drops whole
+days once they are older than a configurable horizon.
+"""
+from datetime import date, timedelta
+
+
+class DedupIndex:
+    """Set of departure IDs, bucketed by scheduled date and evicted after `horizon_days`."""
+
+    def __init__(self, horizon_days=2):
+        """
+        Args:
+            horizon_days (int): Number of days before today whose IDs are kept.
+        """
+        self.horizon_days = horizon_days
+        self._buckets = {}
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self._buckets.values())
+
+    def __contains__(self, key):
+        return any(key in bucket for bucket in self._buckets.values())
+
+    def cutoff(self, today=None):
+        """Returns the oldest scheduled date (ISO string) that is still kept."""
+        today = today or date.today()
+        return (today - timedelta(days=self.horizon_days)).isoformat()
+
+    def is_new(self, keys):
+        """
+        Args:
+            keys (iterable): Departure IDs (128-bit integers).
+
+        Returns:
+            list of bool: True for every ID that is not in the index.
+        """
+        buckets = list(self._buckets.values())
+        return [not any(key in bucket for bucket in buckets) for key in keys]
+
+    def add(self, keys, dates):
+        """
+        Adds IDs to the buckets of their scheduled dates.
+
+        Args:
+            keys (iterable): Departure IDs (128-bit integers).
+            dates (iterable of str): Scheduled dates (ISO) of the departures; missing dates count as today.
+        """
+        today = date.today().isoformat()
+        for key, day in zip(keys, dates):
+            if not isinstance(day, str):
+                day = today
+            bucket = self._buckets.get(day)
+            if bucket is None:
+                bucket = self._buckets[day] = set()
+            bucket.add(key)
+
+    def evict(self, today=None):
+        """
+        Drops all buckets older than the horizon.
+
+        Args:
+            today (date, optional): Reference date (default: today).
+
+        Returns:
+            int: Number of IDs that were dropped.
+        """
+        cutoff = self.cutoff(today)
+        dropped = 0
+        for day in [day for day in self._buckets if day < cutoff]:
+            dropped += len(self._buckets.pop(day))
+        return dropped
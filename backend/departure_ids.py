@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Batched departure IDs.
+
+A departure ID is `uuid5(NAMESPACE_DNS, f"{stop}|{scheduled_datetime}|{line}")`, exactly as
+`make_uid` computes it, so that the IDs of already collected departures stay valid. Instead of
+creating one `uuid.UUID` object and one 36 character string per departure, whole columns are
+hashed at once into two uint64 arrays (the high and low half of the 128-bit UUID). Inside the
+pipeline IDs are compared as 128-bit integers; the canonical UUID string is only produced at
+the output boundary (CSV, archive, GeoJSON).
+"""
+import hashlib
+import uuid
+
+import numpy as np
+
+
+_NAMESPACE = uuid.NAMESPACE_DNS.bytes
+
+# Version (5) and variant (RFC 4122) bits, split into the high and low 64-bit halves
+_VERSION_CLEAR = np.uint64(~0xF000 & 0xFFFFFFFFFFFFFFFF)
+_VERSION_SET = np.uint64(0x5000)
+_VARIANT_CLEAR = np.uint64(~(0xC000 << 48) & 0xFFFFFFFFFFFFFFFF)
+_VARIANT_SET = np.uint64(0x8000 << 48)
+
+
+def uuid5_halves(names, namespace=_NAMESPACE):
+    """
+    Computes name-based (version 5) UUIDs for a whole column of names.
+
+    Args:
+        names (iterable of str): The names to hash.
+        namespace (bytes): The 16 namespace bytes (default: `uuid.NAMESPACE_DNS`).
+
+    Returns:
+        tuple of np.ndarray: (high, low) uint64 halves of the UUIDs.
+    """
+    digests = b"".join(
+        hashlib.sha1(namespace + name.encode("utf-8")).digest()[:16] for name in names
+    )
+    halves = np.frombuffer(digests, dtype=">u8").astype(np.uint64).reshape(-1, 2)
+    high = (halves[:, 0] & _VERSION_CLEAR) | _VERSION_SET
+    low = (halves[:, 1] & _VARIANT_CLEAR) | _VARIANT_SET
+    return high, low
+
+
+def departure_ids(stops, scheduled, lines):
+    """
+    Computes the IDs of a batch of departures.
+
+    Args:
+        stops (iterable): Stop names as returned by the API (before any character cleanup).
+        scheduled (iterable of str): `str(scheduled_datetime)`, i.e. "YYYY-MM-DD HH:MM:SS" or "None".
+        lines (iterable): Line numbers.
+
+    Returns:
+        tuple of np.ndarray: (high, low) uint64 halves, equal to `uuid.UUID(make_uid(...)).int`.
+    """
+    return uuid5_halves(
+        f"{stop}|{when}|{line}" for stop, when, line in zip(stops, scheduled, lines)
+    )
+
+
+def halves_to_ints(high, low):
+    """Combines the uint64 halves into Python 128-bit integers (hashable keys for dedup sets)."""
+    return [(int(h) << 64) | int(l) for h, l in zip(high, low)]
+
+
+def halves_to_strings(high, low):
+    """Formats the uint64 halves as canonical UUID strings (the output representation)."""
+    raw = np.empty((len(high), 2), dtype=">u8")
+    raw[:, 0] = high
+    raw[:, 1] = low
+    hexed = raw.tobytes().hex()
+    return [
+        f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+        for h in (hexed[i : i + 32] for i in range(0, len(hexed), 32))
+    ]
+
+
+def strings_to_halves(strings):
+    """
+    Parses canonical UUID strings (as stored in the CSV) into uint64 halves.
+
+    Args:
+        strings (iterable of str): UUID strings.
+
+    Returns:
+        tuple of np.ndarray: (high, low) uint64 halves.
+    """
+    raw = bytes.fromhex("".join(s.replace("-", "") for s in strings))
+    halves = np.frombuffer(raw, dtype=">u8").astype(np.uint64).reshape(-1, 2)
+    return halves[:, 0], halves[:, 1]
+
+
+def strings_to_ints(strings):
+    """Parses UUID strings into Python 128-bit integers."""
+    return halves_to_ints(*strings_to_halves(strings))
+
+
+def departure_keys(df):
+    """Returns the departure IDs of a DataFrame as 128-bit integers, from either ID representation."""
+    if "uid_hi" in df.columns:
+        return halves_to_ints(df["uid_hi"].to_numpy(), df["uid_lo"].to_numpy())
+    return strings_to_ints(df["uuid"].astype(str))
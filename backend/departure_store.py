@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+Partitioned columnar archive for the collected departures.
+
+Instead of appending everything to one ever-growing CSV file, every append is written as a
+small Parquet segment into a directory per `scheduled_date_iso`:
+
+    data/api/departures/
+        date=2025-08-24/
+            seg-1724512345123456789.parquet
+            compact-1724515945123456789.parquet
+        date=unknown/
+            ...
+
+Readers only open the partitions (days) they ask for, and a background compaction step merges
+the many small segments of a day into a single file. The CSV format remains available through
+`DepartureStore.export_csv`.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# Column layout of the archive, identical to the columns `full_api_request` produces
+SCHEMA = pa.schema(
+    [
+        ("uuid", pa.string()),
+        ("stop", pa.string()),
+        ("platform", pa.string()),
+        ("line", pa.string()),
+        ("direction", pa.string()),
+        ("scheduled_departure", pa.string()),
+        ("real_departure", pa.string()),
+        ("scheduled_time", pa.string()),
+        ("scheduled_date_iso", pa.string()),
+        ("delay_min", pa.int64()),
+        ("connection_exists", pa.bool_()),
+        ("delay_reason", pa.string()),
+        ("realtime_status", pa.string()),
+        ("status_text", pa.string()),
+    ]
+)
+
+# Partition used for departures without a scheduled date
+UNKNOWN_PARTITION = "unknown"
+
+
+def _to_table(df):
+    """Converts a departure DataFrame into a table with the archive schema."""
+    columns = {}
+    for field in SCHEMA:
+        values = df[field.name].tolist() if field.name in df.columns else [None] * len(df)
+        if pa.types.is_string(field.type):
+            convert = str
+        elif pa.types.is_integer(field.type):
+            convert = lambda v: int(float(v))
+        else:
+            convert = bool
+        columns[field.name] = pa.array(
+            [None if pd.isna(v) else convert(v) for v in values], type=field.type
+        )
+    return pa.table(columns, schema=SCHEMA)
+
+
+class DepartureStore:
+    """
+    Departure archive made of Parquet segments, partitioned by scheduled date.
+
+    Appends and compaction may run in different threads; an internal lock makes sure readers
+    never see a half-swapped partition.
+    """
+
+    def __init__(self, root_dir):
+        """
+        Args:
+            root_dir (str or Path): Directory that holds one sub-directory per partition.
+        """
+        self.root_dir = Path(root_dir)
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._compaction_thread = None
+        self._stop_compaction = threading.Event()
+
+    # --- layout -----------------------------------------------------------------------
+
+    def _partition_dir(self, partition):
+        return self.root_dir / f"date={partition}"
+
+    def partitions(self):
+        """Returns the names of all partitions (ISO dates, plus 'unknown'), sorted."""
+        return sorted(
+            p.name.split("=", 1)[1]
+            for p in self.root_dir.glob("date=*")
+            if p.is_dir()
+        )
+
+    def _segments(self, partition):
+        return sorted(self._partition_dir(partition).glob("*.parquet"))
+
+    def _select_partitions(self, date_from=None, date_to=None):
+        """Partition pruning: keeps only partitions within [date_from, date_to]."""
+        date_from = date_from.isoformat() if isinstance(date_from, date) else date_from
+        date_to = date_to.isoformat() if isinstance(date_to, date) else date_to
+        selected = []
+        for partition in self.partitions():
+            if partition == UNKNOWN_PARTITION:
+                if date_from is None and date_to is None:
+                    selected.append(partition)
+                continue
+            if date_from is not None and partition < date_from:
+                continue
+            if date_to is not None and partition > date_to:
+                continue
+            selected.append(partition)
+        return selected
+
+    # --- writing ----------------------------------------------------------------------
+
+    def _write_segment(self, table, partition, prefix="seg"):
+        """Writes a table to a new segment file via a temporary file and an atomic rename."""
+        directory = self._partition_dir(partition)
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f"{prefix}-{time.time_ns()}-{os.getpid()}.parquet"
+        tmp_path = directory / f".{name}.tmp"
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, directory / name)
+        return directory / name
+
+    def append(self, df):
+        """
+        Appends departures to the archive, one new segment per scheduled date.
+
+        Args:
+            df (pd.DataFrame): Departures with (a subset of) the archive columns.
+
+        Returns:
+            int: Number of rows written.
+        """
+        if df.empty:
+            return 0
+        partitions = df["scheduled_date_iso"].fillna(UNKNOWN_PARTITION).astype(str)
+        for partition, part_df in df.groupby(partitions, sort=False):
+            self._write_segment(_to_table(part_df), partition)
+        return len(df)
+
+    def import_csv(self, csv_path, chunksize=100_000):
+        """
+        Imports an existing departure CSV (e.g. `final_departures.csv`) into the archive.
+
+        Args:
+            csv_path (str or Path): Path of the CSV file.
+            chunksize (int): Number of rows parsed and written per step.
+
+        Returns:
+            int: Number of rows imported.
+        """
+        total = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            total += self.append(chunk)
+        logging.info(f"Imported {total} departures from {csv_path}.")
+        return total
+
+    # --- reading ----------------------------------------------------------------------
+
+    def read(self, columns=None, date_from=None, date_to=None, stops=None):
+        """
+        Reads departures from the archive.
+
+        Args:
+            columns (list of str, optional): Columns to load (default: all).
+            date_from (str or date, optional): First scheduled date to include.
+            date_to (str or date, optional): Last scheduled date to include.
+            stops (iterable of str, optional): Only return departures of these stops.
+
+        Returns:
+            pd.DataFrame: Matching departures in partition and append order.
+        """
+        columns = list(columns) if columns is not None else SCHEMA.names
+        filters = [("stop", "in", list(stops))] if stops is not None else None
+
+        tables = []
+        with self._lock:
+            for partition in self._select_partitions(date_from, date_to):
+                for segment in self._segments(partition):
+                    tables.append(
+                        pq.read_table(segment, columns=columns, filters=filters)
+                    )
+
+        if not tables:
+            return pd.DataFrame(columns=columns)
+        df = pa.concat_tables(tables).to_pandas()
+        if "uuid" in df.columns:
+            df = df.drop_duplicates(subset="uuid", keep="last")
+        return df.reset_index(drop=True)
+
+    def export_csv(self, csv_path, **read_kwargs):
+        """
+        Exports (a part of) the archive in the original CSV format.
+
+        Args:
+            csv_path (str or Path): Target CSV file.
+            **read_kwargs: Passed on to `read` (columns, date_from, date_to, stops).
+
+        Returns:
+            int: Number of exported rows.
+        """
+        df = self.read(**read_kwargs)
+        df.to_csv(csv_path, index=False)
+        logging.info(f"Exported {len(df)} departures to {csv_path}.")
+        return len(df)
+
+    # --- compaction -------------------------------------------------------------------
+
+    def compact(self, min_segments=4):
+        """
+        Merges the segments of every partition that has at least `min_segments` of them.
+
+        Args:
+            min_segments (int): Partitions with fewer segments are left alone.
+
+        Returns:
+            int: Number of partitions that were compacted.
+        """
+        compacted = 0
+        for partition in self.partitions():
+            segments = self._segments(partition)
+            if len(segments) < min_segments:
+                continue
+            table = pa.concat_tables(pq.read_table(s) for s in segments)
+            df = table.to_pandas().drop_duplicates(subset="uuid", keep="last")
+            merged = pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False)
+            with self._lock:
+                self._write_segment(merged, partition, prefix="compact")
+                for segment in segments:
+                    segment.unlink(missing_ok=True)
+            compacted += 1
+        if compacted:
+            logging.info(f"Compacted {compacted} departure partitions.")
+        return compacted
+
+    def start_background_compaction(self, interval_s=600, min_segments=4):
+        """
+        Starts a daemon thread that runs `compact` every `interval_s` seconds.
+
+        Args:
+            interval_s (float): Pause between two compaction runs.
+            min_segments (int): Passed on to `compact`.
+        """
+        if self._compaction_thread and self._compaction_thread.is_alive():
+            return
+
+        def run():
+            while not self._stop_compaction.wait(interval_s):
+                try:
+                    self.compact(min_segments)
+                except Exception as e:
+                    logging.error(f"Error compacting departure archive: {e}")
+
+        self._stop_compaction.clear()
+        self._compaction_thread = threading.Thread(
+            target=run, name="departure-compaction", daemon=True
+        )
+        self._compaction_thread.start()
+
+    def stop_background_compaction(self):
+        """Stops the compaction thread started by `start_background_compaction`."""
+        self._stop_compaction.set()
+        if self._compaction_thread:
+            self._compaction_thread.join()
+            self._compaction_thread = None
+
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Fast JSON decoding for EFA departure monitor responses.
+
+The response body is kept as one `bytes` buffer: it is archived as-is and decoded exactly once,
+with orjson if it is installed (falling back to the standard library). Optionally, the items of
+`departureList` can be streamed one at a time with ijson instead of building the whole document.
+
+The body is decoded with the same charset `requests` would pick (`response.text`), because the
+departure UUIDs are hashed from the decoded stop names and must stay stable.
+"""
+import codecs
+import io
+import json
+
+try:
+    import orjson
+except ImportError:  # optional, only speeds up decoding
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # optional, only needed for streaming
+    ijson = None
+
+
+def response_encoding(content_type):
+    """
+    Determines the text encoding of a response like `requests` does.
+
+    Args:
+        content_type (str or None): Value of the Content-Type header.
+
+    Returns:
+        str: The charset parameter if present, ISO-8859-1 for other `text/*` types, else UTF-8.
+    """
+    if not content_type:
+        return "utf-8"
+    mime, *params = [part.strip() for part in content_type.split(";")]
+    for param in params:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset" and value:
+            return value.strip("'\" ")
+    if "text" in mime.lower():
+        return "ISO-8859-1"
+    return "utf-8"
+
+
+def _is_utf8(encoding):
+    return codecs.lookup(encoding).name == "utf-8"
+
+
+def decode_body(body, encoding="utf-8"):
+    """
+    Decodes a response body in a single pass.
+
+    Args:
+        body (bytes): Raw response body.
+        encoding (str): Text encoding of the body (see `response_encoding`).
+
+    Returns:
+        dict: The decoded JSON document, empty for an empty body.
+    """
+    if not body.strip():
+        return {}
+    # UTF-8 bodies go to the parser without an intermediate str
+    source = body if _is_utf8(encoding) else body.decode(encoding)
+    if orjson is not None:
+        return orjson.loads(source)
+    return json.loads(source)
+
+
+class _Utf8Reader(io.RawIOBase):
+    """Binary file-like object that transcodes another binary stream to UTF-8 on the fly."""
+
+    def __init__(self, raw, encoding):
+        self._raw = raw
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            chunk = self._raw.read(len(buffer))
+            self._pending = self._decoder.decode(chunk, final=not chunk).encode("utf-8")
+            if not chunk:
+                break
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+
+def iter_departures(body, encoding="utf-8"):
+    """
+    Yields the items of `departureList` one by one.
+
+    Uses ijson to parse incrementally if it is installed, so that the full document is never
+    materialized; otherwise the body is decoded with `decode_body`.
+
+    Args:
+        body (bytes): Raw response body.
+        encoding (str): Text encoding of the body (see `response_encoding`).
+
+    Yields:
+        dict: One departure of the response.
+    """
+    if not body.strip():
+        return
+    if ijson is None:
+        yield from decode_body(body, encoding).get("departureList") or []
+        return
+    stream = io.BytesIO(body)
+    if not _is_utf8(encoding):
+        stream = _Utf8Reader(stream, encoding)
+    yield from ijson.items(stream, "departureList.item", use_float=True)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Direct GeoJSON writer for the station features.
+
+`GeoDataFrame.to_file(..., driver="GeoJSON")` goes through GDAL just to write a few point
+features with list properties, and it overwrites the target in place, so a reader can see a
+truncated file. `write_geojson` serializes the feature dicts directly (with orjson if it is
+installed), writes them to a temporary file in the same directory and swaps it in with an
+atomic `os.replace`. Readers always see either the old or the new file.
+"""
+import json
+import os
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:  # optional, only speeds up serialization
+    orjson = None
+
+
+# Same CRS member as GDAL writes for EPSG:4326
+CRS84 = {"type": "name", "properties": {"name": "urn:ogc:def:crs:OGC:1.3:CRS84"}}
+
+
+def _dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_feature_collection(features, name=None):
+    """
+    Serializes features as a GeoJSON FeatureCollection, one feature per line.
+
+    Args:
+        features (iterable of dict): GeoJSON features (coordinates in WGS84 lon/lat).
+        name (str, optional): Value of the `name` member (GDAL uses the file name).
+
+    Returns:
+        bytes: The UTF-8 encoded document.
+    """
+    head = {"type": "FeatureCollection"}
+    if name is not None:
+        head["name"] = name
+    head["crs"] = CRS84
+    chunks = [_dumps(head)[:-1], b',\n"features":[\n']
+    chunks.append(b",\n".join(_dumps(feature) for feature in features))
+    chunks.append(b"\n]}\n")
+    return b"".join(chunks)
+
+
+def write_geojson(features, path):
+    """
+    Writes features to a GeoJSON file, replacing it atomically.
+
+    Args:
+        features (iterable of dict): GeoJSON features (coordinates in WGS84 lon/lat).
+        path (str or Path): Target file; its parent directory is created if needed.
+
+    Returns:
+        bytes: The written content (e.g. for `write_compressed_variants`).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = encode_feature_collection(features, name=path.stem)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return data
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+Local stand-in for the EFA departure monitor (`XML_DM_REQUEST`).
+
+Serves synthetic `departureList` responses, or replays responses recorded in the raw response
+archive, so that the ingest pipeline can be tested and load-tested without network access.
+Latency, the share of throttled (429) and unavailable (503) answers and the number of
+departures per response are configurable.
+
+Usage:
+    python backend/mock_efa_server.py --port 8765 --latency-ms 80 --rate-429 0.01
+    VRR_API_URL=http://127.0.0.1:8765/standard/XML_DM_REQUEST python backend/backend_api_to_geo.py
+
+Synthetic departures are deterministic per stop and time slot, so consecutive polls return
+overlapping departures just like the real API. Like the real API, they carry the station names
+of `bahnhoefe.shp` as `stopName` (see `PLACENAME_STOPS` and `--stations`), so that the collected
+departures show up on the map.
+"""
+import asyncio
+import itertools
+import json
+import random
+import zlib
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+from poll_scheduler import stop_label
+from response_archive import ResponseArchive
+
+
+MOCK_PATH = "/standard/XML_DM_REQUEST"
+
+# stopName of the stations of the placename list, as the EFA returns them (and bahnhoefe.shp has them)
+PLACENAME_STOPS = {
+    "Duisburg HBF": "Duisburg Hbf",
+    "Mönchengladbach HBF": "MG Hbf /Europaplatz",
+    "Wuppertal HBF": "Wuppertal Hbf",
+    "Bochum HBF": "Bochum Hbf",
+    "Dortmund HBF": "Dortmund Hbf",
+    "Essen HBF": "Essen Hauptbahnhof",
+    "Düsseldorf HBF": "Düsseldorf Hbf",
+}
+
+_LINES = ["RE1", "RE2", "S1", "S9", "U35", "ICE 727", "RB40", "107"]
+_DIRECTIONS = ["Düsseldorf Hbf", "Dortmund Hbf", "Essen Hbf", "Hamm (Westf) Hbf", "Köln Hbf"]
+_DELAYS = ["0", "0", "0", "1", "2", "4", "12", "-9999"]
+
+
+def _date_parts(when):
+    return {
+        "year": str(when.year),
+        "month": str(when.month),
+        "day": str(when.day),
+        "hour": str(when.hour),
+        "minute": str(when.minute),
+    }
+
+
+def synthetic_departures(stop_name, when, n_departures, headway_min=3):
+    """
+    Creates the departures of a stop in the EFA format, starting at `when`.
+
+    Args:
+        stop_name (str): Name of the stop, used as `stopName` and as seed.
+        when (datetime): Requested time; the first departure is at the next slot.
+        n_departures (int): Number of departures.
+        headway_min (int): Minutes between two departures of the stop.
+
+    Returns:
+        list of dict: `departureList` items.
+    """
+    first_slot = -(-int(when.timestamp() // 60) // headway_min)  # ceil
+    departures = []
+    for slot in range(first_slot, first_slot + n_departures):
+        rng = random.Random(f"{stop_name}|{slot}")
+        scheduled = datetime.fromtimestamp(slot * headway_min * 60)
+        delay = rng.choice(_DELAYS)
+        dep = {
+            "stopName": stop_name,
+            "platformName": str(rng.randint(1, 12)),
+            "dateTime": _date_parts(scheduled),
+            "servingLine": {
+                "number": rng.choice(_LINES),
+                "direction": rng.choice(_DIRECTIONS),
+                "delay": delay,
+                "cancelled": "1" if rng.random() < 0.03 else "0",
+                "realtimeStatus": "MONITORED" if delay != "-9999" else "",
+            },
+        }
+        if delay != "-9999":
+            dep["realDateTime"] = _date_parts(scheduled + timedelta(minutes=int(delay)))
+        departures.append(dep)
+    return departures
+
+
+class MockEFA:
+    """Request handler state: configuration, replay queues and counters."""
+
+    def __init__(
+        self,
+        departures=40,
+        departures_max=None,
+        latency_ms=50.0,
+        jitter_ms=0.0,
+        rate_429=0.0,
+        rate_503=0.0,
+        retry_after_s=1,
+        replay_dir=None,
+        seed=None,
+        stop_names=None,
+        stations=None,
+    ):
+        """
+        Args:
+            departures (int): Departures per synthetic response.
+            departures_max (int, optional): If given, the number of departures is drawn from
+                `[departures, departures_max]` for every response.
+            latency_ms (float): Base latency of every answer.
+            jitter_ms (float): Additional uniformly distributed latency.
+            rate_429 (float): Share of requests answered with 429 Too Many Requests.
+            rate_503 (float): Share of requests answered with 503 Service Unavailable.
+            retry_after_s (int): Retry-After header of the error answers.
+            replay_dir (str or Path, optional): Serve the bodies of this `ResponseArchive`
+                instead of synthetic responses (matched by stop, otherwise round robin).
+            seed (int, optional): Seed for latency and error sampling.
+            stop_names (dict, optional): `stopName` of the synthetic departures per requested
+                stop (`"<place_dm> <name_dm>"`), default: `PLACENAME_STOPS`.
+            stations (list of str, optional): Names that all other requested stops (e.g. catalog
+                IDs) are answered as, picked by a hash of the stop; e.g. the `stop` column of the
+                station shapefile. Without it they are answered under their requested name.
+        """
+        self.departures = departures
+        self.departures_max = departures_max
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.rate_503 = rate_503
+        self.retry_after_s = retry_after_s
+        self.rng = random.Random(seed)
+        self.stop_names = PLACENAME_STOPS if stop_names is None else dict(stop_names)
+        self.stations = list(stations or [])
+        self.stats = {"requests": 0, "ok": 0, "429": 0, "503": 0, "bytes": 0, "departures": 0}
+
+        self.archive = None
+        if replay_dir is not None:
+            self.archive = ResponseArchive(replay_dir, compression="gzip")
+            entries = list(self.archive.entries())
+            if not entries:
+                raise ValueError(f"No recorded responses in {replay_dir}")
+            by_stop = {}
+            for entry in entries:
+                by_stop.setdefault(entry["stop"], []).append(entry)
+            self._replay_by_stop = {stop: itertools.cycle(e) for stop, e in by_stop.items()}
+            self._replay_all = itertools.cycle(entries)
+
+    def stop_name(self, place_dm, name_dm):
+        """Returns the `stopName` of the synthetic departures of a requested stop."""
+        label = stop_label(place_dm, name_dm)
+        if label in self.stop_names:
+            return self.stop_names[label]
+        if self.stations:
+            return self.stations[zlib.crc32(label.encode("utf-8")) % len(self.stations)]
+        return label
+
+    def _body(self, place_dm, name_dm, when):
+        if self.archive is not None:
+            queue = self._replay_by_stop.get(stop_label(place_dm, name_dm), self._replay_all)
+            return self.archive.get(next(queue)), None
+        n = self.departures
+        if self.departures_max is not None:
+            n = self.rng.randint(self.departures, self.departures_max)
+        departures = synthetic_departures(self.stop_name(place_dm, name_dm), when, n)
+        body = json.dumps({"departureList": departures}, ensure_ascii=False).encode("utf-8")
+        return body, n
+
+    async def handle(self, request):
+        """Answers one departure monitor request."""
+        self.stats["requests"] += 1
+        delay_s = (self.latency_ms + self.rng.uniform(0, self.jitter_ms)) / 1000
+        if delay_s > 0:
+            await asyncio.sleep(delay_s)
+
+        draw = self.rng.random()
+        if draw < self.rate_429 + self.rate_503:
+            status = 429 if draw < self.rate_429 else 503
+            self.stats[str(status)] += 1
+            return web.Response(status=status, headers={"Retry-After": str(self.retry_after_s)})
+
+        query = request.query
+        try:
+            when = datetime(
+                int(query["itdDateYear"]),
+                int(query["itdDateMonth"]),
+                int(query["itdDateDay"]),
+                int(query["itdTimeHour"]),
+                int(query["itdTimeMinute"]),
+            )
+        except (KeyError, ValueError):
+            when = datetime.now()
+        body, n = self._body(query.get("place_dm", ""), query.get("name_dm", ""), when)
+
+        self.stats["ok"] += 1
+        self.stats["bytes"] += len(body)
+        self.stats["departures"] += n or 0
+        return web.Response(body=body, content_type="application/json", charset="utf-8")
+
+    async def handle_stats(self, request):
+        """Returns the request counters as JSON."""
+        return web.json_response(self.stats)
+
+
+def make_app(**options):
+    """
+    Creates the aiohttp application of the mock server.
+
+    Args:
+        **options: Passed to `MockEFA`.
+
+    Returns:
+        web.Application: Serves `MOCK_PATH` and `/stats`; the `MockEFA` instance is `app["mock"]`.
+    """
+    mock = MockEFA(**options)
+    app = web.Application()
+    app["mock"] = mock
+    app.router.add_get(MOCK_PATH, mock.handle)
+    app.router.add_get("/stats", mock.handle_stats)
+    return app
+
+
+async def start_mock_server(host="127.0.0.1", port=0, **options):
+    """
+    Starts the mock server inside the running event loop.
+
+    Args:
+        host (str): Interface to bind.
+        port (int): Port to bind (0 picks a free port).
+        **options: Passed to `MockEFA`.
+
+    Returns:
+        tuple:
+            - web.AppRunner: Call `await runner.cleanup()` to stop the server.
+            - str: The URL to use as API URL.
+    """
+    runner = web.AppRunner(make_app(**options), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = runner.addresses[0][1]
+    return runner, f"http://{host}:{bound_port}{MOCK_PATH}"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local stand-in server for the EFA departure monitor.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--departures", type=int, default=40, help="Departures per response (default: 40)")
+    parser.add_argument("--departures-max", type=int, help="Draw the departures per response from [--departures, --departures-max]")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Base latency per answer (default: 50)")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Additional random latency (default: 0)")
+    parser.add_argument("--rate-429", type=float, default=0, help="Share of 429 answers (default: 0)")
+    parser.add_argument("--rate-503", type=float, default=0, help="Share of 503 answers (default: 0)")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After of error answers in seconds (default: 1)")
+    parser.add_argument("--replay", metavar="DIR", help="Replay the responses of a raw response archive")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument(
+        "--stations",
+        metavar="PATH",
+        help="Answer stops outside the placename list as the stations of this geodata file (e.g. data/geodata/source/bahnhoefe.shp)",
+    )
+    args = parser.parse_args()
+
+    stations = None
+    if args.stations:
+        from station_cache import StationGeometryCache
+
+        stations = StationGeometryCache(args.stations).stops
+
+    print(f"[INFO] Mock EFA server at http://{args.host}:{args.port}{MOCK_PATH}")
+    web.run_app(
+        make_app(
+            departures=args.departures,
+            departures_max=args.departures_max,
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            rate_429=args.rate_429,
+            rate_503=args.rate_503,
+            retry_after_s=args.retry_after,
+            replay_dir=args.replay,
+            seed=args.seed,
+            stations=stations,
+        ),
+        host=args.host,
+        port=args.port,
+        access_log=None,
+    )
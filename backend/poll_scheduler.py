@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+Priority poll scheduler for network-scale ingestion.
+
+The fixed placename list polls every stop once per cycle. That does not scale to the few
+thousand stops of the VRR catalog: either the cycle gets very long, or the request rate has to
+go up. Instead, every stop gets a priority tier with its own poll interval (hubs every minute,
+minor stops every 15 minutes) and the scheduler keeps a min-heap of next-due times. The ingest
+loop only requests the stops that are due, so the request budget goes to the busy stations.
+
+Stops are keyed by `(place_dm, name_dm)` tuples like the placename list. Catalog stops are
+requested by their stop ID (`("", "<id>")`), which the EFA resolves without a place name.
+"""
+import heapq
+import json
+import logging
+import re
+import time
+import zlib
+
+
+# Priority tiers in order of importance: (tier, poll interval in seconds)
+PRIORITY_TIERS = [
+    ("hub", 60.0),
+    ("station", 300.0),
+    ("minor", 900.0),
+]
+
+# Main stations (and their EFA abbreviations) are hubs, other railway stations the middle tier
+HUB_PATTERN = re.compile(r"\b(Hbf|Hauptbahnhof|HBF)\b")
+STATION_PATTERN = re.compile(r"\b(Bf|Bahnhof|S)\b")
+# Bike & ride, park & ride and similar entries carry a station name but no departures of their own
+FACILITY_PATTERN = re.compile(r"\b(B&R|P\+R|Radstation|Parkplatz)\b")
+
+
+def fix_mojibake(name):
+    """Repairs UTF-8 names that were decoded as cp1252/latin-1 (e.g. "MÃ¼nster" -> "Münster")."""
+    for encoding in ("cp1252", "latin-1"):
+        try:
+            return name.encode(encoding).decode("utf-8")
+        except UnicodeError:
+            continue
+    return name
+
+
+def classify_stop(name):
+    """
+    Assigns a priority tier to a stop by its name.
+
+    Args:
+        name (str): Stop name, e.g. "Essen, Hauptbahnhof".
+
+    Returns:
+        str: One of the tiers in `PRIORITY_TIERS`.
+    """
+    if FACILITY_PATTERN.search(name):
+        return "minor"
+    if HUB_PATTERN.search(name):
+        return "hub"
+    if STATION_PATTERN.search(name):
+        return "station"
+    return "minor"
+
+
+def stop_label(place_dm, name_dm):
+    """Readable name of a stop key, e.g. "Essen HBF" (or just the ID of a catalog stop)."""
+    return f"{place_dm} {name_dm}".strip()
+
+
+def _placename_key(place, name):
+    """
+    Normalizes a place and stop name for comparisons between the placename list and the catalog.
+
+    "Essen" + "HBF" and "Essen" + "Hauptbahnhof" as well as "Düsseldorf" + "Düsseldorf Hbf"
+    (catalog names repeat the place) give the same key.
+    """
+    place = place.strip().casefold()
+    name = name.strip()
+    if place and name.casefold().startswith(place + " "):
+        name = name[len(place) + 1 :]
+    return place, HUB_PATTERN.sub("hbf", name).casefold()
+
+
+# Load the stop catalog (e.g. legacy/get_stops+departures/vrr_haltestellen.json)
+def load_catalog(path, hubs=(), placenames=()):
+    """
+    Loads a stop catalog and assigns a priority tier to every stop.
+
+    Args:
+        path (str or Path): JSON list of `{"name", "id", "type", ...}` entries. Only entries of
+            type `stop` are used; duplicate IDs are dropped.
+        hubs (iterable of str, optional): Stop IDs that are hubs regardless of their name.
+        placenames (iterable of tuple, optional): `(place_dm, name_dm)` keys that are polled
+            anyway (e.g. the placename list); catalog entries of the same stops are dropped, so
+            that they are not requested twice.
+
+    Returns:
+        list of dict: `{"id", "name", "tier", "key"}` per stop, where `key` is the
+        `(place_dm, name_dm)` tuple to request the stop by ID.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    hubs = {str(stop_id) for stop_id in hubs}
+    placenames = {_placename_key(place_dm, name_dm) for place_dm, name_dm in placenames}
+
+    stops = []
+    seen = set()
+    duplicates = 0
+    for entry in entries:
+        stop_id = str(entry.get("id", "")).strip()
+        if entry.get("type", "stop") != "stop" or not stop_id or stop_id in seen:
+            continue
+        seen.add(stop_id)
+        name = fix_mojibake(entry.get("name", ""))
+        place, _, stop_name = name.partition(", ")
+        if _placename_key(place, stop_name) in placenames:
+            duplicates += 1
+            continue
+        tier = "hub" if stop_id in hubs else classify_stop(name)
+        stops.append({"id": stop_id, "name": name, "tier": tier, "key": ("", stop_id)})
+
+    counts = {tier: sum(1 for stop in stops if stop["tier"] == tier) for tier, _ in PRIORITY_TIERS}
+    logging.info(
+        f"Loaded {len(stops)} stops from {path}: {counts}, "
+        f"{duplicates} already on the placename list."
+    )
+    return stops
+
+
+class PollScheduler:
+    """
+    Min-heap of next-due times for stops with per-tier poll intervals.
+
+    Heap entries are `(due, seq, key)`; `seq` breaks ties in insertion order. Rescheduling or
+    removing a stop leaves its old heap entry behind, which is skipped when it comes up
+    (lazy deletion), so every operation is O(log n).
+    """
+
+    def __init__(self, intervals=None, clock=time.monotonic):
+        """
+        Args:
+            intervals (dict, optional): Poll interval in seconds per tier (default: `PRIORITY_TIERS`).
+            clock (callable): Monotonic clock in seconds.
+        """
+        self.intervals = dict(PRIORITY_TIERS)
+        if intervals:
+            self.intervals.update(intervals)
+        self._clock = clock
+        self._heap = []
+        self._seq = 0
+        self._tiers = {}  # key -> tier
+        self._overrides = {}  # key -> poll interval replacing the one of its tier
+        self._due = {}  # key -> due time of its current heap entry
+
+    def __len__(self):
+        return len(self._tiers)
+
+    def __contains__(self, key):
+        return key in self._tiers
+
+    def tier(self, key):
+        """Returns the priority tier of a stop."""
+        return self._tiers[key]
+
+    def interval(self, key):
+        """Returns the poll interval of a stop in seconds."""
+        tier_interval_s = self.intervals[self._tiers[key]]
+        if key in self._overrides:
+            return max(self._overrides[key], tier_interval_s)
+        return tier_interval_s
+
+    def set_interval(self, key, interval_s=None):
+        """
+        Overrides the poll interval of a single stop (e.g. from `AdaptivePolling`).
+
+        An override can only lengthen the interval: the interval of the stop's tier (as
+        stretched by `fit_to_rate`) stays the floor, so the schedule keeps within the rate.
+
+        Args:
+            key (tuple): `(place_dm, name_dm)` of a known stop.
+            interval_s (float, optional): New interval in seconds, None to use the tier's again.
+                Takes effect with the next `reschedule`.
+        """
+        if key not in self._tiers:
+            return
+        if interval_s is None:
+            self._overrides.pop(key, None)
+        else:
+            self._overrides[key] = float(interval_s)
+
+    def _push(self, key, due):
+        self._due[key] = due
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, key))
+
+    def add(self, key, tier, due=None):
+        """
+        Adds a stop (or changes the tier of a known stop).
+
+        Args:
+            key (tuple): `(place_dm, name_dm)` of the stop.
+            tier (str): Priority tier, a key of `intervals`.
+            due (float, optional): First due time on the scheduler clock. By default the first
+                polls are spread over one interval (by a hash of the key), so that a freshly
+                loaded catalog does not come due all at once.
+        """
+        if tier not in self.intervals:
+            raise ValueError(f"Unknown priority tier: {tier}")
+        self._tiers[key] = tier
+        if due is None:
+            if key in self._due:
+                return
+            spread = zlib.crc32(repr(key).encode("utf-8")) / 2**32
+            due = self._clock() + spread * self.intervals[tier]
+        self._push(key, due)
+
+    def add_catalog(self, stops):
+        """Adds the stops of `load_catalog`."""
+        for stop in stops:
+            self.add(stop["key"], stop["tier"])
+
+    def remove(self, key):
+        """Stops polling a stop."""
+        self._tiers.pop(key, None)
+        self._overrides.pop(key, None)
+        self._due.pop(key, None)
+
+    def reschedule(self, key, now=None):
+        """Schedules the next poll of a stop one interval after `now` (default: the clock)."""
+        if key not in self._tiers:
+            return
+        now = self._clock() if now is None else now
+        self._push(key, now + self.interval(key))
+
+    def _drop_stale(self):
+        while self._heap:
+            due, _, key = self._heap[0]
+            if self._due.get(key) == due:
+                return
+            heapq.heappop(self._heap)
+
+    def seconds_until_due(self):
+        """Returns the seconds until the next stop is due (0 if one is overdue, None if empty)."""
+        self._drop_stale()
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - self._clock())
+
+    def pop_due(self, limit=None):
+        """
+        Takes the stops that are due, most overdue first.
+
+        The returned stops stay known to the scheduler but are not due again until they are
+        `reschedule`d, which the caller does once their request has finished.
+
+        Args:
+            limit (int, optional): Maximum number of stops to return.
+
+        Returns:
+            list of tuple: Keys of the due stops.
+        """
+        now = self._clock()
+        due_keys = []
+        while limit is None or len(due_keys) < limit:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            _, _, key = heapq.heappop(self._heap)
+            del self._due[key]
+            due_keys.append(key)
+        return due_keys
+
+    def required_rate(self):
+        """Returns the request rate (per second) needed to poll every stop at its interval."""
+        counts = {}
+        for key, tier in self._tiers.items():
+            if key not in self._overrides:
+                counts[tier] = counts.get(tier, 0) + 1
+        rate = sum(n / self.intervals[tier] for tier, n in counts.items())
+        return rate + sum(1 / self.interval(key) for key in self._overrides)
+
+    def fit_to_rate(self, rate):
+        """
+        Stretches the intervals of the lower tiers until the schedule fits a request rate.
+
+        Only the least important tier is stretched, as far as needed, as long as the more
+        important tiers alone fit into the rate. Otherwise the next tier is added and all
+        stretched tiers get the same factor. Hubs keep their interval as long as the hubs alone
+        fit into the rate.
+
+        Args:
+            rate (float): Available requests per second.
+
+        Returns:
+            dict: The resulting poll interval in seconds per tier.
+        """
+        counts = {tier: 0 for tier in self.intervals}
+        for tier in self._tiers.values():
+            counts[tier] += 1
+        order = [tier for tier, _ in PRIORITY_TIERS if tier in counts]
+        order += [tier for tier in counts if tier not in order]
+
+        # Stretch the tiers from `i` on into the rate that the more important tiers leave
+        for i in range(len(order) - 1, -1, -1):
+            fixed = sum(counts[tier] / self.intervals[tier] for tier in order[:i])
+            stretched = order[i:]
+            needed = sum(counts[tier] / self.intervals[tier] for tier in stretched)
+            if fixed + needed <= rate:
+                break
+            if fixed < rate:
+                factor = needed / (rate - fixed)
+                for tier in stretched:
+                    self.intervals[tier] *= factor
+                break
+        return dict(self.intervals)
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Poll efficiency telemetry: useful vs. wasted requests per stop.
+
+Every request of the ingest loop is recorded with the number of departures that came back,
+how many of them were new (appended to the storage) and how many were already known, plus the
+response latency and size. A poll that returned nothing new is "wasted": the request budget
+would have been better spent on another stop. Rolling summaries per stop (over `window_s`) and
+per cycle show where that happens, e.g. to tune the intervals of `PollScheduler`.
+"""
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+
+# Numeric stop summary fields the stops can be sorted by
+SORT_FIELDS = (
+    "polls",
+    "errors",
+    "wasted",
+    "wasted_share",
+    "returned",
+    "new",
+    "known",
+    "new_per_poll",
+    "latency_mean_s",
+    "latency_p95_s",
+    "bytes_mean",
+    "last_poll",
+)
+
+
+def _percentile(values, q):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def _round(value, digits=3):
+    return None if value is None else round(value, digits)
+
+
+class PollTelemetry:
+    """Rolling per-stop and per-cycle statistics of the departure requests."""
+
+    def __init__(self, window_s=3600.0, max_cycles=100, clock=time.time):
+        """
+        Args:
+            window_s (float): Age in seconds after which polls drop out of the per-stop summaries.
+            max_cycles (int): Number of recent cycles kept for the per-cycle summaries.
+            clock (callable): Wall clock in seconds (timestamps in the summaries).
+        """
+        self.window_s = window_s
+        self._clock = clock
+        self._stops = {}  # stop -> deque of poll records, oldest first
+        self._cycles = deque(maxlen=max_cycles)
+        self._cycle = 0
+        self._lock = threading.Lock()  # records come from worker threads (asyncio.to_thread)
+        self.start_cycle()
+
+    def start_cycle(self):
+        """Starts a new cycle; the following polls are counted towards it. Returns its number."""
+        with self._lock:
+            if self._cycles and self._cycles[-1]["polls"] == 0:
+                # Nothing recorded since the last start (e.g. the implicit first cycle): replace it
+                self._cycles.pop()
+            else:
+                self._cycle += 1
+            self._cycles.append(
+                {
+                    "cycle": self._cycle,
+                    "started": self._clock(),
+                    "polls": 0,
+                    "errors": 0,
+                    "wasted": 0,
+                    "returned": 0,
+                    "new": 0,
+                    "bytes": 0,
+                    "latency_s": 0.0,
+                }
+            )
+            return self._cycle
+
+    def record(self, stop, returned=0, new=0, latency_s=None, size_bytes=None, status=None, error=False):
+        """
+        Records one request.
+
+        Args:
+            stop (str): The requested stop (`"<place_dm> <name_dm>"`).
+            returned (int): Departures in the response.
+            new (int): Departures that were not known yet.
+            latency_s (float, optional): Time from sending the request to the read body.
+            size_bytes (int, optional): Size of the response body.
+            status (int, optional): HTTP status code.
+            error (bool): The request failed (no departures were processed).
+        """
+        now = self._clock()
+        poll = (now, returned, new, latency_s, size_bytes, status, error)
+        with self._lock:
+            polls = self._stops.setdefault(stop, deque())
+            polls.append(poll)
+            self._prune(polls, now)
+
+            cycle = self._cycles[-1]
+            cycle["polls"] += 1
+            cycle["errors"] += int(error)
+            cycle["wasted"] += int(not error and new == 0)
+            cycle["returned"] += returned
+            cycle["new"] += new
+            cycle["bytes"] += size_bytes or 0
+            cycle["latency_s"] += latency_s or 0.0
+
+    def _prune(self, polls, now):
+        while polls and polls[0][0] < now - self.window_s:
+            polls.popleft()
+
+    def stop_summary(self, stop):
+        """
+        Summarizes the polls of one stop within the window.
+
+        Returns:
+            dict or None: Counts (`polls`, `errors`, `wasted`, `returned`, `new`, `known`),
+            `wasted_share` (successful polls without new departures), `new_per_poll`,
+            latency (`latency_mean_s`, `latency_p95_s`), `bytes_mean` and `last_poll`
+            (timestamp); None if the stop has no polls in the window.
+        """
+        with self._lock:
+            polls = self._stops.get(stop)
+            if polls is None:
+                return None
+            self._prune(polls, self._clock())
+            polls = list(polls)
+        if not polls:
+            return None
+
+        ok = [p for p in polls if not p[6]]
+        returned = sum(p[1] for p in ok)
+        new = sum(p[2] for p in ok)
+        latencies = [p[3] for p in polls if p[3] is not None]
+        sizes = [p[4] for p in ok if p[4] is not None]
+        wasted = sum(1 for p in ok if p[2] == 0)
+        return {
+            "stop": stop,
+            "polls": len(polls),
+            "errors": len(polls) - len(ok),
+            "wasted": wasted,
+            "wasted_share": _round(wasted / len(ok)) if ok else None,
+            "returned": returned,
+            "new": new,
+            "known": returned - new,
+            "new_per_poll": _round(new / len(ok)) if ok else None,
+            "latency_mean_s": _round(sum(latencies) / len(latencies)) if latencies else None,
+            "latency_p95_s": _round(_percentile(latencies, 95)) if latencies else None,
+            "bytes_mean": round(sum(sizes) / len(sizes)) if sizes else None,
+            "last_poll": polls[-1][0],
+        }
+
+    def cycle_summary(self, last=None):
+        """Returns the totals of the recent cycles (newest last), `last` limits their number."""
+        with self._lock:
+            cycles = [dict(cycle) for cycle in self._cycles]
+        if last is not None:
+            cycles = cycles[-last:]
+        for cycle in cycles:
+            ok = cycle["polls"] - cycle["errors"]
+            cycle["wasted_share"] = _round(cycle["wasted"] / ok) if ok else None
+            cycle["latency_mean_s"] = _round(cycle["latency_s"] / cycle["polls"]) if cycle["polls"] else None
+            del cycle["latency_s"]
+        return cycles
+
+    def summary(self, sort="wasted", limit=None, cycles=10):
+        """
+        Summarizes all stops and the recent cycles.
+
+        Args:
+            sort (str): Stop summary field to sort by, descending (one of `SORT_FIELDS`, e.g.
+                `wasted`, `new`, `latency_p95_s`).
+            limit (int, optional): Maximum number of stops.
+            cycles (int): Number of recent cycles.
+
+        Returns:
+            dict: `generated` (timestamp), `window_s`, `totals`, `stops` and `cycles`.
+
+        Raises:
+            ValueError: If `sort` is not a numeric stop summary field.
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Cannot sort stops by {sort!r}")
+        with self._lock:
+            names = list(self._stops)
+        stops = [s for s in (self.stop_summary(name) for name in names) if s is not None]
+        stops.sort(key=lambda s: (s.get(sort) is None, -(s.get(sort) or 0)))
+
+        polls = sum(s["polls"] for s in stops)
+        errors = sum(s["errors"] for s in stops)
+        wasted = sum(s["wasted"] for s in stops)
+        totals = {
+            "stops": len(stops),
+            "polls": polls,
+            "errors": errors,
+            "wasted": wasted,
+            "wasted_share": _round(wasted / (polls - errors)) if polls > errors else None,
+            "returned": sum(s["returned"] for s in stops),
+            "new": sum(s["new"] for s in stops),
+        }
+        return {
+            "generated": self._clock(),
+            "window_s": self.window_s,
+            "totals": totals,
+            "stops": stops[:limit] if limit is not None else stops,
+            "cycles": self.cycle_summary(cycles),
+        }
+
+    def report(self, top=5):
+        """Returns a short text report: totals and the stops with the most wasted polls."""
+        summary = self.summary(limit=top, cycles=1)
+        totals = summary["totals"]
+        lines = [
+            f"Poll telemetry (last {round(self.window_s / 60)} min): {totals['polls']} polls of "
+            f"{totals['stops']} stops, {totals['errors']} errors, {totals['wasted']} without new "
+            f"departures (share {totals['wasted_share']}), {totals['new']} of {totals['returned']} "
+            f"departures new."
+        ]
+        for s in summary["stops"]:
+            lines.append(
+                f"  {s['stop']}: {s['wasted']}/{s['polls']} wasted, {s['new_per_poll']} new per poll, "
+                f"latency p95 {s['latency_p95_s']} s, {s['bytes_mean']} bytes"
+            )
+        return "\n".join(lines)
+
+    def write(self, path):
+        """Writes the summary as JSON, replacing the file atomically (e.g. for the web server)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
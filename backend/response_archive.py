@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Compressed, rotating archive for the raw API responses.
+
+Every response body is compressed on its own (one gzip member, or one zstd frame if the
+optional `zstandard` package is installed) and appended to the current segment file. Segments
+are rotated once they exceed a size or age limit:
+
+    data/temp/responses/
+        responses-20250824T120000-1724500800123456789.gz
+        responses-20250824T120000-1724500800123456789.gz.idx.jsonl
+        ...
+
+The sidecar `.idx.jsonl` next to each segment has one line per response with the stop, the
+request time and the byte offset and length of its compressed block, so a single response can
+be decompressed without touching the rest of the segment. Concatenated gzip members are still
+a valid gzip file, i.e. `zcat responses-*.gz` prints all bodies of a segment.
+"""
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:  # optional, gzip is used otherwise
+    zstandard = None
+
+
+INDEX_SUFFIX = ".idx.jsonl"
+_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def _decompress(block, suffix):
+    """Decompresses one block of a segment, based on the segment's file suffix."""
+    if suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError("The zstandard package is required to read .zst segments")
+        return zstandard.ZstdDecompressor().decompress(block)
+    return gzip.decompress(block)
+
+
+class ResponseArchive:
+    """Appends raw responses to rotating compressed segments with an offset index."""
+
+    def __init__(
+        self,
+        root_dir,
+        max_segment_bytes=64 * 1024 * 1024,
+        max_segment_age_s=24 * 3600,
+        compression=None,
+        level=None,
+    ):
+        """
+        Args:
+            root_dir (str or Path): Directory of the segments (created if missing).
+            max_segment_bytes (int): Start a new segment once the current one is larger than this.
+            max_segment_age_s (float): Start a new segment once the current one is older than this.
+            compression (str, optional): "zstd" or "gzip"; default zstd if installed, else gzip.
+            level (int, optional): Compression level (default: 3 for zstd, 6 for gzip).
+        """
+        if compression is None:
+            compression = "zstd" if zstandard is not None else "gzip"
+        if compression not in _SUFFIXES:
+            raise ValueError(f"Unknown compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise RuntimeError("The zstandard package is required for zstd compression")
+
+        self.root_dir = Path(root_dir)
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age_s = max_segment_age_s
+        self.compression = compression
+        if compression == "zstd":
+            self._compress = zstandard.ZstdCompressor(level=level or 3).compress
+        else:
+            self._compress = lambda body: gzip.compress(body, compresslevel=level or 6)
+
+        self._lock = threading.Lock()
+        self._segment = None
+        self._segment_started = 0.0
+
+    def _new_segment(self):
+        now = time.time()
+        stamp = datetime.fromtimestamp(now).strftime("%Y%m%dT%H%M%S")
+        name = f"responses-{stamp}-{time.time_ns()}{_SUFFIXES[self.compression]}"
+        self._segment = self.root_dir / name
+        self._segment_started = now
+
+    def _needs_rotation(self):
+        if self._segment is None or not self._segment.exists():
+            return True
+        if time.time() - self._segment_started >= self.max_segment_age_s:
+            return True
+        return self._segment.stat().st_size >= self.max_segment_bytes
+
+    def append(self, body, stop=None, request_time=None):
+        """
+        Compresses and appends one raw response.
+
+        Args:
+            body (bytes): The undecoded response body.
+            stop (str, optional): The requested stop (e.g. "Bochum Hbf").
+            request_time (datetime, optional): The time the departures were requested for.
+
+        Returns:
+            dict: The index entry of the response.
+        """
+        block = self._compress(body)
+        with self._lock:
+            if self._needs_rotation():
+                self._new_segment()
+            with open(self._segment, "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(block)
+            entry = {
+                "stop": stop,
+                "request_time": request_time.isoformat() if request_time else None,
+                "archived_at": datetime.now().isoformat(timespec="seconds"),
+                "segment": self._segment.name,
+                "offset": offset,
+                "length": len(block),
+                "size": len(body),
+            }
+            # The index line is written after the data, so every indexed block is complete
+            with open(self._segment.with_name(self._segment.name + INDEX_SUFFIX), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return entry
+
+    def segments(self):
+        """Returns the segment files, oldest first."""
+        return sorted(
+            path
+            for suffix in _SUFFIXES.values()
+            for path in self.root_dir.glob(f"responses-*{suffix}")
+        )
+
+    def entries(self, stop=None, time_from=None, time_to=None):
+        """
+        Yields the index entries, oldest first, optionally filtered.
+
+        Args:
+            stop (str, optional): Only responses for this stop.
+            time_from (str, optional): Oldest request time (ISO, inclusive).
+            time_to (str, optional): Newest request time (ISO, inclusive).
+
+        Yields:
+            dict: Index entries as written by `append`.
+        """
+        for segment in self.segments():
+            index_path = segment.with_name(segment.name + INDEX_SUFFIX)
+            try:
+                with open(index_path, encoding="utf-8") as f:
+                    lines = f.readlines()
+            except FileNotFoundError:
+                continue
+            for line in lines:
+                if not line.endswith("\n"):
+                    continue  # partially written last line
+                entry = json.loads(line)
+                if stop is not None and entry["stop"] != stop:
+                    continue
+                request_time = entry["request_time"] or ""
+                if time_from is not None and request_time < time_from:
+                    continue
+                if time_to is not None and request_time > time_to:
+                    continue
+                yield entry
+
+    def get(self, entry):
+        """
+        Reads and decompresses a single response.
+
+        Args:
+            entry (dict): An index entry returned by `append` or `entries`.
+
+        Returns:
+            bytes: The original response body.
+        """
+        path = self.root_dir / entry["segment"]
+        with open(path, "rb") as f:
+            f.seek(entry["offset"])
+            block = f.read(entry["length"])
+        return _decompress(block, path.suffix)
+
+    def iter_bodies(self, **filters):
+        """Yields `(entry, body)` for all responses matching the filters of `entries`."""
+        for entry in self.entries(**filters):
+            yield entry, self.get(entry)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Lists or extracts archived raw API responses.")
+    parser.add_argument("archive_dir", type=Path, help="Directory of the response segments")
+    parser.add_argument("--stop", help="Only responses for this stop")
+    parser.add_argument("--from", dest="time_from", help="Oldest request time (ISO)")
+    parser.add_argument("--to", dest="time_to", help="Newest request time (ISO)")
+    parser.add_argument("--extract", action="store_true", help="Print the response bodies instead of the index")
+    args = parser.parse_args()
+
+    archive = ResponseArchive(args.archive_dir, compression="gzip")
+    filters = {"stop": args.stop, "time_from": args.time_from, "time_to": args.time_to}
+    for entry in archive.entries(**filters):
+        if args.extract:
+            sys.stdout.buffer.write(archive.get(entry) + b"\n")
+        else:
+            print(json.dumps(entry, ensure_ascii=False))
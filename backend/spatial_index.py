@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Grid index over the station points for viewport (bounding box) queries.
+
+The map only shows the current viewport, so it should not have to load every stop of the
+network. `GridIndex` keeps the points in a hierarchy of regular lon/lat grids (level `k` has
+cells of 360 / 2**k degrees). A bounding box query reads the cells of the finest level at which
+the box covers at most `max_query_cells` cells, so its cost depends on the size of the answer,
+not on the number of indexed points.
+
+With a map zoom level the query thins the answer out to one stop per cell of about 32 screen
+pixels (level `zoom + 3`, since a 256 px tile spans 360 / 2**zoom degrees): the stop with the
+highest weight (e.g. the number of departures) represents the cell. The representatives are
+kept up to date on insert and remove, so a zoomed-out query reads one entry per visible cell.
+"""
+import math
+
+
+# A 256 px tile spans one cell of level `zoom`, a 32 px cell is 3 levels finer
+THIN_LEVEL_OFFSET = 3
+
+
+class GridIndex:
+    """Multi-level lon/lat grid of named points with a per-cell representative."""
+
+    def __init__(self, min_level=2, max_level=16, max_query_cells=1024):
+        """
+        Args:
+            min_level (int): Coarsest grid level (cells of 360 / 2**min_level degrees).
+            max_level (int): Finest grid level; map zoom levels from `max_level - 3` on are
+                answered without thinning.
+            max_query_cells (int): Maximum number of cells a query reads.
+        """
+        self.min_level = min_level
+        self.max_level = max_level
+        self.max_query_cells = max_query_cells
+        self._points = {}  # stop -> (lon, lat, weight)
+        self._cells = {level: {} for level in self.levels}  # level -> {(ix, iy): set of stops}
+        self._reps = {level: {} for level in self.levels}  # level -> {(ix, iy): stop}
+
+    @property
+    def levels(self):
+        return range(self.min_level, self.max_level + 1)
+
+    @property
+    def detail_zoom(self):
+        """Lowest map zoom level whose queries are not thinned out."""
+        return self.max_level - THIN_LEVEL_OFFSET
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, stop):
+        return stop in self._points
+
+    @staticmethod
+    def _cell_index(value, offset, n):
+        return min(n - 1, max(0, math.floor((value + offset) / 360.0 * n)))
+
+    def _cell(self, level, lon, lat):
+        n = 2**level
+        return self._cell_index(lon, 180.0, n), self._cell_index(lat, 90.0, n)
+
+    def insert(self, stop, lon, lat, weight=0):
+        """Adds a point, or moves/reweights it if the stop is already indexed."""
+        if stop in self._points:
+            if self._points[stop][:2] == (lon, lat):
+                self._points[stop] = (lon, lat, weight)
+                for level in self.levels:
+                    self._update_rep(level, self._cell(level, lon, lat), stop)
+                return
+            self.remove(stop)
+        self._points[stop] = (lon, lat, weight)
+        for level in self.levels:
+            cell = self._cell(level, lon, lat)
+            self._cells[level].setdefault(cell, set()).add(stop)
+            self._update_rep(level, cell, stop)
+
+    def _update_rep(self, level, cell, stop):
+        reps = self._reps[level]
+        current = reps.get(cell)
+        if current == stop:
+            # Its weight may have dropped below the one of another member
+            reps[cell] = self._best(self._cells[level][cell])
+        elif current is None or self._rank(stop) > self._rank(current):
+            reps[cell] = stop
+
+    def _rank(self, stop):
+        # Highest weight first, ties broken by name so that the representative is deterministic
+        return self._points[stop][2], stop
+
+    def _best(self, stops):
+        return max(stops, key=self._rank)
+
+    def remove(self, stop):
+        """Removes a point (no-op for unknown stops)."""
+        point = self._points.pop(stop, None)
+        if point is None:
+            return
+        lon, lat, _ = point
+        for level in self.levels:
+            cell = self._cell(level, lon, lat)
+            members = self._cells[level][cell]
+            members.discard(stop)
+            if not members:
+                del self._cells[level][cell]
+                del self._reps[level][cell]
+            elif self._reps[level][cell] == stop:
+                self._reps[level][cell] = self._best(members)
+
+    def _cell_range(self, level, bbox):
+        minx, miny, maxx, maxy = bbox
+        x0, y0 = self._cell(level, minx, miny)
+        x1, y1 = self._cell(level, maxx, maxy)
+        return x0, y0, x1, y1
+
+    def _cells_in(self, level, bbox, cells):
+        """Yields the values of the occupied `cells` inside the box, reading the cheaper way."""
+        x0, y0, x1, y1 = self._cell_range(level, bbox)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) <= len(cells):
+            for ix in range(x0, x1 + 1):
+                for iy in range(y0, y1 + 1):
+                    value = cells.get((ix, iy))
+                    if value is not None:
+                        yield value
+        else:
+            # Fewer occupied cells than cells in the box: scan the occupied ones
+            for (ix, iy), value in cells.items():
+                if x0 <= ix <= x1 and y0 <= iy <= y1:
+                    yield value
+
+    def _query_level(self, bbox, finest):
+        """Finest level up to `finest` at which the box covers at most `max_query_cells` cells."""
+        for level in range(finest, self.min_level - 1, -1):
+            x0, y0, x1, y1 = self._cell_range(level, bbox)
+            if (x1 - x0 + 1) * (y1 - y0 + 1) <= self.max_query_cells:
+                return level
+        return self.min_level
+
+    def query(self, bbox, zoom=None):
+        """
+        Returns the stops in a bounding box.
+
+        Args:
+            bbox (tuple): `(minx, miny, maxx, maxy)` in degrees (WGS84 lon/lat).
+            zoom (int, optional): Map zoom level. Below `detail_zoom` only the representative of
+                every ~32 px cell is returned (it may lie slightly outside the box).
+
+        Returns:
+            list of str: The stops, in no particular order.
+        """
+        if zoom is not None and zoom < self.detail_zoom:
+            level = self._query_level(bbox, max(self.min_level, int(zoom) + THIN_LEVEL_OFFSET))
+            return list(self._cells_in(level, bbox, self._reps[level]))
+
+        minx, miny, maxx, maxy = bbox
+        level = self._query_level(bbox, self.max_level)
+        stops = []
+        for members in self._cells_in(level, bbox, self._cells[level]):
+            for stop in members:
+                lon, lat, _ = self._points[stop]
+                if minx <= lon <= maxx and miny <= lat <= maxy:
+                    stops.append(stop)
+        return stops
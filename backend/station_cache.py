@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Cache for the station geometries.
+
+The station shapefile (`data/geodata/source/bahnhoefe.shp`) never changes while the ingest loop
+runs, yet it used to be opened through GDAL for every geodata refresh. `StationGeometryCache`
+loads it once, keeps the points as a compact coordinate array keyed by `stop`, and only reloads
+when the file's modification time changes.
+"""
+import logging
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+
+
+class StationGeometryCache:
+    """Station point geometries loaded once and kept in memory."""
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str or Path): Path to the station geodata file (e.g. the shapefile).
+        """
+        self.path = Path(path)
+        self.stops = []
+        self.coords = np.empty((0, 2), dtype=np.float64)
+        self.index = {}
+        self._mtime_ns = None
+        self.refresh()
+
+    def _load(self):
+        gdf = gpd.read_file(self.path)
+        gdf = gdf[gdf.geometry.notna()].drop_duplicates(subset="stop").reset_index(drop=True)
+        if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+            # Keep WGS84 lon/lat, the coordinate system of GeoJSON
+            gdf = gdf.to_crs(4326)
+        self.stops = gdf["stop"].tolist()
+        self.coords = np.column_stack([gdf.geometry.x.to_numpy(), gdf.geometry.y.to_numpy()])
+        self.index = {stop: i for i, stop in enumerate(self.stops)}
+        logging.info(f"Loaded {len(self.stops)} station geometries from {self.path}.")
+
+    def refresh(self):
+        """
+        Reloads the geometries if the file changed since the last load.
+
+        Returns:
+            bool: True if the file was (re)loaded.
+        """
+        mtime_ns = self.path.stat().st_mtime_ns
+        if mtime_ns == self._mtime_ns:
+            return False
+        self._load()
+        self._mtime_ns = mtime_ns
+        return True
+
+    def __len__(self):
+        return len(self.stops)
+
+    def __contains__(self, stop):
+        return stop in self.index
+
+    def get(self, stop):
+        """Returns the (x, y) coordinate of a stop, or None if the stop is unknown."""
+        i = self.index.get(stop)
+        return None if i is None else (float(self.coords[i, 0]), float(self.coords[i, 1]))
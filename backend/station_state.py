@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+Versioned station state for the delta API.
+
+`StationState` keeps the latest GeoJSON feature of every stop together with a monotonically
+increasing version. Every update that changes at least one stop bumps the version, and each stop
+remembers the version in which it last changed. Clients then ask for `since=<version>` and only
+get the stops that changed after it, so the refresh traffic depends on the number of changed
+stops instead of the size of the network.
+
+The ETag combines a random instance token with the version, so that a client never mistakes
+the state of a restarted server (whose versions start again at 0) for the one it already has.
+
+The stop points are kept in a `GridIndex`, so that a map can ask for the stops of its viewport
+only (`snapshot(bbox=..., zoom=...)`). The index is filled from the station geometries
+(`index_stations`), not from the features: stations without buffered departures (e.g. right
+after a restart) stay on the map as idle stations, the features only update their weights.
+"""
+import json
+import os
+import threading
+import uuid
+
+from spatial_index import GridIndex
+
+
+def _index_weight(feature):
+    """Weight of a stop in the spatial index: its number of buffered departures."""
+    props = feature["properties"]
+    count = props.get("departure_count")
+    if count is None:
+        # Features written before the aggregates existed only carry the lists
+        count = len(props.get("delays") or [])
+    return count
+
+
+def _idle_feature(stop, lon, lat):
+    """Feature of a station without buffered departures."""
+    return {
+        "type": "Feature",
+        "properties": {"stop": stop, "departure_count": 0},
+        "geometry": {"type": "Point", "coordinates": [lon, lat]},
+    }
+
+
+class StationState:
+    """Latest GeoJSON feature per stop, with a global and a per-stop version."""
+
+    def __init__(self):
+        self.instance = uuid.uuid4().hex[:12]
+        self.version = 0
+        self._features = {}  # stop -> GeoJSON feature
+        self._changed = {}  # stop -> version of the last change
+        self._removed = {}  # stop -> version in which it disappeared
+        self._stations = {}  # stop -> (lon, lat) of every known station
+        self.index = GridIndex()
+        self._lock = threading.Lock()
+        self._source_mtime = None
+
+    def __len__(self):
+        return len(self._features)
+
+    @property
+    def etag(self):
+        """Strong ETag of the current version."""
+        return f'"{self.instance}-{self.version}"'
+
+    def index_stations(self, stations):
+        """
+        Indexes the points of all stations, including those without departures.
+
+        Stops that have a feature keep its weight, the others are indexed with weight 0. Stations
+        missing from `stations` are dropped from the index unless they have a feature.
+
+        Args:
+            stations (dict): Station points as `stop -> (lon, lat)` in WGS84, e.g. from
+                `StationGeometryCache`.
+        """
+        with self._lock:
+            for stop in set(self._stations) - set(stations):
+                if stop not in self._features:
+                    self.index.remove(stop)
+            self._stations = dict(stations)
+            for stop, (lon, lat) in self._stations.items():
+                if stop not in self._features:
+                    self.index.insert(stop, lon, lat, 0)
+
+    def _unindex(self, stop):
+        # Known stations stay in the index as idle stations
+        if stop in self._stations:
+            self.index.insert(stop, *self._stations[stop], 0)
+        else:
+            self.index.remove(stop)
+
+    def update(self, features, replace=True):
+        """
+        Merges new station features into the state.
+
+        Args:
+            features (iterable of dict): GeoJSON point features with a `stop` property.
+            replace (bool): If True, `features` is the complete new state and stops missing from
+                it are removed; otherwise only the given stops are updated.
+
+        Returns:
+            set: Names of the stops that were added, changed or removed.
+        """
+        with self._lock:
+            incoming = {f["properties"]["stop"]: f for f in features}
+            changed = {
+                stop
+                for stop, feature in incoming.items()
+                if self._features.get(stop) != feature
+            }
+            removed = set(self._features) - set(incoming) if replace else set()
+            if not changed and not removed:
+                return set()
+
+            self.version += 1
+            for stop in changed:
+                feature = incoming[stop]
+                self._features[stop] = feature
+                self._changed[stop] = self.version
+                self._removed.pop(stop, None)
+                geometry = feature.get("geometry") or {}
+                if geometry.get("type") == "Point":
+                    lon, lat = geometry["coordinates"][:2]
+                    self.index.insert(stop, lon, lat, _index_weight(feature))
+                else:
+                    self._unindex(stop)
+            for stop in removed:
+                del self._features[stop]
+                del self._changed[stop]
+                self._removed[stop] = self.version
+                self._unindex(stop)
+            return changed | removed
+
+    def feature(self, stop):
+        """Returns the current feature of a stop, or None if the stop is unknown."""
+        with self._lock:
+            return self._feature(stop)
+
+    def _feature(self, stop):
+        feature = self._features.get(stop)
+        if feature is None and stop in self._stations:
+            feature = _idle_feature(stop, *self._stations[stop])
+        return feature
+
+    def snapshot(self, since=None, bbox=None, zoom=None):
+        """
+        Returns the state, or only the changes after version `since`, as a FeatureCollection.
+
+        Args:
+            since (int, optional): Version the client already has. Ignored (full state) if it is
+                missing or larger than the current version.
+            bbox (tuple, optional): `(minx, miny, maxx, maxy)` in WGS84 lon/lat: only return the
+                stops in this box (`full` then refers to the box), including the indexed stations
+                without departures.
+            zoom (int, optional): Map zoom level used to thin out the stops of `bbox` (see
+                `GridIndex.query`).
+
+        Returns:
+            dict: A GeoJSON FeatureCollection with the additional members `instance`, `version`,
+            `full` (False for a delta) and `removed` (stops deleted since `since`).
+        """
+        with self._lock:
+            full = since is None or since < 0 or since > self.version
+            if bbox is not None:
+                stops = self.index.query(bbox, zoom)
+                if not full:
+                    # Stations whose feature was removed come back as idle stations
+                    stops = [
+                        stop
+                        for stop in stops
+                        if max(self._changed.get(stop, -1), self._removed.get(stop, -1)) > since
+                    ]
+                features = [self._feature(stop) for stop in stops]
+            elif full:
+                features = list(self._features.values())
+            else:
+                features = [
+                    self._features[stop]
+                    for stop, version in self._changed.items()
+                    if version > since
+                ]
+            if full:
+                removed = []
+            else:
+                removed = [stop for stop, version in self._removed.items() if version > since]
+            return {
+                "type": "FeatureCollection",
+                "instance": self.instance,
+                "version": self.version,
+                "full": full,
+                "removed": removed,
+                "features": features,
+            }
+
+    def refresh_from_file(self, path):
+        """
+        Reloads the state from a station GeoJSON file if it changed since the last call.
+
+        Args:
+            path (str or Path): GeoJSON file written by the ingest loop.
+
+        Returns:
+            set: Names of the changed stops (empty if the file is unchanged or missing).
+        """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return set()
+        if mtime == self._source_mtime:
+            return set()
+        try:
+            with open(path, encoding="utf-8") as f:
+                collection = json.load(f)
+        except json.JSONDecodeError:
+            # The writer is not finished yet, try again on the next call
+            return set()
+        self._source_mtime = mtime
+        return self.update(collection.get("features", []))
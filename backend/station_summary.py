@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Compact columnar summary of the station state.
+
+At network scale (thousands of stops) the full GeoJSON with its per-departure lists is far
+too large for the overview map, which only needs a position and a delay per stop. The summary
+packs one value per stop and column into little-endian typed arrays that the browser can wrap
+without parsing (`new Float32Array(buffer, offset, count)`):
+
+    uint32      length of the JSON header in bytes
+    bytes       JSON header: {"version", "instance", "count", "stops"?, "columns": [
+                    {"name", "type", "offset"}, ...]}
+    padding     to a multiple of 8 bytes
+    arrays      one per requested column, each starting at its `offset` (8-byte aligned)
+
+Stop names are only included (in the header) if the `stop` column is requested. The detail
+lists of a stop are fetched separately when it is selected.
+"""
+import json
+import struct
+
+import numpy as np
+
+from stop_buffers import delay_aggregates
+
+
+# Available numeric columns: name -> (numpy dtype, JavaScript typed array)
+SUMMARY_COLUMNS = {
+    "lon": ("<f4", "Float32Array"),
+    "lat": ("<f4", "Float32Array"),
+    "delay_mean": ("<f4", "Float32Array"),
+    "delay_max": ("<f4", "Float32Array"),
+    "delayed_share": ("<f4", "Float32Array"),
+    "cancel_rate": ("<f4", "Float32Array"),
+    "departures": ("<u2", "Uint16Array"),
+    "cancelled": ("<u2", "Uint16Array"),
+}
+# Pseudo column: stop names, sent as a JSON list in the header
+NAME_COLUMN = "stop"
+
+
+def summarize(features):
+    """
+    Computes the summary columns of station features.
+
+    The precomputed aggregate properties (`delay_mean`, `departure_count`, ...) are used where
+    present; features without them (e.g. from an older GeoJSON file) fall back to the lists.
+
+    Args:
+        features (list of dict): GeoJSON point features with the station properties.
+
+    Returns:
+        tuple:
+            - list of str: Stop names.
+            - dict: Column name -> numpy array with one value per stop.
+    """
+    n = len(features)
+    columns = {name: np.zeros(n, dtype=dtype) for name, (dtype, _) in SUMMARY_COLUMNS.items()}
+    stops = []
+    for i, feature in enumerate(features):
+        props = feature["properties"]
+        stops.append(props["stop"])
+        columns["lon"][i], columns["lat"][i] = feature["geometry"]["coordinates"][:2]
+        if "delay_mean" not in props:
+            props = {**props, **delay_aggregates(props.get("delays") or [], props.get("connection_exists") or [])}
+        count = props["departure_count"] or 0
+        columns["delay_mean"][i] = props["delay_mean"] or 0.0
+        columns["delay_max"][i] = props["delay_max"] or 0.0
+        columns["delayed_share"][i] = props["delayed_share"] or 0.0
+        columns["cancel_rate"][i] = props["cancel_rate"] or 0.0
+        columns["departures"][i] = min(count, 0xFFFF)
+        columns["cancelled"][i] = min(round((props["cancel_rate"] or 0.0) * count), 0xFFFF)
+    return stops, columns
+
+
+def encode_summary(features, columns=None, version=None, instance=None):
+    """
+    Encodes the summary of station features in the binary layout described above.
+
+    Args:
+        features (list of dict): GeoJSON point features with the station properties.
+        columns (list of str, optional): Columns to include (default: all, including `stop`).
+        version (int, optional): Station state version, copied into the header.
+        instance (str, optional): Station state instance token, copied into the header.
+
+    Returns:
+        bytes: The encoded summary.
+
+    Raises:
+        ValueError: If an unknown column is requested.
+    """
+    if columns is None:
+        columns = [NAME_COLUMN, *SUMMARY_COLUMNS]
+    unknown = [c for c in columns if c != NAME_COLUMN and c not in SUMMARY_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown summary columns: {', '.join(unknown)}")
+
+    stops, values = summarize(features)
+    header = {"version": version, "instance": instance, "count": len(stops), "columns": []}
+    if NAME_COLUMN in columns:
+        header["stops"] = stops
+
+    # Offsets depend on the header length, which depends on the offsets: repeat until stable
+    arrays = [values[name] for name in columns if name != NAME_COLUMN]
+    header["columns"] = [
+        {"name": name, "type": SUMMARY_COLUMNS[name][1], "offset": 0}
+        for name in columns
+        if name != NAME_COLUMN
+    ]
+    while True:
+        head = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        offset = -(-(4 + len(head)) // 8) * 8
+        offsets = []
+        for array in arrays:
+            offsets.append(offset)
+            offset += -(-array.nbytes // 8) * 8
+        if offsets == [column["offset"] for column in header["columns"]]:
+            break
+        for column, column_offset in zip(header["columns"], offsets):
+            column["offset"] = column_offset
+
+    out = bytearray(struct.pack("<I", len(head)) + head)
+    for column, array in zip(header["columns"], arrays):
+        out += b"\0" * (column["offset"] - len(out))
+        out += array.tobytes()
+    return bytes(out)
+
+
+class SummaryCache:
+    """Encoded summaries of all stops per column selection, for one version of the station state."""
+
+    def __init__(self):
+        self.etag = None  # ETag of the state version the bodies were encoded from
+        self._bodies = {}  # columns (tuple or None) -> encoded summary
+
+    def get(self, etag, columns):
+        """Returns the cached summary of `columns` (None if missing); a new `etag` drops all of them."""
+        if etag != self.etag:
+            self.etag = etag
+            self._bodies.clear()
+        return self._bodies.get(columns)
+
+    def put(self, etag, columns, body):
+        """Caches an encoded summary, unless the state changed since `etag`."""
+        if etag == self.etag:
+            self._bodies[columns] = body
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+In-memory ring buffers with the latest departures of every stop.
+
+`update_geodata` used to reload the whole departure history for every refresh. The ingest loop
+now keeps a bounded deque with the last `n_entries` departures per stop, feeds it with the rows
+it appends anyway, and builds the GeoJSON properties from these buffers. The refresh cost thus
+only depends on the number of stops, not on the size of the history.
+
+Next to every buffer, `RollingDelayStats` keeps the delay aggregates of the buffered departures
+(mean, max, share of delayed departures, cancellation rate). They are updated with every
+departure that enters or leaves the buffer, so that the clients get them as scalar properties
+instead of recomputing them from the `delays` list.
+"""
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+# Columns kept per departure, in the order of the tuples stored in the buffers
+BUFFER_COLUMNS = [
+    "uuid",
+    "stop",
+    "platform",
+    "line",
+    "direction",
+    "scheduled_departure",
+    "real_departure",
+    "delay_min",
+    "connection_exists",
+]
+
+# Mapping of the GeoJSON list properties to the buffered columns and their fill values
+PROPERTY_COLUMNS = {
+    "departures": ("uuid", ""),
+    "platforms": ("platform", ""),
+    "lines": ("line", ""),
+    "directions": ("direction", ""),
+    "scheduled_departures": ("scheduled_departure", ""),
+    "real_departures": ("real_departure", ""),
+    "delays": ("delay_min", 0.0),
+    "connection_exists": ("connection_exists", ""),
+}
+
+_SCHEDULED_IDX = BUFFER_COLUMNS.index("scheduled_departure")
+_DELAY_IDX = BUFFER_COLUMNS.index("delay_min")
+_CONNECTION_IDX = BUFFER_COLUMNS.index("connection_exists")
+
+# Delay (minutes) from which a departure counts as delayed, as in the DB punctuality statistics
+# (up to 5:59 minutes is on time)
+DELAYED_MIN = 6
+# Scalar aggregate properties of every stop
+AGGREGATE_PROPERTIES = ["departure_count", "delay_mean", "delay_max", "delayed_share", "cancel_rate"]
+
+
+def _clean(value, fill):
+    """Replaces missing values like `fillna` does in the DataFrame based code."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return fill
+    if isinstance(fill, float):
+        return float(value)
+    return value
+
+
+def _is_cancelled(value):
+    """True for a `connection_exists` value that says the departure is cancelled."""
+    if isinstance(value, str):
+        return value == "False"
+    return value is not None and not pd.isna(value) and not value
+
+
+class RollingDelayStats:
+    """
+    Delay aggregates of a FIFO window of departures, updated in O(1) per departure.
+
+    Sums and counts are adjusted when a departure enters (`push`) or leaves (`pop`, always the
+    oldest one) the window. The maximum is kept in a monotonic deque of `(seq, delay)` pairs with
+    decreasing delays: a new delay removes all smaller ones from the back, and the front is the
+    maximum until its departure leaves the window.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.delay_sum = 0.0
+        self.delayed = 0
+        self.cancelled = 0
+        self._max = deque()
+        self._pushed = 0
+        self._popped = 0
+
+    def push(self, delay, cancelled):
+        """Adds the newest departure (`delay` in minutes, missing delays as 0)."""
+        self.count += 1
+        self.delay_sum += delay
+        self.delayed += delay >= DELAYED_MIN
+        self.cancelled += bool(cancelled)
+        while self._max and self._max[-1][1] <= delay:
+            self._max.pop()
+        self._max.append((self._pushed, delay))
+        self._pushed += 1
+
+    def pop(self, delay, cancelled):
+        """Removes the oldest departure (with the values it was pushed with)."""
+        self.count -= 1
+        self.delay_sum -= delay
+        self.delayed -= delay >= DELAYED_MIN
+        self.cancelled -= bool(cancelled)
+        if self._max and self._max[0][0] == self._popped:
+            self._max.popleft()
+        self._popped += 1
+
+    def properties(self):
+        """Returns the aggregates as scalar properties (see `AGGREGATE_PROPERTIES`)."""
+        if not self.count:
+            props = dict.fromkeys(AGGREGATE_PROPERTIES)
+            props["departure_count"] = 0
+            return props
+        return {
+            "departure_count": self.count,
+            "delay_mean": round(self.delay_sum / self.count, 3),
+            "delay_max": self._max[0][1],
+            "delayed_share": round(self.delayed / self.count, 3),
+            "cancel_rate": round(self.cancelled / self.count, 3),
+        }
+
+
+def delay_aggregates(delays, connection_exists):
+    """
+    Computes the aggregate properties of one stop from its departure lists in one pass.
+
+    Args:
+        delays (list of float): Delays in minutes (missing ones as 0).
+        connection_exists (list): `connection_exists` values of the same departures.
+
+    Returns:
+        dict: Same properties as `RollingDelayStats.properties`.
+    """
+    stats = RollingDelayStats()
+    for delay, exists in zip(delays, connection_exists):
+        stats.push(_clean(delay, 0.0), _is_cancelled(exists))
+    return stats.properties()
+
+
+def _group_rows(df):
+    """
+    Splits departures into the row tuples of every stop in a single grouped pass.
+
+    Instead of building a sub-DataFrame per stop (`groupby` iteration), the rows are converted to
+    tuples once, brought into stop order (stable, so that every group keeps its order) and cut at
+    the group borders. This keeps seeding the buffers from the history fast for thousands of stops.
+
+    Yields:
+        tuple: `(stop, rows)` in order of the first appearance of the stop, `rows` being a list of
+        tuples in the order of `BUFFER_COLUMNS`. Rows without a stop are skipped.
+    """
+    codes, stops = pd.factorize(df["stop"])
+    order = np.argsort(codes, kind="stable")
+    codes = codes[order]
+    rows = list(df.itertuples(index=False, name=None))
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(codes)) + 1])
+    ends = np.append(starts[1:], len(codes))
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        if codes[start] >= 0:
+            yield stops[codes[start]], [rows[i] for i in order[start:end]]
+
+
+def _row_values(row):
+    return _clean(row[_DELAY_IDX], 0.0), _is_cancelled(row[_CONNECTION_IDX])
+
+
+class StopBuffers:
+    """Bounded, scheduled-time ordered buffer of the latest departures for every stop."""
+
+    def __init__(self, n_entries):
+        """
+        Args:
+            n_entries (int): Number of departures kept per stop.
+        """
+        self.n_entries = n_entries
+        self._buffers = {}
+        self._stats = {}  # stop -> RollingDelayStats of its buffer
+
+    def __len__(self):
+        return len(self._buffers)
+
+    def stops(self):
+        """Returns the names of all stops that have buffered departures."""
+        return list(self._buffers)
+
+    def extend(self, df):
+        """
+        Adds new departures to the buffers of their stops.
+
+        Args:
+            df (pd.DataFrame): Departures with at least the columns in `BUFFER_COLUMNS`
+                (e.g. the rows `append_new_departures` wrote, or a slice of the history).
+
+        Returns:
+            set: Names of the stops whose buffer changed.
+        """
+        if df.empty:
+            return set()
+        # Only the newest n_entries per stop can end up in the buffers
+        df = (
+            df[BUFFER_COLUMNS]
+            .sort_values("scheduled_departure", kind="stable", na_position="first")
+            .groupby("stop", sort=False)
+            .tail(self.n_entries)
+        )
+
+        changed = set()
+        for stop, rows in _group_rows(df):
+            buffer = self._buffers.get(stop)
+            if buffer is None:
+                buffer = self._buffers[stop] = deque(maxlen=self.n_entries)
+                self._stats[stop] = RollingDelayStats()
+            stats = self._stats[stop]
+            last = buffer[-1][_SCHEDULED_IDX] if buffer else None
+            first_new = rows[0][_SCHEDULED_IDX]
+            if last is None or (
+                isinstance(first_new, str) and isinstance(last, str) and first_new >= last
+            ):
+                # Common case: the new departures are all later than the buffered ones
+                for row in rows:
+                    if len(buffer) == self.n_entries:
+                        stats.pop(*_row_values(buffer[0]))
+                    buffer.append(row)
+                    stats.push(*_row_values(row))
+            else:
+                merged = sorted(
+                    list(buffer) + rows,
+                    key=lambda row: row[_SCHEDULED_IDX]
+                    if isinstance(row[_SCHEDULED_IDX], str)
+                    else "",
+                )
+                buffer.clear()
+                buffer.extend(merged[-self.n_entries :])
+                # Late departures reorder the window: rebuild its aggregates
+                stats = self._stats[stop] = RollingDelayStats()
+                for row in buffer:
+                    stats.push(*_row_values(row))
+            changed.add(stop)
+        return changed
+
+    def properties(self, stop, lists=True):
+        """
+        Builds the GeoJSON properties of one stop from its buffer.
+
+        Args:
+            stop (str): Name of the stop.
+            lists (bool): Include the departure lists (otherwise only the aggregates).
+
+        Returns:
+            dict or None: The properties (the aggregates and one list per column), None if
+            nothing is buffered.
+        """
+        buffer = self._buffers.get(stop)
+        if not buffer:
+            return None
+        props = {"stop": stop}
+        props.update(self._stats[stop].properties())
+        if lists:
+            for prop, (column, fill) in PROPERTY_COLUMNS.items():
+                idx = BUFFER_COLUMNS.index(column)
+                props[prop] = [_clean(row[idx], fill) for row in buffer]
+        return props
+
+    def to_records(self, stops=None, lists=True):
+        """
+        Builds the properties of several stops.
+
+        Args:
+            stops (iterable of str, optional): Stops to include, in this order (default: all buffered stops).
+            lists (bool): Include the departure lists (otherwise only the aggregates).
+
+        Returns:
+            list of dict: Properties of every stop that has buffered departures.
+        """
+        stops = self._buffers if stops is None else stops
+        records = []
+        for stop in stops:
+            props = self.properties(stop, lists)
+            if props is not None:
+                records.append(props)
+        return records
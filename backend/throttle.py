@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Request throttling for the VRR EFA endpoint.
+
+Provides a token-bucket rate limiter that is shared by all requests of the ingest loop
+(and pauses completely when the upstream answers with 429/503 and a `Retry-After` header),
+plus a per-stop circuit breaker that stops polling stations which keep failing until a
+single half-open probe request succeeds again.
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+# HTTP status codes which mean "slow down" rather than "this stop is broken"
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+def parse_retry_after(value, now=None):
+    """
+    Parses the value of a `Retry-After` header.
+
+    Args:
+        value (str or None): Header value, either delta-seconds or an HTTP date.
+        now (datetime, optional): Reference time for HTTP dates (defaults to the current UTC time).
+
+    Returns:
+        float or None: Number of seconds to wait, or None if the header is missing or invalid.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (retry_at - now).total_seconds())
+
+
+def backoff_delay(attempt, base_s=1.0, cap_s=300.0, rng=random):
+    """
+    Exponential backoff with jitter ("equal jitter").
+
+    Args:
+        attempt (int): Number of consecutive failures before this one (0 for the first failure).
+        base_s (float): Delay of the first attempt in seconds.
+        cap_s (float): Upper bound for the delay in seconds.
+        rng (random.Random): Source of randomness, replaceable for reproducible runs.
+
+    Returns:
+        float: Seconds to wait, between half and the full exponential delay.
+    """
+    delay = min(cap_s, base_s * (2 ** max(0, attempt)))
+    return delay / 2 + rng.uniform(0, delay / 2)
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by all requests of the ingest loop.
+
+    Tokens refill at `rate` per second up to `capacity`; every request takes one token.
+    `penalize` drains the bucket and blocks it until the upstream allows new requests.
+    """
+
+    def __init__(self, rate, capacity=1, backoff_base_s=1.0, backoff_cap_s=300.0, clock=time.monotonic):
+        """
+        Args:
+            rate (float): Sustained requests per second.
+            capacity (int): Maximum burst size.
+            backoff_base_s (float): First backoff delay when throttled without `Retry-After`.
+            backoff_cap_s (float): Maximum backoff delay.
+            clock (callable): Monotonic clock in seconds.
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(max(1, capacity))
+        self.backoff_base_s = backoff_base_s
+        self.backoff_cap_s = backoff_cap_s
+        self._clock = clock
+        self._tokens = self.capacity
+        self._last = clock()
+        self._throttle_count = 0
+
+    def reserve(self):
+        """Takes one token and returns the number of seconds the caller has to wait before using it."""
+        now = self._clock()
+        if now > self._last:
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+        self._tokens -= 1.0
+        return (self._last - now) + max(0.0, -self._tokens) / self.rate
+
+    async def acquire(self):
+        """Waits (without blocking the event loop) until a request may be sent."""
+        wait_s = self.reserve()
+        if wait_s > 0:
+            await asyncio.sleep(wait_s)
+
+    def acquire_blocking(self):
+        """Blocking variant of `acquire` for the synchronous ingest loop."""
+        wait_s = self.reserve()
+        if wait_s > 0:
+            time.sleep(wait_s)
+
+    def penalize(self, retry_after=None):
+        """
+        Pauses the bucket after a throttling response.
+
+        Args:
+            retry_after (float, optional): Seconds from the `Retry-After` header. If missing, an
+                exponential backoff with jitter based on the number of consecutive throttles is used.
+
+        Returns:
+            float: The pause in seconds.
+        """
+        if retry_after is None:
+            pause_s = backoff_delay(self._throttle_count, self.backoff_base_s, self.backoff_cap_s)
+        else:
+            pause_s = retry_after
+        self._throttle_count += 1
+        # Drain the bucket so that requests do not burst right after the pause
+        self._tokens = 0.0
+        self._last = max(self._last, self._clock() + pause_s)
+        logging.warning(f"Upstream throttled, pausing all requests for {round(pause_s, 1)} s.")
+        return pause_s
+
+    def record_success(self):
+        """Resets the backoff after a successful request."""
+        self._throttle_count = 0
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for a single stop.
+
+    closed: requests pass. After `failure_threshold` consecutive failures the breaker opens.
+    open: requests are skipped until the cooldown has passed.
+    half-open: exactly one probe request passes; success closes, failure re-opens with a longer cooldown.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold=3, cooldown_s=60.0, max_cooldown_s=1800.0, clock=time.monotonic):
+        """
+        Args:
+            failure_threshold (int): Consecutive failures before the breaker opens.
+            cooldown_s (float): Cooldown after the first trip.
+            max_cooldown_s (float): Maximum cooldown after repeated trips.
+            clock (callable): Monotonic clock in seconds.
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self.max_cooldown_s = max_cooldown_s
+        self._clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trips = 0
+        self._open_until = 0.0
+
+    def allow_request(self):
+        """Returns True if a request for this stop may be sent now."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and self._clock() >= self._open_until:
+            # Let a single probe through
+            self.state = self.HALF_OPEN
+            return True
+        return False
+
+    def record_success(self):
+        """Closes the breaker after a successful request."""
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trips = 0
+
+    def record_failure(self, retry_after=None):
+        """
+        Counts a failed request and opens the breaker if necessary.
+
+        Args:
+            retry_after (float, optional): Minimum cooldown requested by the upstream.
+        """
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            cooldown_s = backoff_delay(self._trips, self.cooldown_s, self.max_cooldown_s)
+            if retry_after is not None:
+                cooldown_s = max(cooldown_s, retry_after)
+            self._trips += 1
+            self.state = self.OPEN
+            self._open_until = self._clock() + cooldown_s
+
+    def seconds_until_probe(self):
+        """Seconds until the next probe is allowed (0 if requests pass already)."""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self._open_until - self._clock())
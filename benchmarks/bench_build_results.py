@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: row-by-row `build_results` vs. columnar `build_columns`.
+
+Parses recorded EFA responses (the raw response archive written by the backend) or, if none are
+given, synthetic `departureList` responses, with both parsers. Checks that both produce exactly
+the same DataFrame (after converting the columnar ID halves to UUID strings) and reports the
+time per departure.
+
+Usage:
+    python benchmarks/bench_build_results.py [--responses data/temp/responses]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from backend_api_to_geo import departures_to_dataframe, with_uuid_strings  # noqa: E402
+from response_archive import ResponseArchive  # noqa: E402
+
+
+def load_recorded_responses(path, encoding="utf-8"):
+    """
+    Reads all JSON documents from the raw response archive.
+
+    `path` is either the segment directory of `ResponseArchive` or an old plain text dump
+    (responses separated by blank lines).
+    """
+    if Path(path).is_dir():
+        return [
+            json.loads(body.decode(encoding, errors="replace"))
+            for _, body in ResponseArchive(path, compression="gzip").iter_bodies()
+            if body.strip()
+        ]
+    text = Path(path).read_bytes().decode(encoding, errors="replace")
+    decoder = json.JSONDecoder()
+    responses, pos = [], 0
+    while True:
+        while pos < len(text) and text[pos].isspace():
+            pos += 1
+        if pos >= len(text):
+            return responses
+        doc, pos = decoder.raw_decode(text, pos)
+        responses.append(doc)
+
+
+def synthetic_response(n_departures, seed=0):
+    """Creates an EFA-like response with `n_departures` departures."""
+    rng = random.Random(seed)
+    departures = []
+    for _ in range(n_departures):
+        hour, minute = rng.randint(0, 23), rng.randint(0, 59)
+        delay = rng.choice(["0", "0", "1", "4", "12", "-9999"])
+        dep = {
+            "stopName": rng.choice(["Bochum Hbf", "Essen Hbf", "MÃ¶nchengladbach Hbf"]),
+            "platformName": str(rng.randint(1, 12)),
+            "dateTime": {"year": "2025", "month": "8", "day": "24", "hour": str(hour), "minute": str(minute)},
+            "servingLine": {
+                "number": rng.choice(["RE1", "S1", "U35", "ICE 727"]),
+                "direction": rng.choice(["DÃ¼sseldorf Hbf", "Dortmund Hbf"]),
+                "delay": delay,
+                "cancelled": rng.choice(["0", "0", "0", "1"]),
+                "realtimeStatus": "MONITORED",
+            },
+        }
+        if delay != "-9999":
+            dep["realDateTime"] = {
+                "year": "2025",
+                "month": "8",
+                "day": "24",
+                "hour": str(hour),
+                "minute": str((minute + int(delay)) % 60),
+            }
+        departures.append(dep)
+    return {"departureList": departures}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--responses", type=Path, help="Raw response archive (directory) with recorded EFA responses")
+    parser.add_argument("--synthetic", type=int, default=200, help="Number of synthetic responses if no archive is given")
+    parser.add_argument("--departures", type=int, default=40, help="Departures per synthetic response")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.responses:
+        responses = load_recorded_responses(args.responses)
+    else:
+        responses = [synthetic_response(args.departures, seed) for seed in range(args.synthetic)]
+    departure_lists = [r.get("departureList") or [] for r in responses]
+    n_departures = sum(len(d) for d in departure_lists)
+    datetime_dt = datetime(2025, 8, 24, 12, 0)
+
+    # Both parsers must produce exactly the same DataFrame
+    for departures in departure_lists:
+        pd.testing.assert_frame_equal(
+            departures_to_dataframe(datetime_dt, departures, columnar=False),
+            with_uuid_strings(departures_to_dataframe(datetime_dt, departures, columnar=True)),
+        )
+
+    print(f"{len(responses)} responses, {n_departures} departures, outputs identical")
+    for label, columnar in [("build_results", False), ("build_columns", True)]:
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for departures in departure_lists:
+                departures_to_dataframe(datetime_dt, departures, columnar=columnar)
+            best = min(best, time.perf_counter() - start)
+        print(f"{label:>14}: {best:.3f} s total, {best / max(n_departures, 1) * 1e6:.1f} us/departure")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: GeoJSON output through GDAL (`GeoDataFrame.to_file`) vs. the direct writer.
+
+Builds station features with 30 buffered departures per stop for 7, 1,000 and 10,000 stops,
+writes them with both writers, checks that both files contain the same features and reports
+the time per write.
+
+Usage:
+    python benchmarks/bench_geojson_writer.py [--stops 7 1000 10000] [--repeat 3]
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely.geometry import Point
+
+from synthetic_data import synthetic_history
+
+from geojson_writer import write_geojson  # noqa: E402  (backend/ is on sys.path via synthetic_data)
+from stop_buffers import StopBuffers  # noqa: E402
+
+
+def make_stations(n_stops, n_entries=30, seed=0):
+    """Returns the per-stop properties and random station points in the Ruhr region."""
+    history = synthetic_history(n_stops * n_entries * 2, n_stops=n_stops, seed=seed)
+    buffers = StopBuffers(n_entries)
+    buffers.extend(history)
+    records = buffers.to_records()
+    rng = np.random.default_rng(seed)
+    lon = rng.uniform(6.5, 7.7, len(records))
+    lat = rng.uniform(51.2, 51.7, len(records))
+    return records, lon, lat
+
+
+def write_to_file(records, lon, lat, target):
+    """The previous implementation: a GeoDataFrame written through GDAL."""
+    gdf = gpd.GeoDataFrame(
+        pd.DataFrame(records),
+        geometry=[Point(x, y) for x, y in zip(lon, lat)],
+        crs="EPSG:4326",
+    )
+    gdf.to_file(target, driver="GeoJSON")
+
+
+def write_direct(records, lon, lat, target):
+    features = [
+        {
+            "type": "Feature",
+            "properties": props,
+            "geometry": {"type": "Point", "coordinates": [float(x), float(y)]},
+        }
+        for props, x, y in zip(records, lon, lat)
+    ]
+    write_geojson(features, target)
+
+
+def best_of(func, repeat):
+    """Returns the fastest of `repeat` runs in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stops", type=int, nargs="+", default=[7, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        gdal_target = Path(tmp) / "to_file.geojson"
+        direct_target = Path(tmp) / "direct.geojson"
+        print(f"{'stops':>7} {'size [MB]':>10} {'to_file [s]':>12} {'direct [s]':>11} {'speedup':>8}")
+        for n_stops in args.stops:
+            records, lon, lat = make_stations(n_stops)
+
+            # Both writers must produce the same features
+            write_to_file(records, lon, lat, gdal_target)
+            write_direct(records, lon, lat, direct_target)
+            old = json.loads(gdal_target.read_text(encoding="utf-8"))["features"]
+            new = json.loads(direct_target.read_text(encoding="utf-8"))["features"]
+            assert [f["properties"] for f in old] == [f["properties"] for f in new]
+            assert np.allclose(
+                [f["geometry"]["coordinates"] for f in old],
+                [f["geometry"]["coordinates"] for f in new],
+            )
+
+            t_gdal = best_of(lambda: write_to_file(records, lon, lat, gdal_target), args.repeat)
+            t_direct = best_of(lambda: write_direct(records, lon, lat, direct_target), args.repeat)
+            size_mb = direct_target.stat().st_size / 2**20
+            print(
+                f"{len(records):>7} {size_mb:>10.2f} {t_gdal:>12.4f} {t_direct:>11.4f} {t_gdal / t_direct:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
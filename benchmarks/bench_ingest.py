@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Offline load test: end-to-end ingest throughput against the local mock EFA server.
+
+Starts `mock_efa_server.py` in-process (or uses `--url` to point at one running separately),
+then runs one async ingest cycle for each station count: fetch, parse, dedup, append to a
+temporary CSV and update the per-stop buffers. Reports requests/s and departures/s.
+
+Usage:
+    python benchmarks/bench_ingest.py --stations 10 100 1000 10000 --concurrency 32
+    python benchmarks/bench_ingest.py --stations 1000 --rate-429 0.02 --latency-ms 120
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import aiohttp
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+import backend_api_to_geo as backend  # noqa: E402
+from dedup_index import DedupIndex  # noqa: E402
+from mock_efa_server import start_mock_server  # noqa: E402
+from stop_buffers import StopBuffers  # noqa: E402
+from throttle import TokenBucket  # noqa: E402
+
+
+async def run_cycle(url, n_stations, concurrency, request_rate):
+    """Runs one ingest cycle over `n_stations` synthetic stations and returns its statistics."""
+    backend.API_URL = url
+    placename_list = [("Teststadt", f"Halt {i:05d}") for i in range(n_stations)]
+    dedup_index = DedupIndex()
+    stop_buffers = StopBuffers(30)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = TokenBucket(request_rate, concurrency)
+    start = time.perf_counter()
+    async with aiohttp.ClientSession(connector=connector) as session:
+        results = await backend.fetch_cycle_async(
+            session, semaphore, placename_list, limiter, {}
+        )
+    fetched = time.perf_counter()
+
+    n_departures = n_failed = 0
+    for (place_dm, name_dm), result in zip(placename_list, results):
+        if result is None or isinstance(result, Exception):
+            n_failed += 1
+            continue
+        df, status_code = result
+        new_df = backend.append_new_departures(df, dedup_index, place_dm, name_dm, status_code)
+        stop_buffers.extend(new_df)
+        n_departures += len(new_df)
+    done = time.perf_counter()
+
+    return {
+        "stations": n_stations,
+        "failed": n_failed,
+        "departures": n_departures,
+        "fetch_s": fetched - start,
+        "total_s": done - start,
+    }
+
+
+async def run(args):
+    runner = None
+    url = args.url
+    if url is None:
+        runner, url = await start_mock_server(
+            departures=args.departures,
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            rate_429=args.rate_429,
+            rate_503=args.rate_503,
+            seed=0,
+        )
+    try:
+        for n_stations in args.stations:
+            # Every run writes into a fresh CSV
+            backend.csv_file_target = Path(tempfile.mkdtemp()) / "final_departures.csv"
+            stats = await run_cycle(url, n_stations, args.concurrency, args.request_rate)
+            print(
+                f"{stats['stations']:>6} stations: {stats['total_s']:7.2f} s "
+                f"({stats['stations'] / stats['total_s']:7.1f} req/s, "
+                f"{stats['departures'] / stats['total_s']:9.0f} departures/s, "
+                f"fetch {stats['fetch_s']:.2f} s, {stats['failed']} failed)"
+            )
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--request-rate", type=float, default=1e6, help="Token bucket rate (default: unlimited)")
+    parser.add_argument("--url", help="Use an already running mock server instead of starting one")
+    parser.add_argument("--departures", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-503", type=float, default=0.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: viewport queries through the grid index vs. a scan over all stations.
+
+Indexes 1,000 up to 100,000 random points in the VRR area and measures a city-sized viewport at
+detail zoom (all stops in the box) and the whole region zoomed out (one stop per ~32 px cell),
+next to a linear scan of all points. The index results are checked against the scan.
+
+Usage:
+    python benchmarks/bench_spatial_index.py [--points 1000 10000 100000] [--repeat 200]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from spatial_index import GridIndex  # noqa: E402
+
+# Roughly the VRR area, a city viewport (Essen) and the whole region
+AREA = (6.0, 50.9, 7.9, 51.9)
+CITY_BBOX = (6.95, 51.40, 7.10, 51.50)
+REGION_BBOX = (5.8, 50.8, 8.1, 52.0)
+
+
+def make_index(n_points, seed=0):
+    rng = random.Random(seed)
+    index = GridIndex()
+    points = {}
+    for i in range(n_points):
+        lon = rng.uniform(AREA[0], AREA[2])
+        lat = rng.uniform(AREA[1], AREA[3])
+        points[f"Stop {i}"] = (lon, lat)
+        index.insert(f"Stop {i}", lon, lat, rng.randint(0, 30))
+    return index, points
+
+
+def scan(points, bbox):
+    """The alternative without an index: test every point."""
+    minx, miny, maxx, maxy = bbox
+    return [stop for stop, (lon, lat) in points.items() if minx <= lon <= maxx and miny <= lat <= maxy]
+
+
+def mean_time(func, repeat):
+    """Returns the mean run time in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(
+        f"{'points':>7} {'city hits':>9} {'city [ms]':>10} {'scan [ms]':>10} "
+        f"{'region z9 hits':>14} {'region z9 [ms]':>14}"
+    )
+    for n_points in args.points:
+        index, points = make_index(n_points)
+        assert sorted(index.query(CITY_BBOX, zoom=15)) == sorted(scan(points, CITY_BBOX))
+
+        hits = len(index.query(CITY_BBOX, zoom=15))
+        t_city = mean_time(lambda: index.query(CITY_BBOX, zoom=15), args.repeat)
+        t_scan = mean_time(lambda: scan(points, CITY_BBOX), max(1, args.repeat // 20))
+        region_hits = len(index.query(REGION_BBOX, zoom=9))
+        t_region = mean_time(lambda: index.query(REGION_BBOX, zoom=9), args.repeat)
+        print(
+            f"{n_points:>7} {hits:>9} {t_city:>10.3f} {t_scan:>10.3f} {region_hits:>14} {t_region:>14.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: per-stop grouping of the latest departures.
+
+Compares the former per-stop filter loop (`df[df["stop"] == stop]` once per stop) with seeding
+the per-stop buffers of the ingest loop (`StopBuffers.extend`, a single grouped pass) from the
+same departure table, from 7 stops up to several thousand.
+
+Usage:
+    python benchmarks/bench_update_geodata.py [--rows-per-stop 200] [--n-data 30]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from stop_buffers import StopBuffers  # noqa: E402
+
+
+def make_departures(n_stops, rows_per_stop, seed=0):
+    """Creates a synthetic departure table with the columns of the departure CSV."""
+    rng = np.random.default_rng(seed)
+    n_rows = n_stops * rows_per_stop
+    stops = np.array([f"Stop {i}" for i in range(n_stops)])
+    start = np.datetime64("2025-08-24T00:00")
+    scheduled = start + rng.integers(0, 24 * 60, n_rows).astype("timedelta64[m]")
+    delays = rng.choice([0, 0, 0, 1, 2, 5, 12], n_rows).astype(float)
+    scheduled_str = pd.Series(scheduled).dt.strftime("%Y-%m-%dT%H:%M:%S")
+    real_str = pd.Series(scheduled + delays.astype("timedelta64[m]")).dt.strftime("%Y-%m-%dT%H:%M:%S")
+    return pd.DataFrame(
+        {
+            "uuid": [f"{i:032x}" for i in range(n_rows)],
+            "stop": stops[rng.integers(0, n_stops, n_rows)],
+            "platform": rng.integers(1, 12, n_rows).astype(str),
+            "line": rng.choice(["RE1", "RE6", "S1", "U35", "ICE 727"], n_rows),
+            "direction": rng.choice(["Dortmund Hbf", "Köln Hbf", "Essen Hbf"], n_rows),
+            "scheduled_departure": scheduled_str,
+            "real_departure": real_str,
+            "delay_min": delays,
+            "connection_exists": rng.random(n_rows) > 0.02,
+        }
+    ), stops
+
+
+def legacy_aggregate(df, stops, n_data):
+    """The previous implementation: one boolean filter over the whole table per stop."""
+    new_data = []
+    for stop in stops:
+        stop_data = df[df["stop"] == stop].sort_values(by="scheduled_departure").tail(n_data)
+        if not stop_data.empty:
+            new_data.append(
+                {
+                    "stop": stop,
+                    "departures": stop_data["uuid"].fillna("").tolist(),
+                    "platforms": stop_data["platform"].fillna("").tolist(),
+                    "lines": stop_data["line"].fillna("").tolist(),
+                    "directions": stop_data["direction"].fillna("").tolist(),
+                    "scheduled_departures": stop_data["scheduled_departure"].fillna("").tolist(),
+                    "real_departures": stop_data["real_departure"].fillna("").tolist(),
+                    "delays": stop_data["delay_min"].fillna(0).tolist(),
+                    "connection_exists": stop_data["connection_exists"].fillna("").tolist(),
+                }
+            )
+    return new_data
+
+
+def best_of(func, repeat):
+    """Returns the fastest of `repeat` runs in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def seed_buffers(df, n_data):
+    """The ingest loop at startup: fill the per-stop buffers from the history."""
+    stop_buffers = StopBuffers(n_data)
+    stop_buffers.extend(df)
+    return stop_buffers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stops", type=int, nargs="+", default=[7, 100, 1000, 5000])
+    parser.add_argument("--rows-per-stop", type=int, default=200)
+    parser.add_argument("--n-data", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'stops':>7} {'rows':>9} {'loop [s]':>10} {'grouped [s]':>12} {'speedup':>8}")
+    for n_stops in args.stops:
+        df, stops = make_departures(n_stops, args.rows_per_stop)
+
+        # Both implementations must agree on the per-stop lists
+        grouped = seed_buffers(df, args.n_data).to_records(stops)
+        legacy = legacy_aggregate(df, stops, args.n_data)
+        assert [r["stop"] for r in grouped] == [r["stop"] for r in legacy]
+        assert [r["departures"] for r in grouped] == [r["departures"] for r in legacy]
+
+        t_loop = best_of(lambda: legacy_aggregate(df, stops, args.n_data), args.repeat)
+        t_grouped = best_of(lambda: seed_buffers(df, args.n_data), args.repeat)
+        print(
+            f"{n_stops:>7} {len(df):>9} {t_loop:>10.4f} {t_grouped:>12.4f} {t_loop / t_grouped:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite for the ingest and geodata hot paths.
+
+Generates a synthetic departure history (seeded from `legacy/first_csv.csv`, see
+`synthetic_data.py`) and the matching EFA responses, then measures every stage of the pipeline:
+
+    build_results   responses -> DataFrame with the row-by-row parser (legacy path)
+    build_columns   responses -> DataFrame with the columnar parser
+    name_lut        mojibake replacement in the stop/direction/line columns (also part of
+                    both parser stages)
+    dedup           departure keys + DedupIndex lookups against the existing history
+    csv_append      append_new_departures into a fresh CSV file
+    seed_buffers    per-stop buffers filled from the whole history (the startup seeding)
+    update_geodata  per-stop buffers filled from the history + GeoJSON write (station
+                    geometries from the cache, loaded once like in the ingest loop)
+
+For each stage the best wall time of `--repeat` runs, the throughput and the peak memory
+(tracemalloc, measured in a separate run) are reported and written to a JSON file. Pass
+`--compare` with an older result file to see the change per stage.
+
+Usage:
+    python benchmarks/run_benchmarks.py --rows 100000 --stops 7 --output results.json
+    python benchmarks/run_benchmarks.py --compare results.json
+"""
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from synthetic_data import ROOT, history_to_responses, synthetic_history
+
+import backend_api_to_geo as backend  # noqa: E402  (backend/ is on sys.path via synthetic_data)
+from dedup_index import DedupIndex  # noqa: E402
+from departure_ids import strings_to_ints  # noqa: E402
+
+SHAPEFILE = ROOT / "data" / "geodata" / "source" / "bahnhoefe.shp"
+
+
+def measure(func, repeat):
+    """Returns the best wall time of `repeat` runs and the tracemalloc peak of one more run."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak
+
+
+def build_stages(history, responses, workdir, n_data):
+    """
+    Prepares the inputs of all stages.
+
+    Returns:
+        list of tuple: (name, number of processed items, unit, function to time).
+    """
+    request_time = datetime.fromisoformat(history["scheduled_departure"].iloc[0])
+    n_departures = sum(len(r) for r in responses)
+    raw_frames = [backend.build_columns(request_time, r) for r in responses]
+    frames = [backend.departures_to_dataframe(request_time, r) for r in responses]
+
+    # The first half of the history is already stored, the responses overlap with it
+    stored = history.iloc[: len(history) // 2]
+    stored_keys = strings_to_ints(stored["uuid"])
+
+    def seeded_index():
+        index = DedupIndex(horizon_days=10**4)
+        index.add(stored_keys, stored["scheduled_date_iso"])
+        return index
+
+    def run_build_results():
+        for r in responses:
+            backend.departures_to_dataframe(request_time, r, columnar=False)
+
+    def run_build_columns():
+        for r in responses:
+            backend.with_uuid_strings(backend.departures_to_dataframe(request_time, r))
+
+    def run_name_lut():
+        for df in raw_frames:
+            backend.clean_names(df.copy())
+
+    def run_dedup():
+        index = seeded_index()
+        for df in frames:
+            keys = backend.departure_keys(df)
+            is_new = index.is_new(keys)
+            index.add([k for k, new in zip(keys, is_new) if new], df["scheduled_date_iso"])
+
+    csv_runs = iter(range(10**6))
+
+    def run_csv_append():
+        backend.csv_file_target = workdir / f"append-{next(csv_runs)}.csv"
+        index = DedupIndex(horizon_days=10**4)
+        for df in frames:
+            backend.append_new_departures(df, index, "Bench", "Stop", 200)
+
+    def run_seed_buffers():
+        backend.StopBuffers(n_data).extend(history)
+
+    station_cache = backend.StationGeometryCache(SHAPEFILE)
+    geojson_target = workdir / "stations.geojson"
+
+    def run_update_geodata():
+        stop_buffers = backend.StopBuffers(n_data)
+        stop_buffers.extend(history)
+        backend.update_geodata_from_buffers(stop_buffers, station_cache, geojson_target)
+
+    return [
+        ("build_results", n_departures, "departures", run_build_results),
+        ("build_columns", n_departures, "departures", run_build_columns),
+        ("name_lut", n_departures, "departures", run_name_lut),
+        ("dedup", n_departures, "departures", run_dedup),
+        ("csv_append", n_departures, "departures", run_csv_append),
+        ("seed_buffers", len(history), "rows", run_seed_buffers),
+        ("update_geodata", len(history), "rows", run_update_geodata),
+    ]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="Size of the departure history")
+    parser.add_argument("--stops", type=int, default=7, help="Number of stops in the history")
+    parser.add_argument("--responses", type=int, default=200, help="Number of API responses to ingest")
+    parser.add_argument("--departures-per-response", type=int, default=40)
+    parser.add_argument("--n-data", type=int, default=30, help="Departures per stop in the GeoJSON")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", nargs="+", help="Only run these stages")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON to this file")
+    parser.add_argument("--compare", type=Path, help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    history = synthetic_history(args.rows, n_stops=args.stops, seed=args.seed)
+    # The responses cover the second half of the history and overlap the first half a bit
+    n_response_rows = args.responses * args.departures_per_response
+    start = max(0, len(history) // 2 - n_response_rows // 4)
+    responses = history_to_responses(
+        history.iloc[start : start + n_response_rows], args.departures_per_response
+    )
+
+    baseline = {}
+    if args.compare:
+        baseline = {r["stage"]: r for r in json.loads(args.compare.read_text())["results"]}
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        stages = build_stages(history, responses, Path(tmp), args.n_data)
+        print(f"{'stage':>15} {'items':>9} {'best [s]':>10} {'items/s':>12} {'peak [MB]':>10}")
+        for name, n_items, unit, func in stages:
+            if args.stages and name not in args.stages:
+                continue
+            seconds, peak = measure(func, args.repeat)
+            result = {
+                "stage": name,
+                "items": n_items,
+                "unit": unit,
+                "seconds": seconds,
+                "items_per_s": n_items / seconds,
+                "peak_mb": peak / 2**20,
+            }
+            results.append(result)
+            line = f"{name:>15} {n_items:>9} {seconds:>10.4f} {result['items_per_s']:>12.0f} {result['peak_mb']:>10.1f}"
+            if name in baseline:
+                line += f"   {baseline[name]['seconds'] / seconds:5.2f}x vs. {args.compare.name}"
+            print(line)
+
+    if args.output:
+        report = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "parameters": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+            "results": results,
+        }
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
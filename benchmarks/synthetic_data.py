@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic departure data for the benchmarks, seeded from `legacy/first_csv.csv`.
+
+The first recorded CSV provides the value pools: which (stop, platform, line, direction)
+combinations occur together and how delays (including missing real-time data) are distributed.
+From these, departure histories of any size are sampled, either as the departure table the
+backend writes or as EFA `departureList` responses with the mis-decoded umlauts the real API
+returns.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+from departure_ids import departure_ids, halves_to_strings  # noqa: E402
+
+SEED_CSV = ROOT / "legacy" / "first_csv.csv"
+
+# Inverse of NAME_LUT in backend_api_to_geo: how the API spells the umlauts
+_MOJIBAKE = {"ü": "Ã¼", "ö": "Ã¶", "ä": "Ã¤", "ß": "ÃŸ"}
+_MOJIBAKE_TABLE = str.maketrans(_MOJIBAKE)
+
+
+def load_seed_profile(path=SEED_CSV):
+    """
+    Reads the value pools from the seed CSV.
+
+    Returns:
+        dict:
+            - "combos": DataFrame of the observed (stop, platform, line, direction) rows.
+            - "delays": Observed `delay_min` values, NaN where no real-time data was available.
+    """
+    seed = pd.read_csv(path, dtype={"platform": str, "line": str})
+    return {
+        "combos": seed[["stop", "platform", "line", "direction"]].reset_index(drop=True),
+        "delays": seed["delay_min"].to_numpy(dtype=float),
+    }
+
+
+def synthetic_history(n_rows, n_stops=7, days=2, start="2025-08-24", seed=0, profile=None):
+    """
+    Samples a departure table with the columns of `final_departures.csv`.
+
+    Args:
+        n_rows (int): Number of departures.
+        n_stops (int): Number of stops. The seed CSV has 7; more stops are cloned from them
+            with a numeric suffix ("Bochum Hbf 12").
+        days (int): Number of days the scheduled departures are spread over.
+        start (str): First day (ISO).
+        seed (int): Random seed.
+        profile (dict, optional): Result of `load_seed_profile` (loaded if omitted).
+
+    Returns:
+        pd.DataFrame: Departures sorted by scheduled time, like an append-only history.
+    """
+    profile = profile or load_seed_profile()
+    rng = np.random.default_rng(seed)
+    combos = profile["combos"].iloc[rng.integers(0, len(profile["combos"]), n_rows)]
+    combos = combos.reset_index(drop=True)
+
+    stops = combos["stop"].to_numpy(dtype=object)
+    seed_stops = sorted(set(stops))
+    if n_stops > len(seed_stops):
+        clone = rng.integers(0, -(-n_stops // len(seed_stops)), n_rows)
+        stops = np.array([s if c == 0 else f"{s} {c}" for s, c in zip(stops, clone)], dtype=object)
+
+    scheduled = np.datetime64(start, "m") + np.sort(rng.integers(0, days * 24 * 60, n_rows)).astype(
+        "timedelta64[m]"
+    )
+    delays = profile["delays"][rng.integers(0, len(profile["delays"]), n_rows)]
+    real = scheduled + np.nan_to_num(delays).astype("int64").astype("timedelta64[m]")
+
+    scheduled_iso = np.datetime_as_string(scheduled, unit="s").astype(object)
+    real_iso = np.where(np.isnan(delays), None, np.datetime_as_string(real, unit="s").astype(object))
+    scheduled_str = np.char.replace(np.datetime_as_string(scheduled, unit="s"), "T", " ").astype(object)
+    lines = combos["line"].to_numpy(dtype=object)
+    # IDs are hashed from the names as the API spells them, like in the backend
+    api_stops = [stop.translate(_MOJIBAKE_TABLE) for stop in stops]
+    api_lines = [line.translate(_MOJIBAKE_TABLE) if isinstance(line, str) else None for line in lines]
+
+    return pd.DataFrame(
+        {
+            "uuid": halves_to_strings(*departure_ids(api_stops, scheduled_str, api_lines)),
+            "stop": stops,
+            "platform": combos["platform"],
+            "line": lines,
+            "direction": combos["direction"],
+            "scheduled_departure": scheduled_iso,
+            "real_departure": real_iso,
+            "scheduled_time": [s[11:] for s in scheduled_iso],
+            "scheduled_date_iso": [s[:10] for s in scheduled_iso],
+            "delay_min": delays,
+            "connection_exists": rng.random(n_rows) > 0.02,
+            "delay_reason": None,
+            "realtime_status": np.where(np.isnan(delays), None, "MONITORED"),
+            "status_text": None,
+        }
+    )
+
+
+def _date_parts(iso):
+    return {
+        "year": iso[0:4].lstrip("0"),
+        "month": iso[5:7].lstrip("0"),
+        "day": iso[8:10].lstrip("0"),
+        "hour": iso[11:13].lstrip("0") or "0",
+        "minute": iso[14:16].lstrip("0") or "0",
+    }
+
+
+def history_to_responses(history, departures_per_response=40):
+    """
+    Splits a departure table into EFA `departureList` responses, with the umlauts spelled as the
+    API returns them.
+
+    Args:
+        history (pd.DataFrame): Result of `synthetic_history`.
+        departures_per_response (int): Departures per response.
+
+    Returns:
+        list of list of dict: One `departureList` per response.
+    """
+    responses, current = [], []
+    for row in history.itertuples(index=False):
+        dep = {
+            "stopName": row.stop.translate(_MOJIBAKE_TABLE),
+            "dateTime": _date_parts(row.scheduled_departure),
+            "servingLine": {
+                "number": row.line.translate(_MOJIBAKE_TABLE) if isinstance(row.line, str) else None,
+                "direction": row.direction.translate(_MOJIBAKE_TABLE),
+                "delay": "-9999" if np.isnan(row.delay_min) else str(int(row.delay_min)),
+                "cancelled": "0" if row.connection_exists else "1",
+                "realtimeStatus": row.realtime_status if isinstance(row.realtime_status, str) else "",
+            },
+        }
+        if isinstance(row.platform, str):
+            dep["platformName"] = row.platform
+        if isinstance(row.real_departure, str):
+            dep["realDateTime"] = _date_parts(row.real_departure)
+        current.append(dep)
+        if len(current) == departures_per_response:
+            responses.append(current)
+            current = []
+    if current:
+        responses.append(current)
+    return responses
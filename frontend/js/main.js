@@ -3,10 +3,14 @@
 /**
  * main.js - Interactive Map for Ruhr Region Train Stations
  *
- * This script initializes a Leaflet map centered on the Ruhr region, Germany, and loads train station data from a local GeoJSON file.
- * Each station is shown as a colored circle marker, where the color indicates the average train delay at that station (green = low, orange = moderate, red = high).
+ * This script initializes a Leaflet map centered on the Ruhr region, Germany, and loads a compact summary of the train stations from the station API
+ * (only the columns the map needs, as typed arrays, and only the stations of the current viewport; reloaded after the map was moved or zoomed).
+ * The full departure lists of a station are fetched when it is selected.
+ * Each station is shown as a colored circle marker, where the color indicates the average train delay at that station (green = low, orange = moderate, red = high);
+ * the averages are precomputed by the backend, the map does no math on the departure lists.
  * Clicking a marker highlights it and sends its details to a handler for further display or processing.
  * The map automatically highlights Bochum Hbf on load if present.
+ * Afterwards, the server pushes the changed stations of every ingest cycle (Server-Sent Events); the existing markers are restyled in place.
  */
 
 // Initialize the map over the Ruhr region, Germany
@@ -17,94 +21,243 @@ L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
 	attribution: '&copy; OpenStreetMap contributors'
 }).addTo(map);
 
-// Load GeoJSON from local file
-fetch('/data/geodata/generated/bahnhoefe_running.geojson')
-	.then(response => response.text())
-	.then(text => {
-		let data;
-		try {
-			data = JSON.parse(text);
-		} catch (e) {
-			console.error('Could not parse GeoJSON:', e);
-			return;
-		}
-let bochumLayer = null;
+let stationLayer = null;
+let markersByStop = {}; // stop name -> circleMarker
+let stationVersion = null; // version of the station state shown on the map
+let stationInstance = null; // server instance the version belongs to
 let selectedLayer = null;
 let selectedOutline = null; // Store the outline circle
-let allLayers = [];
-L.geoJSON(data, {
-	pointToLayer: function(feature, latlng) {
-		// Calculate average delay
-		let avgDelay = 0;
-		if (feature.properties && Array.isArray(feature.properties.delays) && feature.properties.delays.length > 0) {
-			const sum = feature.properties.delays.reduce((a, b) => a + b, 0);
-			avgDelay = sum / feature.properties.delays.length;
+
+// Columns of the station summary used by the map
+const SUMMARY_COLUMNS = ['stop', 'lon', 'lat', 'delay_mean'];
+// Margin around the viewport (share of its size) loaded ahead for panning
+const VIEWPORT_PADDING = 0.2;
+let summaryRequest = 0; // number of the latest summary request, older responses are dropped
+
+// Average delay and marker color of a station
+function delayStyle(props) {
+	// Average delay, precomputed by the backend (null without departures)
+	const avgDelay = (props && typeof props.delay_mean === 'number') ? props.delay_mean : 0;
+	// Determine color based on average delay
+	let color = '#00cc44'; // green
+	if (avgDelay > 20) {
+		color = '#ff0000'; // red
+	} else if (avgDelay > 1) {
+		color = '#ffa500'; // orange
+	}
+	return { avgDelay: avgDelay, color: color };
+}
+
+function selectLayer(layer) {
+	// Remove indicator from previous selection
+	if (selectedOutline) {
+		map.removeLayer(selectedOutline);
+		selectedOutline = null;
+	}
+	// Do NOT change the color of the selected marker
+
+	// Add a black outline circle beneath the selected marker
+	selectedOutline = L.circleMarker(layer.getLatLng(), {
+		radius: 12, // Larger than the marker
+		color: '#000000',
+		weight: 4,
+		fill: false,
+		opacity: 1,
+		interactive: false // Prevent outline from capturing events
+	}).addTo(map);
+	selectedLayer = layer;
+	// Read the properties from the layer, they are replaced by live updates
+	const props = layer.feature.properties;
+	if (!Array.isArray(props.delays)) {
+		// Only the aggregates are loaded so far: fetch the departure lists of this station
+		loadDetails(layer);
+		return;
+	}
+	showDetails(props);
+}
+
+// Fetch the full feature (with the departure lists) of a station and show it if still selected
+function loadDetails(layer) {
+	fetch('/api/stations/feature?stop=' + encodeURIComponent(layer.feature.properties.stop))
+		.then(response => response.json())
+		.then(feature => {
+			layer.feature = feature;
+			if (selectedLayer === layer) {
+				showDetails(feature.properties);
+			}
+		})
+		.catch(error => console.error('Error loading station details:', error));
+}
+
+function showDetails(props) {
+	console.log('Feature properties:', props); // Debug: log all properties
+	// No popup, just send to feature_share.js for creative manipulation
+	if (window.displayFeatureDetails) {
+		window.displayFeatureDetails(props);
+	}
+}
+
+// Decode the typed-array station summary into (minimal) GeoJSON features
+function decodeSummary(buffer) {
+	const headerLength = new DataView(buffer).getUint32(0, true);
+	const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+	const columns = {};
+	header.columns.forEach(column => {
+		columns[column.name] = new window[column.type](buffer, column.offset, header.count);
+	});
+	const features = [];
+	for (let i = 0; i < header.count; i++) {
+		features.push({
+			type: 'Feature',
+			properties: { stop: header.stops[i], delay_mean: columns.delay_mean[i] },
+			geometry: { type: 'Point', coordinates: [columns.lon[i], columns.lat[i]] }
+		});
+	}
+	return { full: true, version: header.version, instance: header.instance, removed: [], features: features };
+}
+
+// Bounding box and zoom level of the (padded) viewport as query parameters
+function viewportQuery() {
+	const bounds = map.getBounds().pad(VIEWPORT_PADDING);
+	const bbox = [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()];
+	return '&bbox=' + bbox.map(v => v.toFixed(5)).join(',') + '&zoom=' + map.getZoom();
+}
+
+function inViewport(feature) {
+	const coordinates = feature.geometry.coordinates;
+	return map.getBounds().pad(VIEWPORT_PADDING).contains(L.latLng(coordinates[1], coordinates[0]));
+}
+
+// Load the summary of the stations in the viewport (a full state for the viewport)
+function loadSummary() {
+	const request = ++summaryRequest;
+	return fetch('/api/stations/summary?columns=' + SUMMARY_COLUMNS.join(',') + viewportQuery())
+		.then(response => response.arrayBuffer())
+		.then(buffer => {
+			if (request === summaryRequest) {
+				applyStations(decodeSummary(buffer));
+			}
+		});
+}
+
+// Apply a station state or delta from /api/stations or the event stream
+function applyStations(data) {
+	if (data.full) {
+		// Stops that are no longer part of the full state (or outside the viewport), except the selected one
+		const present = new Set(data.features.map(f => f.properties.stop));
+		Object.keys(markersByStop)
+			.filter(stop => !present.has(stop) && markersByStop[stop] !== selectedLayer)
+			.forEach(removeStation);
+	}
+	(data.removed || []).forEach(removeStation);
+	data.features.forEach(feature => {
+		const marker = markersByStop[feature.properties.stop];
+		if (!marker) {
+			// Deltas may contain stops anywhere in the network: only add the visible ones
+			if (data.full || inViewport(feature)) {
+				stationLayer.addData(feature);
+			}
+			return;
 		}
-		// Determine color based on average delay
-		let color = '#00cc44'; // green
-		if (avgDelay > 20) {
-			color = '#ff0000'; // red
-		} else if (avgDelay > 1) {
-			color = '#ffa500'; // orange
+		// Update the existing marker in place
+		marker.feature = feature;
+		const style = delayStyle(feature.properties);
+		marker.setStyle({ fillColor: style.color, color: style.color });
+		marker.setPopupContent("Average delay: " + style.avgDelay.toFixed(1) + " min");
+		if (marker === selectedLayer && data.version !== stationVersion) {
+			// Updates only carry the aggregates: refresh the departure lists of the selected station
+			loadDetails(marker);
+		}
+	});
+	stationVersion = data.version;
+	stationInstance = data.instance;
+}
+
+function removeStation(stop) {
+	const marker = markersByStop[stop];
+	if (!marker) {
+		return;
+	}
+	stationLayer.removeLayer(marker);
+	delete markersByStop[stop];
+	if (marker === selectedLayer && selectedOutline) {
+		map.removeLayer(selectedOutline);
+		selectedOutline = null;
+		selectedLayer = null;
+	}
+}
+
+// Fetch the changes since the shown version after a missed update (the summary after a server restart)
+function resyncStations(instance) {
+	if (instance !== stationInstance || stationVersion === null) {
+		return loadSummary().catch(error => console.error('Error resyncing stations:', error));
+	}
+	return fetch('/api/stations?since=' + stationVersion + '&instance=' + stationInstance)
+		.then(response => response.json())
+		.then(applyStations)
+		.catch(error => console.error('Error resyncing stations:', error));
+}
+
+// Subscribe to the changed stations of every ingest cycle
+function subscribeStations() {
+	if (!window.EventSource) {
+		return;
+	}
+	const events = new EventSource('/api/stations/events');
+	events.addEventListener('stations', event => {
+		const data = JSON.parse(event.data);
+		if (data.instance !== stationInstance || data.since !== stationVersion) {
+			// Missed an update (or the server restarted): fetch what is missing
+			resyncStations(data.instance);
+			return;
 		}
+		applyStations(data);
+	});
+}
+
+stationLayer = L.geoJSON(null, {
+	pointToLayer: function(feature, latlng) {
+		const style = delayStyle(feature.properties);
 		// Use a circle marker for all points, fully opaque
 		const marker = L.circleMarker(latlng, {
 			radius: 8,
-			fillColor: color,
-			color: color,
+			fillColor: style.color,
+			color: style.color,
 			weight: 2,
 			opacity: 1,
 			fillOpacity: 1 // Fully opaque
 		});
 		// Add popup with average delay
-		marker.bindPopup("Average delay: " + avgDelay.toFixed(1) + " min");
+		marker.bindPopup("Average delay: " + style.avgDelay.toFixed(1) + " min");
 		return marker;
 	},
 	onEachFeature: function(feature, layer) {
-		allLayers.push(layer);
-		// Check for Bochum Hbf and store the layer
-		if (feature.properties && feature.properties.stop === "Bochum Hbf") {
-			bochumLayer = layer;
-		}
+		markersByStop[feature.properties.stop] = layer;
 		layer.on('click', function() {
-			// Remove indicator from previous selection
-			if (selectedOutline) {
-				map.removeLayer(selectedOutline);
-				selectedOutline = null;
-			}
-			if (selectedLayer && selectedLayer !== layer) {
-				// Optionally reset style of previously selected layer if needed
-				// selectedLayer.setStyle({ ... }); // Remove or comment out
-			}
-			// Do NOT change the color of the selected marker
-			// layer.setStyle({ ... }); // Remove or comment out
-
-			// Add a black outline circle beneath the selected marker
-			selectedOutline = L.circleMarker(layer.getLatLng(), {
-				radius: 12, // Larger than the marker
-				color: '#000000',
-				weight: 4,
-				fill: false,
-				opacity: 1,
-				interactive: false // Prevent outline from capturing events
-			}).addTo(map);
-			selectedLayer = layer;
-			let props = feature.properties;
-			console.log('Feature properties:', props); // Debug: log all properties
-			// No popup, just send to feature_share.js for creative manipulation
-			if (window.displayFeatureDetails) {
-				window.displayFeatureDetails(props);
-			}
+			selectLayer(layer);
 		});
 	}
 }).addTo(map);
-// After all features are added, trigger click for Bochum Hbf if found (no popup)
-if (bochumLayer) {
-	bochumLayer.fire('click');
-}
+
+// Reload the stations of the viewport after the map was moved or zoomed (debounced)
+let viewportTimer = null;
+map.on('moveend', function() {
+	clearTimeout(viewportTimer);
+	viewportTimer = setTimeout(() => {
+		loadSummary().catch(error => console.error('Error loading stations:', error));
+	}, 150);
+});
+
+// Load the station summary from the server
+loadSummary()
+	.then(() => {
+		// After all features are added, trigger click for Bochum Hbf if found (no popup)
+		const bochumLayer = markersByStop["Bochum Hbf"];
+		if (bochumLayer) {
+			bochumLayer.fire('click');
+		}
+		subscribeStations();
 	})
 	.catch(error => {
-		console.error('Error loading GeoJSON:', error);
+		console.error('Error loading stations:', error);
 	});
-// After all features are added, trigger click for Bochum Hbf if found (no popup)
-
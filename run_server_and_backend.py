@@ -1,4 +1,5 @@
 import asyncio
+import json
 import sys
 from pathlib import Path
 from aiohttp import web
@@ -7,6 +8,26 @@ from aiohttp import web
 ROOT = Path(__file__).resolve().parent
 FRONTEND_DIR = ROOT / "frontend"
 BACKEND_SCRIPT = ROOT / "backend" / "backend_api_to_geo.py"
+DATA_DIR = ROOT / "data"
+GENERATED_DIR = DATA_DIR / "geodata" / "generated"
+STATIONS_GEOJSON = GENERATED_DIR / "bahnhoefe_running.geojson"
+# Station geometries: every station is indexed, also those without departures
+STATIONS_SOURCE = DATA_DIR / "geodata" / "source" / "bahnhoefe.shp"
+# Poll telemetry summary written periodically by the backend subprocess
+POLL_TELEMETRY_JSON = DATA_DIR / "temp" / "poll_telemetry.json"
+
+# How often the GeoJSON file of the backend subprocess is checked for changes
+GEOJSON_POLL_S = 2.0
+# Interval of SSE comments that keep idle connections (and proxies) open
+SSE_KEEPALIVE_S = 15.0
+# Pending updates per SSE client; older ones are dropped for slow clients (they resync)
+SSE_QUEUE_SIZE = 16
+
+sys.path.insert(0, str(ROOT / "backend"))
+from compressed_files import CompressedFileCache  # noqa: E402
+from poll_telemetry import SORT_FIELDS  # noqa: E402
+from station_state import StationState  # noqa: E402
+from station_summary import SUMMARY_COLUMNS, SummaryCache, encode_summary  # noqa: E402
 
 
 # Serve static files (index.html, js, css, etc.)
@@ -14,11 +35,314 @@ async def handle_index(request):
     return web.FileResponse(str(FRONTEND_DIR / "index.html"))
 
 
-async def start_backend_process():
+# Data files: pre-compressed variants, strong ETags and an in-memory cache for small files
+async def handle_data_file(request):
+    """
+    Serves a file from the data directory.
+
+    Picks the `.br` or `.gz` variant written next to the file if the client accepts it, answers
+    304 Not Modified on a matching If-None-Match and keeps small files in memory. Generated
+    files must be revalidated on every use, the others may be cached for an hour.
+    """
+    path = (DATA_DIR / request.match_info["path"]).resolve()
+    if not path.is_relative_to(DATA_DIR.resolve()) or not path.is_file():
+        raise web.HTTPNotFound()
+
+    cache = request.app["file_cache"]
+    variant, encoding, stat = cache.select(path, request.headers.get("Accept-Encoding"))
+    etag = cache.etag(stat, encoding)
+    headers = {
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-cache"
+        if path.is_relative_to(GENERATED_DIR.resolve())
+        else "public, max-age=3600",
+        "Content-Type": cache.content_type(path),
+    }
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    if request.headers.get("If-None-Match") == etag:
+        return web.Response(status=304, headers=headers)
+
+    data = await asyncio.to_thread(cache.read, variant, stat)
+    if data is None:
+        # Too large for the cache, stream it from disk
+        return web.FileResponse(variant, headers=headers)
+    return web.Response(body=data, headers=headers)
+
+
+def without_lists(collection):
+    """
+    Returns a copy of a station FeatureCollection without the per-departure list properties.
+
+    The map only needs the scalar aggregates (`delay_mean`, `delay_max`, ...) that the backend
+    precomputes; the lists are only fetched for a selected stop (`/api/stations/feature`).
+    """
+    features = [
+        {
+            **feature,
+            "properties": {
+                name: value
+                for name, value in feature["properties"].items()
+                if not isinstance(value, list)
+            },
+        }
+        for feature in collection["features"]
+    ]
+    return {**collection, "features": features}
+
+
+def parse_viewport(request):
+    """
+    Reads the optional `bbox=minx,miny,maxx,maxy` (WGS84 lon/lat) and `zoom` query parameters.
+
+    Returns:
+        tuple: `(bbox, zoom)`, each None if not given.
+
+    Raises:
+        web.HTTPBadRequest: If a parameter is malformed.
+    """
+    bbox = request.query.get("bbox")
+    zoom = request.query.get("zoom")
+    if bbox is not None:
+        try:
+            bbox = tuple(float(v) for v in bbox.split(","))
+        except ValueError:
+            bbox = ()
+        if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            raise web.HTTPBadRequest(text="bbox must be minx,miny,maxx,maxy")
+    if zoom is not None:
+        try:
+            zoom = int(float(zoom))
+        except ValueError:
+            raise web.HTTPBadRequest(text="zoom must be a number")
+    return bbox, zoom
+
+
+def viewport_etag(etag, bbox, zoom):
+    """ETag of a viewport query: the state ETag extended by the box and zoom level."""
+    if bbox is None:
+        return etag
+    return f'{etag[:-1]}-{",".join(f"{v:g}" for v in bbox)}-{zoom}"'
+
+
+# Station state API: full state, or only the stops changed since a version
+async def handle_stations(request):
+    """
+    Returns the station state as a GeoJSON FeatureCollection with a version.
+
+    Query parameters:
+        since (int, optional): Only return the stops that changed after this version.
+        instance (str, optional): Instance token of the response `since` was taken from. If it does
+            not match (e.g. after a server restart), the full state is returned.
+        bbox (str, optional): `minx,miny,maxx,maxy` in WGS84 lon/lat: only the stops in this box,
+            looked up in the spatial index of the state.
+        zoom (int, optional): Map zoom level; below the detail zoom the stops of `bbox` are
+            thinned out to one per ~32 px.
+        lists (str, optional): `0` leaves out the per-departure lists (only the aggregates).
+
+    Answers 304 Not Modified if the If-None-Match header matches the current ETag.
+    """
+    state = request.app["station_state"]
+    bbox, zoom = parse_viewport(request)
+    lists = request.query.get("lists", "1") != "0"
+    etag = viewport_etag(state.etag, bbox, zoom)
+    if not lists:
+        etag = f'{etag[:-1]}-nolists"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("If-None-Match") == etag:
+        return web.Response(status=304, headers=headers)
+
+    since = request.query.get("since")
+    try:
+        since = int(since) if since is not None else None
+    except ValueError:
+        raise web.HTTPBadRequest(text="since must be an integer version")
+    if request.query.get("instance") not in (None, state.instance):
+        since = None
+
+    snapshot = state.snapshot(since, bbox, zoom)
+    if not lists:
+        snapshot = without_lists(snapshot)
+    body = json.dumps(snapshot, ensure_ascii=False)
+    return web.Response(text=body, content_type="application/json", headers=headers)
+
+
+# Compact columnar summary (typed arrays) for the overview map
+async def handle_station_summary(request):
+    """
+    Returns one value per stop for the requested columns, as typed arrays (see `station_summary`).
+
+    Query parameters:
+        columns (str, optional): Comma separated columns, e.g. `stop,lon,lat,delay_mean`
+            (default: all).
+        bbox, zoom (optional): Only the stops of a viewport, as for `/api/stations`.
+
+    The encoded summary of all stops is cached until the station state changes.
+    """
+    state = request.app["station_state"]
+    columns = request.query.get("columns")
+    columns = tuple(c for c in columns.split(",") if c) if columns else None
+    bbox, zoom = parse_viewport(request)
+
+    etag = viewport_etag(f'{state.etag[:-1]}-{",".join(columns or ["all"])}"', bbox, zoom)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("If-None-Match") == etag:
+        return web.Response(status=304, headers=headers)
+
+    cache = request.app["summary_cache"]
+    state_etag = state.etag
+    # Viewport summaries are cheap to build and too many to cache
+    body = cache.get(state_etag, columns) if bbox is None else None
+    if body is None:
+        snapshot = state.snapshot(bbox=bbox, zoom=zoom)
+        try:
+            body = encode_summary(snapshot["features"], columns, snapshot["version"], snapshot["instance"])
+        except ValueError as e:
+            raise web.HTTPBadRequest(text=f"{e} (available: stop, {', '.join(SUMMARY_COLUMNS)})")
+        if bbox is None:
+            cache.put(state_etag, columns, body)
+    return web.Response(body=body, content_type="application/octet-stream", headers=headers)
+
+
+# Full feature (with the departure lists) of a single stop
+async def handle_station_feature(request):
+    """Returns the GeoJSON feature of the stop given by `?stop=`, 404 if it is unknown."""
+    feature = request.app["station_state"].feature(request.query.get("stop", ""))
+    if feature is None:
+        raise web.HTTPNotFound(text="Unknown stop")
+    return web.json_response(feature, dumps=lambda obj: json.dumps(obj, ensure_ascii=False))
+
+
+# Poll efficiency of the ingest loop: returned, new and known departures, latency and size per stop
+async def handle_telemetry(request):
+    """
+    Returns the rolling poll telemetry summary (see `PollTelemetry.summary`).
+
+    With the in-process ingest loop the summary is computed on request; `sort` (a stop summary
+    field, default `wasted`) and `limit` select the stops. Otherwise the summary the backend
+    subprocess writes every few minutes is returned as is (404 until it was written once).
+    """
+    telemetry = request.app.get("telemetry")
+    if telemetry is None:
+        if not POLL_TELEMETRY_JSON.is_file():
+            raise web.HTTPNotFound(text="No poll telemetry yet")
+        data = await asyncio.to_thread(POLL_TELEMETRY_JSON.read_bytes)
+        return web.Response(body=data, content_type="application/json", headers={"Cache-Control": "no-cache"})
+
+    try:
+        limit = int(request.query["limit"]) if "limit" in request.query else None
+    except ValueError:
+        raise web.HTTPBadRequest(text="limit must be an integer")
+    try:
+        summary = telemetry.summary(sort=request.query.get("sort", "wasted"), limit=limit)
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=f"{e} (available: {', '.join(SORT_FIELDS)})")
+    return web.json_response(summary, dumps=lambda obj: json.dumps(obj, ensure_ascii=False))
+
+
+def publish_station_update(app, changes):
+    """
+    Queues a station delta (None ends the streams) for every connected SSE client.
+
+    The events only carry the aggregates of the stops, clients fetch the lists of a stop on demand.
+    """
+    if changes is not None:
+        changes = without_lists(changes)
+    for queue in app["sse_clients"]:
+        if queue.full():
+            # Drop the oldest update; the client notices the version gap and resyncs
+            queue.get_nowait()
+        queue.put_nowait(changes)
+
+
+def apply_station_features(app, features, replace):
+    """Merges features into the station state and pushes the changed stops to the SSE clients."""
+    state = app["station_state"]
+    before = state.version
+    if state.update(features, replace=replace):
+        publish_station_update(app, state.snapshot(since=before) | {"since": before})
+
+
+def sse_message(changes):
+    """Formats a station delta as a Server-Sent Event, with `<instance>-<version>` as event ID."""
+    data = json.dumps(changes, ensure_ascii=False)
+    return f"id: {changes['instance']}-{changes['version']}\nevent: stations\ndata: {data}\n\n".encode("utf-8")
+
+
+# Push channel: Server-Sent Events with the stops changed by each ingest cycle
+async def handle_station_events(request):
+    """
+    Streams station deltas as Server-Sent Events.
+
+    Every event carries the same payload as `/api/stations?since=<since>`, plus `since`. A client
+    whose version differs from `since` missed an update and has to resync. When the browser
+    reconnects with a Last-Event-ID of this instance, the changes since then are sent first.
+    """
+    state = request.app["station_state"]
+    response = web.StreamResponse(
+        headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
+    await response.prepare(request)
+
+    queue = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+    request.app["sse_clients"].add(queue)
+    try:
+        instance, _, version = request.headers.get("Last-Event-ID", "").rpartition("-")
+        if instance == state.instance and version.isdigit() and int(version) < state.version:
+            since = int(version)
+            await response.write(sse_message(without_lists(state.snapshot(since=since)) | {"since": since}))
+        while True:
+            try:
+                changes = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_S)
+            except asyncio.TimeoutError:
+                await response.write(b": keep-alive\n\n")
+                continue
+            if changes is None:
+                break  # server shutdown
+            await response.write(sse_message(changes))
+    except ConnectionResetError:
+        pass  # client went away; cancellation propagates after unsubscribing
+    finally:
+        request.app["sse_clients"].discard(queue)
+    return response
+
+
+async def watch_geojson_file(app):
+    """Reloads the GeoJSON file of the backend subprocess whenever it changes and publishes the delta."""
+    state = app["station_state"]
+    while True:
+        before = state.version
+        if await asyncio.to_thread(state.refresh_from_file, STATIONS_GEOJSON):
+            publish_station_update(app, state.snapshot(since=before) | {"since": before})
+        await asyncio.sleep(GEOJSON_POLL_S)
+
+
+def backend_arguments(options):
+    """Command line of the backend script for the --catalog, --adaptive and --storage options."""
+    arguments = ["--storage", options["storage"]]
+    if options["catalog"] or options["adaptive"]:
+        # The scheduler only runs in the async loop
+        arguments.append("--async")
+    if options["catalog"] is True:
+        arguments.append("--catalog")
+    elif options["catalog"]:
+        arguments += ["--catalog", options["catalog"]]
+    if options["adaptive"]:
+        arguments.append("--adaptive")
+    return arguments
+
+
+async def start_backend_process(options):
     process = await asyncio.create_subprocess_exec(
         sys.executable,
         "-u",
         str(BACKEND_SCRIPT),
+        *backend_arguments(options),
         cwd=str(ROOT),
     )
     print(f"[INFO] Started backend process with PID {process.pid}")
@@ -27,20 +351,80 @@ async def start_backend_process():
     print(f"[INFO] Backend process exited with code {process.returncode}")
 
 
+async def run_ingest_inprocess(app):
+    """
+    Runs the async ingest loop as a task of this process and feeds the station state in memory.
+
+    The GeoJSON file is only written if `app["write_geojson_file"]` is set. The --catalog,
+    --adaptive and --storage options are applied as in the backend script.
+    """
+    import backend_api_to_geo as backend
+
+    options = app["backend_options"]
+    backend.init_paths(backend.__file__)
+    backend.init_logger(backend.root)
+    backend.init_storage(options["storage"])
+    backend.init_response_archive()
+    app["telemetry"] = backend.poll_telemetry
+    catalog = backend.DEFAULT_CATALOG if options["catalog"] is True else options["catalog"]
+    scheduler, adaptive = await asyncio.to_thread(
+        backend.build_scheduler,
+        backend.DELAY_MIN,
+        backend.PLACENAME_LIST,
+        catalog,
+        options["adaptive"],
+    )
+
+    await backend.main_async(
+        backend.DELAY_MIN,
+        backend.PLACENAME_LIST,
+        backend.N_ENTRIES,
+        on_cycle=lambda features: apply_station_features(app, features, replace=False),
+        write_geojson_file=app["write_geojson_file"],
+        scheduler=scheduler,
+        adaptive=adaptive,
+    )
+
+
+def index_station_geometries(state, path=STATIONS_SOURCE):
+    """Puts all station points of the geometry source into the spatial index of the state."""
+    from station_cache import StationGeometryCache
+
+    try:
+        cache = StationGeometryCache(path)
+    except FileNotFoundError:
+        print(f"[WARN] Station geometries not found at {path}, only stops with departures are indexed")
+        return
+    state.index_stations({stop: cache.get(stop) for stop in cache.stops})
+
+
 async def on_startup(app):
-    # Start backend script as a background task
-    app["backend_task"] = asyncio.create_task(start_backend_process())
+    # Index the stations before the first ingest cycle, so idle stations are on the map too
+    await asyncio.to_thread(index_station_geometries, app["station_state"])
+    # Start the ingest loop as a background task: in this process or as a backend script
+    if app["inprocess"]:
+        app["backend_task"] = asyncio.create_task(run_ingest_inprocess(app))
+    else:
+        app["backend_task"] = asyncio.create_task(start_backend_process(app["backend_options"]))
+        # The subprocess only communicates through the GeoJSON file
+        app["watch_task"] = asyncio.create_task(watch_geojson_file(app))
+
+
+async def on_shutdown(app):
+    # End the open event streams, otherwise the server waits for them
+    publish_station_update(app, None)
 
 
 async def on_cleanup(app):
-    # Cancel backend task if running
-    task = app.get("backend_task")
-    if task:
-        task.cancel()
-        try:
-            await task
-        except asyncio.CancelledError:
-            pass
+    # Cancel backend and watcher tasks if running
+    for key in ("backend_task", "watch_task"):
+        task = app.get(key)
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
 
 
 def main():
@@ -55,13 +439,29 @@ def main():
     The function sets up an aiohttp web application with the following routes:
         - Serves `index.html` at the root path (`/`).
         - Serves static frontend files (JavaScript, CSS, etc.) from the frontend directory.
-        - Serves static files from the `data` directory at the `/data/` path, allowing access to GeoJSON and other files.
+        - Serves files from the `data` directory at the `/data/` path, allowing access to GeoJSON and other files
+          (pre-compressed gzip/brotli variants, ETags and caching headers).
+
+        - Serves the versioned station state at `/api/stations` (`?since=<version>` for deltas,
+          `?bbox=minx,miny,maxx,maxy&zoom=z` for the stops of a map viewport).
+        - Pushes the changed stops of every ingest cycle as Server-Sent Events at `/api/stations/events`.
+        - Serves a compact typed-array summary at `/api/stations/summary` and single stops at `/api/stations/feature`.
+        - Serves the rolling poll telemetry (wasted vs. useful requests per stop) at `/api/telemetry`.
 
     Additionally, startup and cleanup hooks are registered for application lifecycle management.
 
     Command-line Arguments:
-        --local   Serve only on localhost (127.0.0.1). This is the default behavior.
-        --global  Serve on all network interfaces (0.0.0.0).
+        --local            Serve only on localhost (127.0.0.1). This is the default behavior.
+        --global           Serve on all network interfaces (0.0.0.0).
+        --inprocess        Run the ingest loop inside the server process and serve the station
+                           state from memory instead of starting the backend script.
+        --no-geojson-file  With --inprocess, do not write the station GeoJSON file.
+        --catalog [PATH]   Poll all stops of a stop catalog with the priority scheduler.
+        --adaptive         Adapt the poll interval of every stop to its responses.
+        --storage          Store departures in the CSV file (default) or the Parquet archive.
+
+    The backend options apply to the in-process ingest loop as well as to the backend script
+    (which is then started in async mode if --catalog or --adaptive is given).
 
     Side Effects:
         - Prints the URL where the frontend is being served.
@@ -89,6 +489,35 @@ def main():
         action="store_true",
         help="Serve on all interfaces (0.0.0.0)",
     )
+    parser.add_argument(
+        "--inprocess",
+        action="store_true",
+        help="Run the ingest loop inside the server process (in-memory station state)",
+    )
+    parser.add_argument(
+        "--no-geojson-file",
+        action="store_true",
+        help="With --inprocess, do not write the station GeoJSON file",
+    )
+    # Backend options, for the in-process ingest loop and the backend script alike
+    parser.add_argument(
+        "--catalog",
+        nargs="?",
+        const=True,
+        metavar="PATH",
+        help="Poll all stops of a stop catalog with the priority scheduler (default catalog: the VRR stop list)",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Adapt the poll interval of every stop to the span its responses cover and to changing delays",
+    )
+    parser.add_argument(
+        "--storage",
+        choices=["csv", "parquet"],
+        default="csv",
+        help="Where departures are stored: the single CSV file (default) or the date-partitioned Parquet archive",
+    )
     args = parser.parse_args()
 
     # Default is local (127.0.0.1) unless --global is specified
@@ -100,14 +529,27 @@ def main():
         print("[INFO] Serving frontend at http://127.0.0.1:8080/")
 
     app = web.Application()
+    app["station_state"] = StationState()
+    app["inprocess"] = args.inprocess
+    app["write_geojson_file"] = not (args.inprocess and args.no_geojson_file)
+    app["backend_options"] = {"catalog": args.catalog, "adaptive": args.adaptive, "storage": args.storage}
+    app["sse_clients"] = set()
+    app["file_cache"] = CompressedFileCache()
+    app["summary_cache"] = SummaryCache()
+    # Station state API (must be registered before the catch-all static route)
+    app.router.add_get("/api/stations", handle_stations)
+    app.router.add_get("/api/stations/events", handle_station_events)
+    app.router.add_get("/api/stations/summary", handle_station_summary)
+    app.router.add_get("/api/stations/feature", handle_station_feature)
+    app.router.add_get("/api/telemetry", handle_telemetry)
+    # Serve data directory for geojson and other files (pre-compressed, cached)
+    app.router.add_get("/data/{path:.+}", handle_data_file)
     # Serve index.html at root
     app.router.add_get("/", handle_index)
     # Serve static files (js, css, etc.)
     app.router.add_static("/", str(FRONTEND_DIR), show_index=True)
-    # Serve data directory for geojson and other files
-    DATA_DIR = ROOT / "data"
-    app.router.add_static("/data/", str(DATA_DIR), show_index=True)
     app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
     app.on_cleanup.append(on_cleanup)
 
     web.run_app(app, port=8080, host=host)
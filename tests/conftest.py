@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The backend modules import each other by their plain names, the server lives in the root
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT))
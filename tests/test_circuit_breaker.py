@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import backend_api_to_geo
+from throttle import CircuitBreaker, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ThrottledError(Exception):
+    status_code = 429
+    retry_after = None
+
+
+def tripped_breaker(clock):
+    """An open breaker whose cooldown has passed: the next request is the probe."""
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_s=60.0, clock=clock)
+    breaker.record_failure()
+    clock.now += 60.0
+    return breaker
+
+
+def test_throttled_probe_reopens_breaker():
+    clock = FakeClock()
+    breaker = tripped_breaker(clock)
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    limiter = TokenBucket(rate=10.0, capacity=10, clock=clock)
+
+    backend_api_to_geo.record_request_outcome(limiter, breaker, ThrottledError())
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    clock.now += breaker.seconds_until_probe()
+    assert breaker.allow_request()
+
+
+def test_throttling_does_not_trip_closed_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, clock=clock)
+    limiter = TokenBucket(rate=10.0, capacity=10, clock=clock)
+
+    backend_api_to_geo.record_request_outcome(limiter, breaker, ThrottledError())
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_unparsable_probe_reopens_breaker(monkeypatch):
+    clock = FakeClock()
+    key = ("Essen", "Hbf")
+    breakers = {key: tripped_breaker(clock)}
+
+    async def unparsable(*args, **kwargs):
+        raise ValueError("Expecting value: line 1 column 1 (char 0)")
+
+    monkeypatch.setattr(backend_api_to_geo, "full_api_request_async", unparsable)
+
+    async def run():
+        limiter = TokenBucket(rate=1000.0, capacity=10)
+        return await backend_api_to_geo.fetch_cycle_async(
+            None, asyncio.Semaphore(1), [key], limiter, breakers
+        )
+
+    (result,) = asyncio.run(run())
+
+    assert isinstance(result, ValueError)
+    assert breakers[key].state == CircuitBreaker.OPEN
+    clock.now += breakers[key].seconds_until_probe()
+    assert breakers[key].allow_request()
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pandas as pd
+
+from csv_tail import read_csv_since, read_csv_tail
+
+
+def write_history(path, n_rows, seed=0):
+    rng = random.Random(seed)
+    df = pd.DataFrame(
+        {
+            "stop": [rng.choice(["Essen Hauptbahnhof", "Düsseldorf Hbf", "MG Hbf /Europaplatz"]) for _ in range(n_rows)],
+            "line": [rng.choice(["RE1", "S1", "ICE 727", ""]) for _ in range(n_rows)],
+            "scheduled_date_iso": [f"2025-08-{20 + i * 5 // n_rows:02d}" for i in range(n_rows)],
+        }
+    )
+    df.to_csv(path, index=False)
+    return df
+
+
+def test_tail_matches_full_read(tmp_path):
+    path = tmp_path / "history.csv"
+    write_history(path, 500)
+    full = pd.read_csv(path, dtype=str)
+    for n_rows in (0, 1, 7, 123, 499, 500, 800):
+        for block_size in (16, 100, 64 * 1024):
+            tail = read_csv_tail(path, n_rows, dtype=str, block_size=block_size)
+            expected = full.tail(n_rows).reset_index(drop=True) if n_rows else full.iloc[:0]
+            pd.testing.assert_frame_equal(tail, expected)
+
+
+def test_since_reads_until_older_rows(tmp_path):
+    path = tmp_path / "history.csv"
+    df = write_history(path, 500)
+
+    since = read_csv_since(path, "scheduled_date_iso", "2025-08-23", dtype=str, initial_rows=10)
+
+    assert len(since) == (df["scheduled_date_iso"] >= "2025-08-23").sum()
+    assert (since["scheduled_date_iso"] >= "2025-08-23").all()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import backend_api_to_geo as backend
+from departure_ids import (
+    departure_ids,
+    departure_keys,
+    halves_to_ints,
+    halves_to_strings,
+    strings_to_halves,
+    strings_to_ints,
+)
+
+# (stop, scheduled datetime, line) as build_results passes them to make_uid
+ROWS = [
+    ("Essen Hauptbahnhof", datetime(2025, 8, 24, 17, 5), "RE1"),
+    ("DÃ¼sseldorf Hbf", datetime(2025, 8, 24, 0, 0), "S1"),  # mis-decoded, as the API sends it
+    ("Düsseldorf Hbf", datetime(2025, 12, 31, 23, 59), "ICE 727"),
+    ("MG Hbf /Europaplatz", None, "RB40"),  # no valid scheduled time
+    (None, datetime(2025, 8, 24, 17, 5), "RE1"),
+    ("Essen Hauptbahnhof", datetime(2025, 8, 24, 17, 5), None),
+    ("", datetime(2025, 8, 24, 17, 5), ""),
+    ("Bochum Hbf", datetime(2025, 8, 24, 17, 5), 107),  # numeric line
+    ("Dortmund Hbf|Gleis 3", datetime(2025, 8, 24, 17, 5), "U|47"),  # separator in the fields
+    ("Wuppertal Hbf 🚆", datetime(2025, 8, 24, 17, 5), "S8 "),
+]
+
+
+def test_halves_match_make_uid():
+    expected = [backend.make_uid(stop, scheduled, line) for stop, scheduled, line in ROWS]
+
+    high, low = departure_ids(
+        [stop for stop, _, _ in ROWS], [str(scheduled) for _, scheduled, _ in ROWS], [line for _, _, line in ROWS]
+    )
+
+    assert halves_to_strings(high, low) == expected
+    assert halves_to_ints(high, low) == strings_to_ints(expected)
+    round_trip = strings_to_halves(expected)
+    assert np.array_equal(round_trip[0], high) and np.array_equal(round_trip[1], low)
+
+
+def test_columnar_ids_match_make_uid_for_odd_departures():
+    request_time = datetime(2025, 8, 24, 17, 0)
+    departures = [
+        {"stopName": "Essen Hauptbahnhof", "dateTime": {"year": "2025", "month": "8", "day": "24", "hour": "17", "minute": "5"}, "servingLine": {"number": "RE1"}},
+        {"stopName": "Essen Hauptbahnhof", "dateTime": {"hour": "9"}, "servingLine": {"number": "RE1"}},
+        {"stopName": "Essen Hauptbahnhof", "dateTime": {"year": "2025", "month": "8", "day": "24", "hour": "17", "minute": "5.0"}, "servingLine": {}},
+        {"stopName": None, "dateTime": {}, "servingLine": {"number": None}},
+        {"dateTime": {"year": "2025", "month": "2", "day": "29"}, "servingLine": {"number": "S1"}},
+    ]
+
+    rows = backend.build_results(request_time, backend.make_uid, departures)
+    columns = backend.build_columns(request_time, departures)
+
+    assert backend.with_uuid_strings(columns)["uuid"].tolist() == [row["uuid"] for row in rows]
+    assert departure_keys(columns) == departure_keys(pd.DataFrame({"uuid": [row["uuid"] for row in rows]}))
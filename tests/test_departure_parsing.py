@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+import pandas as pd
+
+import backend_api_to_geo as backend
+
+REQUEST_TIME = datetime(2025, 8, 24, 17, 0)
+
+
+def departure(date_time, real=None, **serving_line):
+    dep = {
+        "stopName": "Essen Hauptbahnhof",
+        "platformName": "3",
+        "dateTime": date_time,
+        "servingLine": {"number": "RE1", "direction": "Aachen Hbf", "delay": "2", **serving_line},
+    }
+    if real is not None:
+        dep["realDateTime"] = real
+    return dep
+
+
+# Date/time parts that int() accepts, rejects or that are missing
+ODD_DEPARTURES = [
+    departure({"year": "2025", "month": "8", "day": "24", "hour": "17", "minute": "5"}),
+    departure({"year": "2025", "month": "8", "day": "24", "hour": "17", "minute": "5.0"}),
+    departure({"year": "2025", "month": "8", "day": "24", "hour": "17", "minute": "1e1"}),
+    departure({"year": "2025", "month": "8", "day": "24", "hour": "17", "minute": " 7 "}),
+    departure({"year": 2025, "month": 8, "day": 24, "hour": 17, "minute": 7.5}),
+    departure({"year": "2025", "month": "8", "day": "24", "hour": "17", "minute": None}),
+    departure({"hour": "18", "minute": "0"}),
+    departure({"year": "2025", "month": "2", "day": "30", "hour": "8", "minute": "0"}),
+    departure({"year": "2025", "month": "13", "day": "1", "hour": "8", "minute": "0"}),
+    departure({"year": "99999999999999999999", "month": "1", "day": "1"}),
+    departure({}),
+    departure(
+        {"year": "2025", "month": "8", "day": "24", "hour": "23", "minute": "59"},
+        real={"year": "2025", "month": "8", "day": "25", "hour": "0", "minute": "x"},
+        delay="-9999",
+    ),
+]
+
+
+def test_columnar_parser_matches_build_results():
+    rows = backend.build_results(REQUEST_TIME, backend.make_uid, ODD_DEPARTURES)
+    columns = backend.with_uuid_strings(backend.build_columns(REQUEST_TIME, ODD_DEPARTURES))
+
+    assert columns["uuid"].tolist() == [row["uuid"] for row in rows]
+    assert missing_as_none(columns["scheduled_date_iso"]) == [row["scheduled_date_iso"] for row in rows]
+    real = [None if row["real_departure"] is None else row["real_departure"].isoformat() for row in rows]
+    assert missing_as_none(columns["real_departure"]) == real
+
+
+def missing_as_none(column):
+    return [None if pd.isna(value) or value == "nan" else value for value in column]
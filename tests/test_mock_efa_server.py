@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from pathlib import Path
+
+import backend_api_to_geo as backend
+from mock_efa_server import start_mock_server
+from station_cache import StationGeometryCache
+
+SHAPEFILE = Path(__file__).resolve().parent.parent / "data" / "geodata" / "source" / "bahnhoefe.shp"
+
+
+def test_mock_cycle_produces_station_features(tmp_path, monkeypatch):
+    monkeypatch.setattr(backend, "csv_file_target", tmp_path / "final_departures.csv", raising=False)
+    monkeypatch.setattr(backend, "bahnhoefe_geodata_source", SHAPEFILE, raising=False)
+    monkeypatch.setattr(backend, "bahnhoefe_geojson_target", tmp_path / "stations.geojson", raising=False)
+
+    async def run():
+        runner, url = await start_mock_server(latency_ms=0)
+        monkeypatch.setattr(backend, "API_URL", url)
+        cycles = []
+        done = asyncio.Event()
+
+        def on_cycle(features):
+            cycles.append(features)
+            if len(cycles) > 1:
+                done.set()
+
+        task = asyncio.create_task(
+            backend.main_async(
+                0.1, backend.PLACENAME_LIST, 10, request_rate=100, burst=10, on_cycle=on_cycle
+            )
+        )
+        try:
+            await asyncio.wait_for(done.wait(), timeout=30)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await runner.cleanup()
+        return cycles
+
+    cycles = asyncio.run(run())
+
+    stations = set(StationGeometryCache(SHAPEFILE).stops)
+    stops = {feature["properties"]["stop"] for feature in cycles[1]}
+    assert cycles[0] == []
+    assert len(stops) == len(backend.PLACENAME_LIST)
+    assert stops <= stations
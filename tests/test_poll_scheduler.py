@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import json
+
+from poll_scheduler import PollScheduler, load_catalog, stop_label
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_override_cannot_undercut_tier_interval():
+    scheduler = PollScheduler(clock=FakeClock())
+    scheduler.add(("Essen", "Hbf"), "hub", due=0.0)
+
+    scheduler.set_interval(("Essen", "Hbf"), 30.0)
+    assert scheduler.interval(("Essen", "Hbf")) == 60.0
+
+    scheduler.set_interval(("Essen", "Hbf"), 600.0)
+    assert scheduler.interval(("Essen", "Hbf")) == 600.0
+
+
+def test_override_respects_fitted_rate():
+    scheduler = PollScheduler(clock=FakeClock())
+    keys = [("", str(i)) for i in range(1000)]
+    for key in keys[:10]:
+        scheduler.add(key, "hub", due=0.0)
+    for key in keys[10:]:
+        scheduler.add(key, "minor", due=0.0)
+    scheduler.fit_to_rate(1.0)
+    for key in keys:
+        scheduler.set_interval(key, 30.0)
+
+    assert scheduler.interval(keys[0]) == 60.0
+    assert scheduler.required_rate() <= 1.0 + 1e-9
+
+
+def test_fit_to_rate_skips_empty_tiers():
+    scheduler = PollScheduler(clock=FakeClock())
+    for i in range(100):
+        scheduler.add(("", str(i)), "hub", due=0.0)
+
+    intervals = scheduler.fit_to_rate(1.0)
+
+    assert intervals["hub"] == 100.0
+    assert scheduler.required_rate() <= 1.0 + 1e-9
+
+
+def test_stop_label_of_catalog_keys():
+    assert stop_label("Essen", "HBF") == "Essen HBF"
+    assert stop_label("", "20009289") == "20009289"
+
+
+def test_catalog_leaves_out_placename_stations(tmp_path):
+    catalog = tmp_path / "catalog.json"
+    catalog.write_text(
+        json.dumps(
+            [
+                {"name": "Essen, Hauptbahnhof", "id": "20009289", "type": "stop"},
+                {"name": "DÃ¼sseldorf, DÃ¼sseldorf Hbf", "id": "20018235", "type": "stop"},
+                {"name": "Essen, B&R, Essen Hauptbahnhof", "id": "52548", "type": "stop"},
+                {"name": "Bochum, Bochum Hbf", "id": "20009163", "type": "stop"},
+            ]
+        ),
+        encoding="utf-8",
+    )
+
+    stops = load_catalog(catalog, placenames=[("Essen", "HBF"), ("Düsseldorf", "HBF")])
+
+    assert [stop["id"] for stop in stops] == ["52548", "20009163"]
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+import run_server_and_backend
+from poll_telemetry import PollTelemetry
+
+
+def make_telemetry():
+    telemetry = PollTelemetry(clock=lambda: 1000.0)
+    telemetry.record("Essen Hbf", returned=20, new=5, latency_s=0.2, size_bytes=4000)
+    telemetry.record("Essen Hbf", returned=20, new=0, latency_s=0.3, size_bytes=4000)
+    telemetry.record("Bochum Hbf", returned=20, new=0, latency_s=0.1, size_bytes=3000)
+    telemetry.record("Bochum Hbf", returned=0, error=True, status=503)
+    return telemetry
+
+
+def test_summary_sorts_descending():
+    stops = make_telemetry().summary(sort="new")["stops"]
+    assert [s["stop"] for s in stops] == ["Essen Hbf", "Bochum Hbf"]
+
+
+def test_summary_rejects_non_numeric_sort():
+    with pytest.raises(ValueError):
+        make_telemetry().summary(sort="stop")
+
+
+async def get_telemetry(query):
+    app = web.Application()
+    app["telemetry"] = make_telemetry()
+    app.router.add_get("/api/telemetry", run_server_and_backend.handle_telemetry)
+    async with TestClient(TestServer(app)) as client:
+        response = await client.get("/api/telemetry", params=query)
+        return response.status, await response.text()
+
+
+def test_handler_rejects_non_numeric_sort():
+    status, text = asyncio.run(get_telemetry({"sort": "stop"}))
+    assert status == 400
+    assert "wasted" in text
+
+
+def test_handler_sorts_and_limits():
+    status, text = asyncio.run(get_telemetry({"sort": "errors", "limit": "1"}))
+    assert status == 200
+    assert '"Bochum Hbf"' in text and '"Essen Hbf"' not in text
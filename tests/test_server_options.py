@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import backend_api_to_geo as backend
+import run_server_and_backend as server
+
+
+def options(catalog=None, adaptive=False, storage="csv"):
+    return {"catalog": catalog, "adaptive": adaptive, "storage": storage}
+
+
+def test_backend_arguments_pass_the_options_through():
+    assert server.backend_arguments(options()) == ["--storage", "csv"]
+    assert server.backend_arguments(options(catalog=True, storage="parquet")) == [
+        "--storage",
+        "parquet",
+        "--async",
+        "--catalog",
+    ]
+    assert server.backend_arguments(options(catalog="stops.json", adaptive=True)) == [
+        "--storage",
+        "csv",
+        "--async",
+        "--catalog",
+        "stops.json",
+        "--adaptive",
+    ]
+
+
+def test_build_scheduler_for_the_placenames():
+    assert backend.build_scheduler(5, backend.PLACENAME_LIST) == (None, None)
+
+    scheduler, adaptive = backend.build_scheduler(5, backend.PLACENAME_LIST, adaptive=True)
+    assert len(scheduler) == len(backend.PLACENAME_LIST)
+    assert scheduler.interval(backend.PLACENAME_LIST[0]) == 300
+    assert adaptive is not None
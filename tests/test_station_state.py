@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from station_state import StationState
+
+
+def feature(stop, lon, lat, **properties):
+    return {
+        "type": "Feature",
+        "properties": {"stop": stop, **properties},
+        "geometry": {"type": "Point", "coordinates": [lon, lat]},
+    }
+
+
+def test_index_weight_from_aggregates_without_lists():
+    state = StationState()
+    state.update(
+        [
+            feature("Essen Hbf", 7.0142, 51.4513, departure_count=30),
+            feature("Essen Berliner Platz", 7.0100, 51.4580, departure_count=4),
+        ]
+    )
+
+    # Zoomed out, both stops share a cell and the busier one represents it
+    assert state.index.query((6.9, 51.4, 7.1, 51.5), zoom=5) == ["Essen Hbf"]
+
+
+def test_index_weight_falls_back_to_lists():
+    state = StationState()
+    state.update(
+        [
+            feature("Essen Hbf", 7.0142, 51.4513, delays=[0, 1, 2]),
+            feature("Essen Berliner Platz", 7.0100, 51.4580, delays=[0]),
+            feature("Essen Altenessen", 7.0050, 51.4900),
+        ]
+    )
+
+    assert state.index.query((6.9, 51.4, 7.1, 51.5), zoom=5) == ["Essen Hbf"]
+
+
+def test_stations_without_departures_stay_in_the_viewport():
+    state = StationState()
+    state.index_stations({"Essen Hbf": (7.0142, 51.4513), "Bochum Hbf": (7.2233, 51.4785)})
+    bbox = (6.9, 51.4, 7.3, 51.5)
+
+    # Right after a restart no stop has departures yet
+    snapshot = state.snapshot(bbox=bbox)
+    assert {f["properties"]["stop"]: f["properties"]["departure_count"] for f in snapshot["features"]} == {
+        "Essen Hbf": 0,
+        "Bochum Hbf": 0,
+    }
+
+    state.update([feature("Essen Hbf", 7.0142, 51.4513, departure_count=30)])
+    assert {f["properties"]["stop"] for f in state.snapshot(bbox=bbox)["features"]} == {"Essen Hbf", "Bochum Hbf"}
+    assert state.feature("Bochum Hbf")["properties"]["departure_count"] == 0
+
+    # A stop whose departures expired becomes an idle station again
+    before = state.version
+    state.update([])
+    delta = state.snapshot(since=before, bbox=bbox)
+    assert delta["removed"] == ["Essen Hbf"]
+    assert [f["properties"] for f in delta["features"]] == [{"stop": "Essen Hbf", "departure_count": 0}]
+    assert sorted(state.index.query(bbox)) == ["Bochum Hbf", "Essen Hbf"]
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from station_summary import SummaryCache
+
+
+def test_summary_cache_is_dropped_with_a_new_state():
+    cache = SummaryCache()
+    assert cache.get('"a-1"', None) is None
+    cache.put('"a-1"', None, b"all")
+    cache.put('"a-1"', ("stop", "lon"), b"names")
+
+    assert cache.get('"a-1"', None) == b"all"
+    assert cache.get('"a-1"', ("stop", "lon")) == b"names"
+    assert cache.get('"a-2"', None) is None
+    assert cache.get('"a-2"', ("stop", "lon")) is None
+    assert cache.etag == '"a-2"'
+
+
+def test_summary_cache_ignores_bodies_of_an_older_state():
+    cache = SummaryCache()
+    cache.get('"a-1"', None)
+    cache.get('"a-2"', None)
+    cache.put('"a-1"', None, b"stale")
+
+    assert cache.get('"a-2"', None) is None
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+
+from stop_buffers import BUFFER_COLUMNS, StopBuffers
+
+
+def departures(rows):
+    df = pd.DataFrame(rows, columns=["stop", "scheduled_departure", "delay_min"])
+    df["uuid"] = [f"id-{i}" for i in range(len(df))]
+    for column in ("platform", "line", "direction", "real_departure", "connection_exists"):
+        df[column] = ""
+    return df[BUFFER_COLUMNS]
+
+
+def test_extend_groups_interleaved_stops():
+    stop_buffers = StopBuffers(2)
+    changed = stop_buffers.extend(
+        departures(
+            [
+                ("B", "2025-08-24 10:05:00", 1.0),
+                ("A", "2025-08-24 10:00:00", 0.0),
+                (None, "2025-08-24 10:01:00", 0.0),
+                ("B", "2025-08-24 10:01:00", 7.0),
+                ("A", "2025-08-24 10:10:00", 2.0),
+                ("A", "2025-08-24 10:03:00", 4.0),
+            ]
+        )
+    )
+
+    assert changed == {"A", "B"}
+    a = stop_buffers.properties("A")
+    assert a["scheduled_departures"] == ["2025-08-24 10:03:00", "2025-08-24 10:10:00"]
+    assert a["delays"] == [4.0, 2.0]
+    assert stop_buffers.properties("B")["delay_max"] == 7.0
+
+
+def test_extend_merges_late_departures():
+    stop_buffers = StopBuffers(3)
+    stop_buffers.extend(departures([("A", "2025-08-24 10:10:00", 0.0), ("A", "2025-08-24 10:20:00", 0.0)]))
+    stop_buffers.extend(departures([("A", "2025-08-24 10:15:00", 9.0), ("A", "2025-08-24 10:30:00", 1.0)]))
+
+    a = stop_buffers.properties("A")
+    assert a["scheduled_departures"] == ["2025-08-24 10:15:00", "2025-08-24 10:20:00", "2025-08-24 10:30:00"]
+    assert a["departure_count"] == 3
+    assert a["delay_max"] == 9.0
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from pathlib import Path
+
+import pytest
+
+import backend_api_to_geo as backend
+from poll_telemetry import PollTelemetry
+
+SHAPEFILE = Path(__file__).resolve().parent.parent / "data" / "geodata" / "source" / "bahnhoefe.shp"
+
+
+class StopLoop(BaseException):
+    pass
+
+
+@pytest.mark.parametrize(
+    "error",
+    [ValueError("Expecting value: line 1 column 1 (char 0)"), backend.EFARequestError("Bad gateway", 502)],
+)
+def test_sync_loop_records_failed_polls(tmp_path, monkeypatch, error):
+    telemetry = PollTelemetry()
+    monkeypatch.setattr(backend, "poll_telemetry", telemetry)
+    monkeypatch.setattr(backend, "csv_file_target", tmp_path / "final_departures.csv", raising=False)
+    monkeypatch.setattr(backend, "bahnhoefe_geodata_source", SHAPEFILE, raising=False)
+    monkeypatch.setattr(backend, "bahnhoefe_geojson_target", tmp_path / "stations.geojson", raising=False)
+
+    def failing_request(*args, **kwargs):
+        raise error
+
+    def sleep(seconds):
+        raise StopLoop
+
+    monkeypatch.setattr(backend, "full_api_request", failing_request)
+    monkeypatch.setattr(backend.time, "sleep", sleep)
+
+    with pytest.raises(StopLoop):
+        backend.main(1, [("Essen", "HBF")], 10, request_rate=100)
+
+    stop = telemetry.stop_summary("Essen HBF")
+    assert stop["polls"] == 1
+    assert stop["errors"] == 1